@@ -9,9 +9,18 @@ async function fetchFromUpstream(): Promise<Response> {
   const base = (process.env.NEXT_PUBLIC_API_BASE || '').replace(/\/$/, '');
   if (!base) return NextResponse.json([], { status: 200 });
   try {
-    const res = await fetch(`${base}/articles`, { cache: 'no-store' });
-    if (!res.ok) return NextResponse.json([], { status: 200 });
-    const data = await res.json();
+    // The API pages its lists; follow X-Next-Cursor so the sitemap/RSS see every article
+    const data: any[] = [];
+    let cursor: string | null = null;
+    do {
+      const qs = cursor ? `?limit=100&cursor=${encodeURIComponent(cursor)}` : '?limit=100';
+      const res = await fetch(`${base}/articles${qs}`, { cache: 'no-store' });
+      if (!res.ok) return NextResponse.json([], { status: 200 });
+      const page = await res.json();
+      if (!Array.isArray(page)) break;
+      data.push(...page);
+      cursor = res.headers.get('X-Next-Cursor');
+    } while (cursor);
     return NextResponse.json(data, { headers: { 'Cache-Control': 'public, max-age=30, stale-while-revalidate=60' } });
   } catch {
     return NextResponse.json([], { status: 200 });
@@ -6,12 +6,19 @@ import { verifyRequestAuth } from '@/lib/apiAuth';
 export const runtime = 'nodejs';
 export const dynamic = 'force-dynamic';
 
+// Same layout as the Python API: authors/{id}.subscriber_count, authors/{id}/subscriptions/{uid}
+// and the users/{uid}/subscriptions/{id} mirror, all changed in one transaction.
+async function countFollowers(usersRef: any): Promise<number> {
+  try { const c = await usersRef.count().get(); return c.data().count || 0; } catch { return 0; }
+}
+
 export async function GET(_: Request, ctx: any) {
   const id = ctx?.params?.id as string;
   const db = getFirestore();
-  const usersRef = db.collection('authors').doc(id).collection('subscriptions');
-  let count = 0;
-  try { const c = await usersRef.count().get(); count = c.data().count || 0; } catch {}
+  const authorRef = db.collection('authors').doc(id);
+  const snap = await authorRef.get();
+  const stored = snap.exists ? snap.get('subscriber_count') : undefined;
+  const count = typeof stored === 'number' ? stored : await countFollowers(authorRef.collection('subscriptions'));
   return NextResponse.json({ subscribed: false, count }, { headers: { 'Cache-Control': 'no-store' } });
 }
 
@@ -20,14 +27,26 @@ export async function POST(req: Request, ctx: any) {
   let uid: string | undefined;
   try { uid = (await verifyRequestAuth(req)).uid; } catch { return NextResponse.json({ error: 'unauthorized' }, { status: 401 }); }
   const db = getFirestore();
-  const usersRef = db.collection('authors').doc(id).collection('subscriptions');
+  const authorRef = db.collection('authors').doc(id);
+  const usersRef = authorRef.collection('subscriptions');
   const docRef = usersRef.doc(uid);
-  const exists = (await docRef.get()).exists;
-  if (exists) { await docRef.delete(); }
-  else { await docRef.set({ uid, at: new Date().toISOString() }); }
-  let count = 0;
-  try { const c = await usersRef.count().get(); count = c.data().count || 0; } catch {}
-  return NextResponse.json({ subscribed: !exists, count });
+  const mineRef = db.collection('users').doc(uid).collection('subscriptions').doc(id);
+  const result = await db.runTransaction(async (tx: any) => {
+    const [authorSnap, marker] = await tx.getAll(authorRef, docRef);
+    const stored = authorSnap.exists ? authorSnap.get('subscriber_count') : undefined;
+    let count = typeof stored === 'number' ? stored : await countFollowers(usersRef);
+    const at = new Date().toISOString();
+    if (marker.exists) {
+      tx.delete(docRef);
+      tx.delete(mineRef);
+      count = Math.max(0, count - 1);
+    } else {
+      tx.set(docRef, { uid, at });
+      tx.set(mineRef, { author: id, at });
+      count += 1;
+    }
+    tx.set(authorRef, { subscriber_count: count }, { merge: true });
+    return { subscribed: !marker.exists, count };
+  });
+  return NextResponse.json(result);
 }
-
-
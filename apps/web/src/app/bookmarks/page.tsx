@@ -1,6 +1,6 @@
 "use client";
 import { useEffect, useState } from "react";
-// import { apiGet } from "@/lib/api";
+import { apiGetAll } from "@/lib/api";
 import useSWR from "swr";
 import SiteShell from "@/components/SiteShell";
 import { getFirebaseAuth } from "@/lib/firebaseClient";
@@ -29,7 +29,7 @@ export default function BookmarksPage() {
     return () => { if (unsub) unsub(); };
   }, []);
 
-  const { data, isLoading } = useSWR(user ? "/users/me/bookmarks" : null, null, { revalidateOnFocus: false, revalidateOnReconnect: true });
+  const { data, isLoading } = useSWR(user ? "/users/me/bookmarks" : null, apiGetAll, { revalidateOnFocus: false, revalidateOnReconnect: true });
   useEffect(() => {
     if (!user) return;
     setLoading(isLoading);
@@ -2,7 +2,7 @@
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import PageLoader from "@/components/PageLoader";
-// import { apiGet } from "@/lib/api";
+import { apiGetAll } from "@/lib/api";
 import useSWR from "swr";
 import { getFirebaseAuth } from "@/lib/firebaseClient";
 import { onAuthStateChanged, User } from "firebase/auth";
@@ -28,8 +28,8 @@ export default function MyArticlesPage() {
     return () => { if (unsub) unsub(); };
   }, []);
 
-  const { data, isLoading, error: swrError } = useSWR(user ? "/users/me/articles" : null, null, { shouldRetryOnError: false });
-  const { data: allData } = useSWR(user ? "/articles" : null, null, { shouldRetryOnError: false });
+  const { data, isLoading, error: swrError } = useSWR(user ? "/users/me/articles" : null, apiGetAll, { shouldRetryOnError: false });
+  const { data: allData } = useSWR(user ? "/articles" : null, apiGetAll, { shouldRetryOnError: false });
   useEffect(() => {
     if (!user) return;
     setLoading(isLoading);
@@ -27,6 +27,27 @@ export async function apiGet<T>(path: string, init?: RequestInit): Promise<T> {
   return (await res.json()) as T;
 }
 
+// List endpoints return one page at a time with the next page's token in X-Next-Cursor
+export async function apiGetAll<T>(path: string, init?: RequestInit): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const sep = path.includes('?') ? '&' : '?';
+    const url = cursor ? `${path}${sep}cursor=${encodeURIComponent(cursor)}` : path;
+    const res = await fetch(`${getApiBase()}${url}`, await withAuth({
+      ...init,
+      headers: { 'Content-Type': 'application/json', ...(init?.headers || {}) },
+      cache: 'no-store',
+    }));
+    if (!res.ok) throw new Error(`GET ${path} ${res.status}`);
+    const page = await res.json();
+    if (!Array.isArray(page)) return page as T[];
+    items.push(...(page as T[]));
+    cursor = res.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return items;
+}
+
 export async function apiPost<T>(path: string, body: unknown, init?: RequestInit): Promise<T> {
   const res = await fetch(`${getApiBase()}${path}`, await withAuth({
     method: 'POST',
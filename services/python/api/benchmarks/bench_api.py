@@ -0,0 +1,173 @@
+"""Every API route against a seeded dataset, on the memory store and on the fake Firestore.
+
+Seeds --articles articles (with comments, likes, bookmarks and follows) in
+500-article Store.import_articles chunks, signs the benchmark user's token
+with FakeTokenIssuer so authentication runs the real verifier, then fires
+--requests requests per route, --concurrency at a time. Per route it reports
+throughput, p50/p99 latency, store calls per request (from the /metrics
+counters) and, on Firestore, RPCs and billed document reads per request.
+
+The fake Firestore runs in process, so its latencies measure our code path
+and the fake's own scans; the per-request RPC and read counts are what carry
+over to production. Read-through caches are off unless --cache is given.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_api --articles 10000 --requests 200
+    python -m benchmarks.bench_api --articles 100000 --modes memory firestore --requests 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from httpx import ASGITransport, AsyncClient
+
+import fake_firestore
+import main as api
+from fake_auth import FakeTokenIssuer
+from search_index import SearchIndex
+from stores import MemoryStore, Store
+
+USER = "u0"  # the benchmark user: follows FOLLOWS authors and has bookmarks
+FOLLOWS = 50
+AUTHORS = 500
+
+# (label, method, path, JSON body); {i} is an article index, {k} the request number
+ROUTES: List[Tuple[str, str, str, Optional[Dict[str, Any]]]] = [
+    ("list articles", "GET", "/api/v1/articles?limit=20", None),
+    ("get article", "GET", "/api/v1/articles/a{i}", None),
+    ("list comments", "GET", "/api/v1/articles/a{i}/comments", None),
+    ("like state", "GET", "/api/v1/articles/a{i}/likes", None),
+    ("bookmark state", "GET", "/api/v1/articles/a{i}/bookmark", None),
+    ("search", "GET", "/api/v1/search?q=article&limit=20", None),
+    ("author subscription", "GET", "/api/v1/authors/u{i}/subscription", None),
+    ("my articles", "GET", "/api/v1/users/me/articles", None),
+    ("my bookmarks", "GET", "/api/v1/users/me/bookmarks", None),
+    ("my subscriptions", "GET", "/api/v1/users/me/subscriptions", None),
+    ("my feed", "GET", "/api/v1/users/me/feed", None),
+    ("toggle like", "POST", "/api/v1/articles/a{i}/likes", None),
+    ("toggle bookmark", "POST", "/api/v1/articles/a{i}/bookmark", None),
+    ("add comment", "POST", "/api/v1/articles/a{i}/comments", {"text": "bench comment"}),
+    ("create article", "POST", "/api/v1/articles", {"title": "Bench {k}", "content": "text " * 200}),
+]
+
+
+def bundles(articles: int, start: int, end: int) -> List[Dict[str, Any]]:
+    out = []
+    for i in range(start, end):
+        slug = f"a{i}"
+        at = f"2025-01-01T00:00:00.{i:06d}Z"
+        out.append({
+            "article": {
+                "slug": slug, "title": f"Article {i}", "content": f"article body {i} " * 40,
+                "excerpt": f"article body {i}", "created_at": at, "updated_at": at,
+                "created_by": f"u{i % AUTHORS}", "is_published": True, "likes": 2, "views": 0, "comments_count": 2,
+            },
+            "comments": [{"id": f"c{j}", "text": "seed", "created_at": at, "author": "seed"} for j in range(2)],
+            "likes": [{"uid": f"u{(i + j) % AUTHORS + 1}", "at": at} for j in range(2)],
+            "bookmarks": [{"uid": USER, "at": at}] if i % 100 == 0 else [],
+        })
+    return out
+
+
+def seed(store: Store, articles: int):
+    for start in range(0, articles, 500):
+        store.import_articles(bundles(articles, start, min(articles, start + 500)))
+    for a in range(1, FOLLOWS + 1):
+        store.toggle_subscription(f"u{a}", USER, f"2025-03-01T00:00:{a:02d}Z")
+
+
+def configure(mode: str, issuer: FakeTokenIssuer, cache: bool) -> Optional[fake_firestore.FakeFirestore]:
+    api.search_index = SearchIndex()
+    api._search_index_loaded = False
+    api.rate_limiter = api.RateLimiter(api.MemoryBackend(), api.Limit(0, 0))
+    api.view_counter = api.ViewCounter(interval=3600)
+    api._auth_request = api._CachingAuthRequest(issuer.transport)
+    api._claims_cache.clear()
+    entries = api.CACHE_MAX_ENTRIES if cache else 0
+    api.article_cache = api.TTLCache(entries, api.CACHE_TTL_SECONDS, name="articles")
+    api.feed_cache = api.TTLCache(entries, api.CACHE_TTL_SECONDS, name="feed")
+    api.following_feed_cache = api.TTLCache(entries, api.FOLLOWING_FEED_TTL_SECONDS, name="following_feed")
+    if mode == "memory":
+        api.STORE_BACKEND = "memory"
+        api.memory_store = MemoryStore()
+        return None
+    fs = fake_firestore.FakeFirestore()
+    api.STORE_BACKEND = "firestore"
+    api._fs_client = fs
+    api.firestore = fake_firestore
+    api._firestore_store = None
+    return fs
+
+
+def _store_calls() -> float:
+    return sum(v for _, _, _, v in api.backend_metrics.operations.samples())
+
+
+async def bench_route(ac: AsyncClient, route, headers, n: int, concurrency: int, articles: int, fs) -> Dict[str, float]:
+    label, method, path, body = route
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(k: int):
+        url = path.format(i=(k * 7919) % articles, k=k)
+        payload = {key: v.format(k=k) if isinstance(v, str) else v for key, v in body.items()} if body else None
+        async with gate:
+            start = time.perf_counter()
+            r = await ac.request(method, url, headers=headers, json=payload)
+            latencies.append(time.perf_counter() - start)
+        if r.status_code >= 400:
+            raise RuntimeError(f"{label}: {method} {url} -> {r.status_code} {r.text[:200]}")
+
+    await one(n)  # warm-up (search index build, first cert fetch), not measured
+    latencies.clear()
+    calls = _store_calls()
+    if fs is not None:
+        fs.stats.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(k) for k in range(n)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": n / wall,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        "calls": (_store_calls() - calls) / n,
+        "rpcs": fs.stats.rpcs / n if fs is not None else 0.0,
+        "reads": fs.stats.reads / n if fs is not None else 0.0,
+    }
+
+
+async def run_mode(mode: str, args, issuer: FakeTokenIssuer):
+    fs = configure(mode, issuer, args.cache)
+    start = time.perf_counter()
+    seed(api._backend_store(), args.articles)
+    print(f"\n{mode}: seeded {args.articles} articles in {time.perf_counter() - start:.1f}s")
+    print(f"  {'route':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'calls/req':>11}{'rpc/req':>9}{'reads/req':>11}")
+    headers = {"Authorization": f"Bearer {issuer.token(USER)}"}
+    async with AsyncClient(transport=ASGITransport(app=api.app), base_url="http://bench") as ac:
+        for route in ROUTES:
+            if args.routes and route[0] not in args.routes:
+                continue
+            r = await bench_route(ac, route, headers, args.requests, args.concurrency, args.articles, fs)
+            print(f"  {route[0]:<22}{r['rps']:>10.1f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['calls']:>11.2f}{r['rpcs']:>9.2f}{r['reads']:>11.2f}")
+    api.view_counter.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["memory", "firestore"], choices=["memory", "firestore"])
+    parser.add_argument("--routes", nargs="*", default=[], help="route labels to run (default: all)")
+    parser.add_argument("--cache", action="store_true", help="keep the read-through caches on")
+    args = parser.parse_args()
+    issuer = FakeTokenIssuer()
+    for mode in args.modes:
+        asyncio.run(run_mode(mode, args, issuer))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Follow-graph reads with a million edges: the user-side index vs. scanning every author.
+
+Edges follow a skewed distribution (a few authors have most followers), like a
+real blog platform. The memory store is filled through toggle_subscription;
+SQLite is bulk-loaded in one transaction and its counters rebuilt with
+reconcile_subscriber_counts, since a million single-edge transactions only
+measure fsync.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_follows --edges 1000000 --users 100000 --authors 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from stores import MemoryStore, SQLiteStore, Store
+
+
+def make_edges(edges: int, users: int, authors: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    rnd = random.Random(seed)
+    out = set()
+    while len(out) < edges:
+        author = int(authors * rnd.random() ** 4)  # a0 is the head, the tail is long
+        out.add((f"a{author}", f"u{rnd.randrange(users)}"))
+    return [(a, u, f"2025-01-01T00:00:00.{i:06d}Z") for i, (a, u) in enumerate(sorted(out))]
+
+
+def load(name: str, edges: List[Tuple[str, str, str]]) -> Store:
+    if name == "memory":
+        store = MemoryStore()
+        for author, uid, at in edges:
+            store.toggle_subscription(author, uid, at)
+        return store
+    store = SQLiteStore(os.path.join(tempfile.mkdtemp(prefix="bench-"), "blog.db"))
+    with store._tx() as conn:
+        conn.executemany("INSERT INTO subscriptions (author_id, uid, at) VALUES (?, ?, ?)", edges)
+    store.reconcile_subscriber_counts()
+    return store
+
+
+def timed(label: str, n: int, fn: Callable[[int], object]):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40}{elapsed / n * 1e6:>12.1f} us/op")
+
+
+def scan_following(store: MemoryStore, uid: str) -> List[str]:
+    # list_subscriptions before the user-side index: every author's follower set
+    return [author for author, users in store.subscriptions_by_author.items() if uid in users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--authors", type=int, default=20_000)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite"], choices=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    edges = make_edges(args.edges, args.users, args.authors)
+    top_author = "a0"  # the most-followed author
+    for name in args.backends:
+        start = time.perf_counter()
+        store = load(name, edges)
+        print(f"\n{name}: loaded {len(edges)} edges in {time.perf_counter() - start:.1f}s")
+        _, followers = store.subscription_state(top_author, None)
+        print(f"  most-followed author has {followers} followers")
+        timed("list_subscriptions(uid, 21)", args.ops, lambda i: store.list_subscriptions(f"u{i % args.users}", 21))
+        timed("subscription_state(top author, uid)", args.ops, lambda i: store.subscription_state(top_author, f"u{i % args.users}"))
+        timed("toggle_subscription x2 (follow+unfollow)", args.ops // 2, lambda i: (
+            store.toggle_subscription(f"a{i % args.authors}", "bench-user", "2026"),
+            store.toggle_subscription(f"a{i % args.authors}", "bench-user", "2026"),
+        ))
+        if isinstance(store, MemoryStore):
+            timed("old scan over every author (baseline)", max(1, args.ops // 100), lambda i: scan_following(store, f"u{i % args.users}"))
+        if isinstance(store, SQLiteStore):
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
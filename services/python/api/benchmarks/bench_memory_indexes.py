@@ -0,0 +1,81 @@
+"""User dashboards on the memory store: per-author and per-user indexes vs. scanning everything.
+
+The baselines reproduce the reads before the secondary indexes: walking the
+global (created_at, slug) index filtering on created_by, and sorting a user's
+whole bookmark dict for every page.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_memory_indexes --articles 100000 --authors 1000 --users 10000
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from stores import MemoryStore
+from stores.base import Cursor
+
+
+def timed(label: str, n: int, fn: Callable[[int], object]):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<44}{elapsed / n * 1e6:>12.1f} us/op")
+
+
+def scan_by_author(store: MemoryStore, uid: str, limit: int) -> List[str]:
+    out = []
+    for _, slug in reversed(store.articles_index):
+        if len(out) >= limit:
+            break
+        if store.articles_by_slug[slug].get("created_by") == uid:
+            out.append(slug)
+    return out
+
+
+def sort_bookmarks(store: MemoryStore, uid: str, limit: int) -> List[Cursor]:
+    return sorted(((at, slug) for slug, at in store.bookmarks_by_user.get(uid, {}).items()), reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--bookmarks", type=int, default=200_000)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    store = MemoryStore()
+    start = time.perf_counter()
+    for i in range(args.articles):
+        store.create({
+            "slug": f"a{i}", "title": f"Article {i}", "created_at": f"2025-01-01T00:00:00.{i:06d}Z",
+            "created_by": f"u{int(args.authors * rnd.random() ** 3)}", "likes": 0, "views": 0,
+        })
+    for i in range(args.bookmarks):
+        store.toggle_bookmark(f"a{rnd.randrange(args.articles)}", f"u{int(args.users * rnd.random() ** 3)}", f"2025-02-01T00:00:00.{i:06d}Z")
+    print(f"memory: {args.articles} articles, {args.bookmarks} bookmark toggles in {time.perf_counter() - start:.1f}s")
+
+    # the tail author has a handful of articles scattered over the whole history
+    tail = f"u{args.authors - 1}"
+    print(f"  u0 has {len(store.articles_by_author.get('u0', []))} articles, {tail} has {len(store.articles_by_author.get(tail, []))}")
+    print(f"  u0 has {len(store.bookmarks_index.get('u0', []))} bookmarks")
+    ops = args.ops
+    timed("list_by_author(u0, 21)", ops, lambda i: store.list_by_author("u0", 21, fields=["slug"]))
+    timed(f"list_by_author({tail}, 21)", ops, lambda i: store.list_by_author(tail, 21, fields=["slug"]))
+    timed("list_bookmarks(u0, 21)", ops, lambda i: store.list_bookmarks("u0", 21))
+    timed("toggle_bookmark x2", ops // 2, lambda i: (
+        store.toggle_bookmark(f"a{i}", "bench-user", "2026"),
+        store.toggle_bookmark(f"a{i}", "bench-user", "2026"),
+    ))
+    slow = max(1, ops // 100)
+    timed("baseline: scan for u0 (21)", slow, lambda i: scan_by_author(store, "u0", 21))
+    timed(f"baseline: scan for {tail} (21)", slow, lambda i: scan_by_author(store, tail, 21))
+    timed("baseline: sort u0's bookmarks (21)", slow, lambda i: sort_bookmarks(store, "u0", 21))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare the inverted search index with the old linear substring scan.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_search --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from search_index import SearchIndex
+
+WORDS = (
+    "дизайн интерфейс статья бизнес технологии продукт команда разработка данные модель "
+    "пользователь поиск скорость облако сервер клиент design product python fastapi "
+    "firestore cache latency index query ranking search blog editor cover"
+).split()
+QUERIES = ["дизайн", "поиск скорость", "fastapi", "интерф", "latency index", "команда разработка данные"]
+
+
+def make_articles(n: int, words_per_article: int = 120, seed: int = 42) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    vocab = WORDS + [f"{w}{i}" for i in range(2000) for w in ("слово", "term")]
+    out = []
+    for i in range(n):
+        out.append({
+            "slug": f"article-{i}",
+            "title": " ".join(rnd.choices(vocab, k=5)),
+            "subtitle": " ".join(rnd.choices(vocab, k=10)),
+            "content": " ".join(rnd.choices(vocab, k=words_per_article)),
+            "created_at": f"2025-01-01T00:00:00.{i:06d}Z",
+        })
+    return out
+
+
+def linear_scan(articles: List[Dict[str, Any]], q: str) -> List[Dict[str, Any]]:
+    # Behaviour of search_articles before the index: substring match over every article
+    query = q.strip().lower()
+    items = [
+        a for a in articles
+        if any(query in str(a.get(f, "")).lower() for f in ("title", "subtitle", "content"))
+    ]
+    items.sort(key=lambda a: a.get("created_at", ""), reverse=True)
+    return items
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(size: int, repeat: int):
+    articles = make_articles(size)
+    idx = SearchIndex()
+    start = time.perf_counter()
+    idx.rebuild(articles)
+    build_s = time.perf_counter() - start
+    print(f"\n{size} articles: index build {build_s:.2f}s, {len(idx._vocab)} terms")
+    print(f"{'query':<28}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+    for q in QUERIES:
+        scan_ms = timed(lambda: linear_scan(articles, q), max(1, repeat // 10))
+        idx_ms = timed(lambda: idx.search(q, limit=20), repeat)
+        print(f"{q:<28}{scan_ms:>12.2f}{idx_ms:>12.2f}{scan_ms / max(idx_ms, 1e-6):>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Creating many articles with the same title: per-base slug counters vs. probing with exists().
+
+Every article gets the title "Добро пожаловать", so all of them share the slug
+base "dobro-pozhalovat". create_unique reads the base's counter and one
+candidate; the baseline reproduces create_article before the counters, which
+called exists() on base, base-2, base-3, ... until one was free, so the Nth
+article cost N reads. On the fake Firestore the report includes RPCs and
+document reads per create over the last --window creates.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_slugs --articles 10000 --baseline-articles 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Optional
+
+import fake_firestore
+from main import slugify
+from stores import FirestoreStore, MemoryStore, SQLiteStore, Store
+from stores.base import numbered_slug
+
+TITLE = "Добро пожаловать"
+
+
+def make_store(name: str) -> Store:
+    if name == "memory":
+        return MemoryStore()
+    if name == "sqlite":
+        return SQLiteStore(os.path.join(tempfile.mkdtemp(prefix="bench-"), "blog.db"))
+    return FirestoreStore(fake_firestore.FakeFirestore(), fake_firestore)
+
+
+def article(i: int) -> dict:
+    return {"title": TITLE, "content": "text", "created_at": f"2025-01-01T00:00:00.{i:06d}Z", "created_by": "u1"}
+
+
+def create_unique(store: Store, base: str, i: int) -> str:
+    return store.create_unique(article(i), base)
+
+
+def create_probing(store: Store, base: str, i: int) -> str:
+    n = 1
+    while store.exists(numbered_slug(base, n)):
+        n += 1
+    slug = numbered_slug(base, n)
+    store.create({**article(i), "slug": slug})
+    return slug
+
+
+def run(label: str, store: Store, create: Callable[[Store, str, int], str], n: int, window: int):
+    base = slugify(TITLE)
+    stats: Optional[fake_firestore.OpStats] = getattr(getattr(store, "client", None), "stats", None)
+    start = time.perf_counter()
+    for i in range(n):
+        if i == n - window and stats is not None:
+            stats.reset()
+        slug = create(store, base, i)
+    elapsed = time.perf_counter() - start
+    line = f"  {label:<40}{n:>8}{elapsed:>10.2f}s{elapsed / n * 1e6:>12.1f} us/create   last slug {slug}"
+    if stats is not None:
+        line += f"   rpc/create {stats.rpcs / window:.1f}, reads/create {stats.reads / window:.1f}"
+    print(line)
+    if isinstance(store, SQLiteStore):
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=10_000)
+    parser.add_argument("--baseline-articles", type=int, default=2000, help="the baseline is quadratic; 0 skips it")
+    parser.add_argument("--window", type=int, default=100, help="last creates the per-create counts are taken over")
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "firestore"], choices=["memory", "sqlite", "firestore"])
+    args = parser.parse_args()
+
+    print(f"slug base {slugify(TITLE)!r}")
+    for name in args.backends:
+        run(f"{name}: create_unique", make_store(name), create_unique, args.articles, min(args.window, args.articles))
+        if args.baseline_articles:
+            n = args.baseline_articles
+            run(f"{name}: exists() probing (baseline)", make_store(name), create_probing, n, min(args.window, n))
+
+
+if __name__ == "__main__":
+    main()
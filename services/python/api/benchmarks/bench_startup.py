@@ -0,0 +1,81 @@
+"""Cold-start import cost of the API module, measured with `python -X importtime`.
+
+Each run is a fresh interpreter importing `main`; the report is the median
+over --runs of the total import time, the heaviest top-level packages, and
+the same import with the Google Cloud SDKs loaded eagerly first (what every
+process paid before they became lazy).
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only when a service account is configured or a token is verified
+LAZY_MODULES = (
+    "google.cloud.firestore",
+    "google.cloud.storage",
+    "google.auth.transport.requests",
+    "google.oauth2.id_token",
+    "google.oauth2.service_account",
+)
+EAGER_SDKS = "import google.cloud.firestore, google.cloud.storage, google.auth.transport.requests, google.oauth2.id_token"
+
+
+class ImportTimes(NamedTuple):
+    total_us: int  # sum of self times: everything the statement imported
+    cumulative_us: Dict[str, int]  # module -> cumulative microseconds (first import only)
+
+
+def parse_importtime(stderr: str) -> ImportTimes:
+    total = 0
+    cumulative: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        total += int(self_us)
+        cumulative.setdefault(name.strip(), int(cum_us))
+    return ImportTimes(total, cumulative)
+
+
+def measure(statement: str = "import main") -> ImportTimes:
+    """Import times for `statement` in a fresh interpreter running from the API directory."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=API_DIR, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def _runs(statement: str, runs: int) -> List[ImportTimes]:
+    return sorted((measure(statement) for _ in range(runs)), key=lambda t: t.total_us)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest packages to list")
+    args = parser.parse_args()
+
+    lazy = _runs("import main", args.runs)
+    eager = _runs(f"{EAGER_SDKS}; import main", args.runs)
+    mid = lazy[len(lazy) // 2]
+    print(f"import main: median {statistics.median(t.total_us for t in lazy) / 1000:.1f} ms over {args.runs} runs")
+    print(f"  with the Google SDKs imported eagerly: {statistics.median(t.total_us for t in eager) / 1000:.1f} ms")
+    loaded = [m for m in LAZY_MODULES if m in mid.cumulative_us]
+    print(f"  lazy SDK modules loaded at import: {', '.join(loaded) or 'none'}")
+    print("  heaviest imports (cumulative ms):")
+    heaviest = sorted(mid.cumulative_us.items(), key=lambda kv: kv[1], reverse=True)
+    for module, us in [kv for kv in heaviest if kv[0] != "main" and "." not in kv[0]][: args.top]:
+        print(f"    {module:<36}{us / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Run the same workload against every storage backend.
+
+The Firestore backend runs on the in-memory fake, so its numbers measure the
+code path and the round trips per operation, not network latency.
+
+Usage (from services/python/api):
+    python -m benchmarks.bench_stores --articles 2000 --ops 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+import fake_firestore
+from stores import FirestoreStore, MemoryStore, SQLiteStore, Store
+
+BACKENDS: Dict[str, Callable[[], Store]] = {
+    "memory": MemoryStore,
+    "firestore": lambda: FirestoreStore(fake_firestore.FakeFirestore(), fake_firestore),
+    "sqlite": lambda: SQLiteStore(os.path.join(tempfile.mkdtemp(prefix="bench-"), "blog.db")),
+}
+
+
+def _rpcs(store: Store) -> int:
+    client = getattr(store, "client", None)
+    return client.stats.rpcs if isinstance(client, fake_firestore.FakeFirestore) else 0
+
+
+def run(name: str, articles: int, ops: int):
+    store = BACKENDS[name]()
+    workloads = [
+        ("create", articles, lambda i: store.create({
+            "slug": f"a{i}", "title": f"Article {i}", "content": "text " * 50,
+            "created_at": f"2025-01-01T00:00:00.{i:06d}Z", "created_by": f"u{i % 50}",
+            "likes": 0, "views": 0, "comments_count": 0,
+        })),
+        ("get", ops, lambda i: store.get(f"a{i % articles}")),
+        ("list_recent(21)", ops, lambda i: store.list_recent(21, fields=["slug", "title", "created_at"])),
+        ("list_by_author(21)", ops, lambda i: store.list_by_author(f"u{i % 50}", 21)),
+        ("add_comment", ops, lambda i: store.add_comment(f"a{i % articles}", {"id": f"c{i}", "text": "x", "created_at": f"2025-01-02T00:00:00.{i:06d}Z"})),
+        ("list_comments(21)", ops, lambda i: store.list_comments(f"a{i % articles}", 21)),
+        ("toggle_like", ops, lambda i: store.toggle_like(f"a{i % articles}", f"u{i % 7}", "2025")),
+        ("toggle_bookmark", ops, lambda i: store.toggle_bookmark(f"a{i % articles}", "u1", f"2025-02-01T00:00:00.{i:06d}Z")),
+        ("list_bookmarks(21)", ops, lambda i: store.list_bookmarks("u1", 21)),
+    ]
+    if store.native_search:
+        workloads.append(("search(21)", ops, lambda i: store.search("text", 21)))
+    print(f"\n{name}")
+    print(f"{'operation':<22}{'ops/s':>12}{'us/op':>10}{'rpc/op':>9}")
+    for label, n, fn in workloads:
+        rpcs = _rpcs(store)
+        start = time.perf_counter()
+        for i in range(n):
+            fn(i)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22}{n / elapsed:>12.0f}{elapsed / n * 1e6:>10.1f}{(_rpcs(store) - rpcs) / n:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS), choices=sorted(BACKENDS))
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+    for name in args.backends:
+        run(name, args.articles, args.ops)
+
+
+if __name__ == "__main__":
+    main()
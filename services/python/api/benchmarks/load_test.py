@@ -0,0 +1,91 @@
+"""Concurrent load against the Firestore code path with simulated network latency.
+
+Every fake Firestore round trip sleeps `--latency` seconds, so throughput is
+bounded by how many blocking calls can be in flight at once (the threadpool
+size) and by how many round trips each request makes.
+
+Usage (from services/python/api):
+    python -m benchmarks.load_test --requests 500 --latency 0.02 --threads 40 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import anyio.to_thread
+from httpx import ASGITransport, AsyncClient
+
+import fake_firestore
+import main as api
+
+ROUTES = [
+    "/api/v1/articles/a{i}",
+    "/api/v1/articles/a{i}/likes",
+    "/api/v1/articles/a{i}/bookmark",
+    "/api/v1/articles/a{i}/comments",
+]
+
+
+def setup(articles: int, latency: float) -> fake_firestore.FakeFirestore:
+    fs = fake_firestore.FakeFirestore()
+    for i in range(articles):
+        ref = fs.collection("articles").document(f"a{i}")
+        ref.set({"slug": f"a{i}", "title": f"Article {i}", "content": "text", "created_at": f"2025-01-01T00:00:{i % 60:02d}Z", "comments_count": 1})
+        ref.collection("comments").document("c0").set({"id": "c0", "text": "x", "created_at": "2025-01-02T00:00:00Z"})
+    fs.latency = latency
+    api._fs_client = fs
+    api.firestore = fake_firestore
+    api._verify_user = lambda authorization: {"uid": "u1"}
+    api.view_counter = api.ViewCounter(interval=3600)
+    # measure the backend, not the read-through cache
+    api.article_cache = api.TTLCache(0, 0, name="articles")
+    return fs
+
+
+async def fire(n: int, articles: int) -> List[float]:
+    latencies: List[float] = []
+
+    async def one(ac: AsyncClient, k: int):
+        start = time.perf_counter()
+        r = await ac.get(ROUTES[k % len(ROUTES)].format(i=k % articles), headers={"Authorization": "Bearer t"})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    async with AsyncClient(transport=ASGITransport(app=api.app), base_url="http://test") as ac:
+        await asyncio.gather(*(one(ac, k) for k in range(n)))
+    return latencies
+
+
+def run(threads: int, n: int, articles: int, latency: float):
+    fs = setup(articles, latency)
+
+    async def go():
+        anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+        fs.stats.reset()
+        start = time.perf_counter()
+        lat = await fire(n, articles)
+        return time.perf_counter() - start, lat, fs.stats.rpcs
+
+    wall, lat, rpcs = asyncio.run(go())
+    lat.sort()
+    p50 = statistics.median(lat) * 1000
+    p99 = lat[int(len(lat) * 0.99) - 1] * 1000
+    print(f"{threads:>8}{n / wall:>12.1f}{p50:>10.1f}{p99:>10.1f}{rpcs / n:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Firestore round trip")
+    parser.add_argument("--threads", type=int, nargs="+", default=[40, 200])
+    args = parser.parse_args()
+    print(f"{args.requests} concurrent GETs, {args.latency * 1000:.0f} ms per round trip")
+    print(f"{'threads':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'rpc/req':>10}")
+    for threads in args.threads:
+        run(threads, args.requests, args.articles, args.latency)
+
+
+if __name__ == "__main__":
+    main()
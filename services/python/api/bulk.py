@@ -0,0 +1,164 @@
+"""Bulk export/import of articles as NDJSON, one article per line with its comments, likes and bookmarks.
+
+Line format:
+    {"article": {...}, "comments": [...], "likes": [{"uid", "at"}], "bookmarks": [{"uid", "at"}]}
+
+The importer works in chunks: each chunk resolves all of its slug collisions
+with one or two `get_many` lookups and is written with one
+`Store.import_articles` call (500-write batches on Firestore, one
+transaction on SQLite), instead of probing slugs and writing one article at
+a time like `create_article`.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+import json
+import time
+
+from stores import Store
+from stores.base import batched
+
+CHUNK_SIZE = 500
+ON_CONFLICT = ("rename", "skip")
+MAX_ERRORS = 100  # error details kept in the report; the count keeps going
+
+
+def export_records(store: Store) -> Iterator[Dict[str, Any]]:
+    for article in store.iter_articles():
+        yield {"article": article, **store.dump_social(article["slug"])}
+
+
+def export_ndjson(store: Store) -> Iterator[str]:
+    for record in export_records(store):
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class Importer:
+    """Feed it chunks of NDJSON lines; keeps running totals for progress reports."""
+
+    def __init__(
+        self,
+        store: Store,
+        on_conflict: str = "rename",
+        on_chunk: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ):
+        if on_conflict not in ON_CONFLICT:
+            raise ValueError(f"on_conflict must be one of {ON_CONFLICT}")
+        self.store = store
+        self.on_conflict = on_conflict
+        self.on_chunk = on_chunk  # called with the written articles, e.g. to update a search index
+        self.claimed: Set[str] = set()  # slugs written by this import so far
+        self.lines = 0
+        self.created = 0
+        self.renamed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.monotonic()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "lines": self.lines, "created": self.created, "renamed": self.renamed,
+            "skipped": self.skipped, "failed": self.failed, "errors": self.errors,
+            "seconds": round(elapsed, 3),
+        }
+
+    def _error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def _parse(self, line_no: int, line: Any) -> Optional[Dict[str, Any]]:
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            self._error(line_no, f"invalid JSON: {e}")
+            return None
+        article = record.get("article") if isinstance(record, dict) else None
+        if not isinstance(article, dict) or not str(article.get("slug") or "").strip():
+            self._error(line_no, "article.slug required")
+            return None
+        comments = [c for c in record.get("comments") or [] if isinstance(c, dict) and c.get("id")]
+        likes = _unique_marks(record.get("likes"))
+        bookmarks = _unique_marks(record.get("bookmarks"))
+        article = dict(article, slug=str(article["slug"]).strip())
+        # counters follow the data that is actually imported
+        article.update(likes=len(likes), comments_count=len(comments), views=int(article.get("views") or 0))
+        return {"article": article, "comments": comments, "likes": likes, "bookmarks": bookmarks}
+
+    def _resolve(self, bundles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        wanted = [b["article"]["slug"] for b in bundles]
+        taken = set(self.store.get_many(list(dict.fromkeys(wanted)), ["slug"])) | self.claimed
+        out: List[Dict[str, Any]] = []
+        pending: List[Dict[str, Any]] = []
+        for bundle in bundles:
+            slug = bundle["article"]["slug"]
+            if slug not in taken:
+                taken.add(slug)
+                out.append(bundle)
+            elif self.on_conflict == "skip":
+                self.skipped += 1
+            else:
+                pending.append(bundle)
+        # rename collisions to slug-2, slug-3, ...: probe a window of candidates per
+        # colliding slug in one lookup, widening only if the whole window is taken
+        start = 2
+        window = 8
+        while pending:
+            candidates = {b["article"]["slug"]: [f"{b['article']['slug']}-{i}" for i in range(start, start + window)] for b in pending}
+            probe = [c for names in candidates.values() for c in names if c not in taken]
+            taken |= set(self.store.get_many(list(dict.fromkeys(probe)), ["slug"]))
+            still: List[Dict[str, Any]] = []
+            for bundle in pending:
+                free = next((c for c in candidates[bundle["article"]["slug"]] if c not in taken), None)
+                if free is None:
+                    still.append(bundle)
+                    continue
+                taken.add(free)
+                bundle["article"]["slug"] = free
+                self.renamed += 1
+                out.append(bundle)
+            pending = still
+            start += window
+            window *= 4
+        return out
+
+    def feed(self, lines: Iterable[Any]) -> None:
+        bundles = []
+        for line in lines:
+            self.lines += 1
+            if not line.strip():  # str or bytes
+                continue
+            bundle = self._parse(self.lines, line)
+            if bundle is not None:
+                bundles.append(bundle)
+        if not bundles:
+            return
+        bundles = self._resolve(bundles)
+        if not bundles:
+            return
+        self.store.import_articles(bundles)
+        self.claimed.update(b["article"]["slug"] for b in bundles)
+        self.created += len(bundles)
+        if self.on_chunk is not None:
+            self.on_chunk([b["article"] for b in bundles])
+
+
+def import_ndjson(
+    importer: Importer,
+    lines: Iterable[Any],
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[Importer], None]] = None,
+) -> Dict[str, Any]:
+    for chunk in batched(lines, chunk_size):
+        importer.feed(chunk)
+        if progress is not None:
+            progress(importer)
+    return importer.report()
+
+
+def _unique_marks(items: Any) -> List[Dict[str, str]]:
+    marks: Dict[str, str] = {}
+    for item in items or []:
+        if isinstance(item, dict) and item.get("uid"):
+            marks.setdefault(str(item["uid"]), str(item.get("at") or ""))
+    return [{"uid": uid, "at": at} for uid, at in marks.items()]
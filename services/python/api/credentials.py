@@ -0,0 +1,95 @@
+"""Service-account credentials, loaded once and shared by the Firestore and GCS clients.
+
+Sources, first match wins: FIREBASE_SERVICE_ACCOUNT_JSON (the key itself),
+FIREBASE_SERVICE_ACCOUNT_FILE (a path to it), then the first service-account
+key among the files under /etc/secrets (Render's secret-files mount).
+google-auth is imported only once a key has been found, so a process without
+one (local development, tests) never pays for it.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple
+import json
+import os
+import threading
+
+SECRETS_DIR = "/etc/secrets"
+
+
+class ServiceAccount(NamedTuple):
+    info: Dict[str, Any]
+    credentials: Any  # google.oauth2.service_account.Credentials
+    project_id: Optional[str]
+    source: str
+
+
+_lock = threading.Lock()
+_loaded = False
+_account: Optional[ServiceAccount] = None
+
+
+def _candidates(secrets_dir: str) -> Iterator[Tuple[str, str]]:
+    """(source, raw JSON text) pairs in lookup order; unreadable files are skipped."""
+    text = (os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON") or "").strip()
+    if text:
+        yield "FIREBASE_SERVICE_ACCOUNT_JSON", text
+    path = (os.getenv("FIREBASE_SERVICE_ACCOUNT_FILE") or "").strip()
+    if path:
+        try:
+            yield path, Path(path).read_text(encoding="utf-8")
+        except OSError:
+            pass
+    root = Path(secrets_dir)
+    try:
+        files = sorted(root.glob("*.json")) or sorted(root.iterdir())
+    except OSError:
+        return
+    for p in files:
+        try:
+            if p.is_file():
+                yield str(p), p.read_text(encoding="utf-8")
+        except OSError:
+            continue
+
+
+def _parse(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        info = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(info, dict) or not info.get("client_email") or not info.get("private_key"):
+        return None
+    return info
+
+
+def _load(secrets_dir: str) -> Optional[ServiceAccount]:
+    for source, text in _candidates(secrets_dir):
+        info = _parse(text)
+        if info is None:
+            continue
+        from google.oauth2 import service_account
+
+        try:
+            creds = service_account.Credentials.from_service_account_info(info)
+        except Exception:
+            continue
+        return ServiceAccount(info, creds, info.get("project_id"), source)
+    return None
+
+
+def load_service_account(secrets_dir: str = SECRETS_DIR) -> Optional[ServiceAccount]:
+    """The configured service account, or None; looked up and parsed on the first call only."""
+    global _loaded, _account
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _account = _load(secrets_dir)
+                _loaded = True
+    return _account
+
+
+def reset():
+    """Forget the cached result so the next call looks again (tests, credential rotation)."""
+    global _loaded, _account
+    with _lock:
+        _loaded = False
+        _account = None
@@ -0,0 +1,393 @@
+"""Minimal in-memory stand-in for the parts of google.cloud.firestore used by main.py.
+
+Used by tests to exercise the Firestore code paths without credentials.
+Counts document reads/writes the way Firestore bills them so tests can
+assert on backend cost per request. An optional per-RPC `latency` makes
+each round trip block like a real network call, for load tests.
+
+Documents are kept per collection, so a query only scans its own collection
+and the benchmarks can seed 100k articles with their comments and likes.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import copy
+import functools
+import heapq
+import threading
+import time
+
+
+class Increment:
+    def __init__(self, value: int):
+        self.value = value
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+
+class NotFound(Exception):
+    pass
+
+
+class OpStats:
+    def __init__(self):
+        self._lock = threading.Lock()  # requests run on many threadpool workers at once
+        self.reads = 0
+        self.writes = 0
+        self.deletes = 0
+        self.rpcs = 0
+
+    def add(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def reset(self):
+        with self._lock:
+            self.reads = 0
+            self.writes = 0
+            self.deletes = 0
+            self.rpcs = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"reads": self.reads, "writes": self.writes, "deletes": self.deletes, "rpcs": self.rpcs}
+
+
+def _apply(existing: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(existing)
+    for k, v in data.items():
+        if isinstance(v, Increment):
+            out[k] = (out.get(k) or 0) + v.value
+        else:
+            out[k] = copy.deepcopy(v)
+    return out
+
+
+def _mask(data: Optional[Dict[str, Any]], field_paths: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    if data is None:
+        return None
+    if field_paths is None:
+        return copy.deepcopy(data)
+    return {k: copy.deepcopy(data[k]) for k in field_paths if k in data}
+
+
+DOCUMENT_ID = "__name__"  # order_by/start_after field for the document id
+
+
+def _values(row: Tuple[str, Dict[str, Any]], fields: List[str]) -> Tuple:
+    doc_id, data = row
+    return tuple(doc_id if f == DOCUMENT_ID else (data.get(f) or "") for f in fields)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class DocumentReference:
+    def __init__(self, client: "FakeFirestore", path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    @property
+    def path(self) -> str:
+        return "/".join(self._path)
+
+    def collection(self, name: str) -> "CollectionReference":
+        return CollectionReference(self._client, self._path + (name,))
+
+    def get(self) -> DocumentSnapshot:
+        self._client._rpc()
+        return self._get()
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._client._rpc()
+        self._set(data, merge)
+
+    def update(self, data: Dict[str, Any]):
+        self._client._rpc()
+        self._update(data)
+
+    def delete(self):
+        self._client._rpc()
+        self._delete()
+
+    # the underscored variants apply the operation without a round trip (used by batches)
+
+    def _get(self) -> DocumentSnapshot:
+        self._client.stats.add("reads")
+        return DocumentSnapshot(self, self._client._doc(self._path))
+
+    def _set(self, data: Dict[str, Any], merge: bool = False):
+        self._client.stats.add("writes")
+        base = (self._client._doc(self._path) or {}) if merge else {}
+        self._client._put(self._path, _apply(base, data))
+
+    def _update(self, data: Dict[str, Any]):
+        existing = self._client._doc(self._path)
+        if existing is None:
+            raise NotFound(self.path)
+        self._client.stats.add("writes")
+        self._client._put(self._path, _apply(existing, data))
+
+    def _delete(self):
+        self._client.stats.add("deletes")
+        self._client._pop(self._path)
+
+
+class BaseQuery:
+    def __init__(self, client: "FakeFirestore", path: Tuple[str, ...]):
+        self._client = client
+        self._path = path
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._limit: Optional[int] = None
+        self._start_after: Optional[Dict[str, Any]] = None
+        self._select: Optional[List[str]] = None
+
+    def _copy(self) -> "BaseQuery":
+        q = BaseQuery(self._client, self._path)
+        q._filters = list(self._filters)
+        q._orders = list(self._orders)
+        q._limit = self._limit
+        q._start_after = self._start_after
+        q._select = self._select
+        return q
+
+    def where(self, field: str, op: str, value: Any) -> "BaseQuery":
+        q = self._copy()
+        q._filters.append((field, op, value))
+        return q
+
+    def order_by(self, field: str, direction: str = Query.ASCENDING) -> "BaseQuery":
+        q = self._copy()
+        q._orders.append((field, direction))
+        return q
+
+    def limit(self, n: int) -> "BaseQuery":
+        q = self._copy()
+        q._limit = n
+        return q
+
+    def start_after(self, values: Dict[str, Any]) -> "BaseQuery":
+        q = self._copy()
+        if isinstance(values, DocumentSnapshot):
+            values = dict(values.to_dict() or {}, **{DOCUMENT_ID: values.id})
+        q._start_after = dict(values)
+        return q
+
+    def select(self, field_paths: List[str]) -> "BaseQuery":
+        q = self._copy()
+        q._select = list(field_paths)
+        return q
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for field, op, value in self._filters:
+            cur = data.get(field)
+            if op == "==" and cur != value:
+                return False
+            if op == "in" and cur not in value:
+                return False
+            if op == "array_contains" and value not in (cur or []):
+                return False
+            if op in (">", ">=", "<", "<="):
+                if cur is None:
+                    return False
+                if op == ">" and not cur > value:
+                    return False
+                if op == ">=" and not cur >= value:
+                    return False
+                if op == "<" and not cur < value:
+                    return False
+                if op == "<=" and not cur <= value:
+                    return False
+        return True
+
+    def _cursor(self) -> Tuple:
+        """start_after values for a prefix of the orders, like Firestore (a reference stands for its id)."""
+        values = []
+        for field, _ in self._orders:
+            if field not in self._start_after:
+                break
+            value = self._start_after[field]
+            values.append(value.id if isinstance(value, DocumentReference) else value)
+        return tuple(values)
+
+    def _results(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Matching (document id, data) rows in query order."""
+        docs = self._client._collections.get(self._path, {})
+        if not self._filters and not self._orders:
+            ids = sorted(docs) if self._limit is None else heapq.nsmallest(self._limit, docs)
+            return [(doc_id, docs[doc_id]) for doc_id in ids]
+        fields = [f for f, _ in self._orders]
+        rows = [(doc_id, d) for doc_id, d in docs.items() if self._matches(d)] if self._filters else list(docs.items())
+        # like Firestore, order_by drops documents that lack the ordered field
+        for f in fields:
+            if f != DOCUMENT_ID:
+                rows = [r for r in rows if f in r[1]]
+        if self._start_after is not None and self._orders:
+            cursor = self._cursor()
+            prefix = fields[: len(cursor)]
+            desc = self._orders[0][1] == Query.DESCENDING
+            rows = [r for r in rows if (_values(r, prefix) < cursor if desc else _values(r, prefix) > cursor)]
+        directions = {d for _, d in self._orders}
+        if len(directions) > 1:
+            # mixed directions: stable sorts, last order first
+            rows.sort(key=lambda r: r[0])
+            for field, direction in reversed(self._orders):
+                rows.sort(key=lambda r: _values(r, [field]), reverse=(direction == Query.DESCENDING))
+            return rows if self._limit is None else rows[: self._limit]
+
+        # like Firestore, the implicit document-id tie-breaker follows the last order's direction
+        if len(fields) == 1:
+            field = fields[0]
+
+            def key(row):
+                return (row[1].get(field) or "", row[0])
+        else:
+            def key(row):
+                return _values(row, fields) + (row[0],)
+
+        desc = directions == {Query.DESCENDING}
+        # a limited query only needs the first `limit` rows, not a full sort of the collection
+        if self._limit is not None:
+            return (heapq.nlargest if desc else heapq.nsmallest)(self._limit, rows, key=key)
+        return sorted(rows, key=key, reverse=desc)
+
+    def stream(self, transaction: Optional["Transaction"] = None) -> Iterator[DocumentSnapshot]:
+        self._client._rpc()
+        rows = self._results()
+        # Firestore bills at least one read per query even when empty
+        self._client.stats.add("reads", max(1, len(rows)))
+        for doc_id, d in rows:
+            yield DocumentSnapshot(DocumentReference(self._client, self._path + (doc_id,)), _mask(d, self._select))
+
+
+class CollectionReference(BaseQuery):
+    @property
+    def id(self) -> str:
+        return self._path[-1]
+
+    def document(self, doc_id: str) -> DocumentReference:
+        return DocumentReference(self._client, self._path + (doc_id,))
+
+    def list_documents(self) -> Iterator[DocumentReference]:
+        """Like Firestore: includes "missing" parents that only have subcollections."""
+        self._client._rpc()
+        depth = len(self._path)
+        ids = set(self._client._collections.get(self._path, {}))
+        ids.update(c[depth] for c in self._client._collections if len(c) > depth and c[:depth] == self._path)
+        ids = sorted(ids)
+        for doc_id in ids:
+            yield self.document(doc_id)
+
+
+class WriteBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._ops: List[Tuple[str, DocumentReference, Any]] = []
+
+    def set(self, ref: DocumentReference, data: Dict[str, Any], merge: bool = False):
+        self._ops.append(("set_merge" if merge else "set", ref, data))
+
+    def update(self, ref: DocumentReference, data: Dict[str, Any]):
+        self._ops.append(("update", ref, data))
+
+    def delete(self, ref: DocumentReference):
+        self._ops.append(("delete", ref, None))
+
+    def commit(self):
+        self._client._rpc()
+        for op, ref, data in self._ops:
+            if op == "update" and self._client._doc(ref._path) is None:
+                raise NotFound(ref.path)
+        for op, ref, data in self._ops:
+            if op == "set":
+                ref._set(data)
+            elif op == "set_merge":
+                ref._set(data, merge=True)
+            elif op == "update":
+                ref._update(data)
+            else:
+                ref._delete()
+        self._ops = []
+
+
+class Transaction(WriteBatch):
+    """Writes are buffered like a batch; `transactional` holds the client lock for the whole attempt.
+
+    Real Firestore retries on contention instead of locking; holding a lock
+    gives the same serializable outcome for the code under test.
+    """
+
+
+def transactional(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def run(transaction: Transaction, *args, **kwargs):
+        client = transaction._client
+        with client._tx_lock:
+            client._rpc()  # BeginTransaction
+            result = fn(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
+
+    return run
+
+
+class FakeFirestore:
+    def __init__(self, latency: float = 0.0):
+        self._collections: Dict[Tuple[str, ...], Dict[str, Dict[str, Any]]] = {}  # collection path -> {id: data}
+        self.stats = OpStats()
+        self.latency = latency
+        self._tx_lock = threading.RLock()
+
+    def _doc(self, path: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        return self._collections.get(path[:-1], {}).get(path[-1])
+
+    def _put(self, path: Tuple[str, ...], data: Dict[str, Any]):
+        self._collections.setdefault(path[:-1], {})[path[-1]] = data
+
+    def _pop(self, path: Tuple[str, ...]):
+        docs = self._collections.get(path[:-1])
+        if docs is not None:
+            docs.pop(path[-1], None)
+            if not docs:
+                del self._collections[path[:-1]]
+
+    def _rpc(self):
+        self.stats.add("rpcs")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, (name,))
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self) -> Transaction:
+        return Transaction(self)
+
+    def get_all(
+        self,
+        references: List[DocumentReference],
+        field_paths: Optional[List[str]] = None,
+        transaction: Optional[Transaction] = None,
+    ) -> Iterator[DocumentSnapshot]:
+        self._rpc()
+        for ref in references:
+            snap = ref._get()
+            yield DocumentSnapshot(ref, _mask(snap._data, field_paths))
@@ -0,0 +1,104 @@
+"""Cover image pipeline: decode, strip metadata, crop around the focal point, encode a srcset.
+
+Everything here is CPU-bound and pure (bytes in, bytes out) so it can run in a
+process pool; main.py owns the pool and the storage.
+"""
+from io import BytesIO
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageOps
+
+try:  # AVIF needs the optional pillow-avif-plugin on Pillow < 11
+    import pillow_avif  # type: ignore  # noqa: F401
+except Exception:  # pragma: no cover
+    pillow_avif = None
+
+
+class ImageError(ValueError):
+    """The upload is not an image Pillow can decode (or is too large to)."""
+
+
+class Variant(NamedTuple):
+    width: int
+    height: int
+    content_type: str
+    data: bytes
+
+
+FORMATS = {"webp": ("WEBP", "image/webp"), "avif": ("AVIF", "image/avif")}
+
+
+def available_formats(wanted: Sequence[str]) -> List[str]:
+    """Keep the requested output formats this Pillow build can encode, in order."""
+    Image.init()
+    return [f for f in wanted if f in FORMATS and FORMATS[f][0] in Image.SAVE]
+
+
+def parse_aspect(spec: str) -> Optional[Tuple[int, int]]:
+    """ "16:9" -> (16, 9); empty or "original" keeps the uploaded aspect ratio."""
+    w, _, h = (spec or "").partition(":")
+    try:
+        aspect = (int(w), int(h))
+    except ValueError:
+        return None
+    return aspect if aspect[0] > 0 and aspect[1] > 0 else None
+
+
+def focal_crop_box(size: Tuple[int, int], aspect: Tuple[int, int], fx: float, fy: float) -> Tuple[int, int, int, int]:
+    """Largest box of `aspect` inside `size`, centred on the focal point (0..1) as far as the edges allow."""
+    width, height = size
+    crop_w = min(width, round(height * aspect[0] / aspect[1]))
+    crop_h = min(height, round(width * aspect[1] / aspect[0]))
+    fx = min(max(fx, 0.0), 1.0)
+    fy = min(max(fy, 0.0), 1.0)
+    left = min(max(round(fx * width - crop_w / 2), 0), width - crop_w)
+    top = min(max(round(fy * height - crop_h / 2), 0), height - crop_h)
+    return left, top, left + crop_w, top + crop_h
+
+
+def process_cover(
+    source: Union[bytes, str],
+    widths: Sequence[int],
+    formats: Sequence[str] = ("webp",),
+    aspect: Optional[Tuple[int, int]] = (16, 9),
+    focal: Tuple[float, float] = (0.5, 0.5),
+    quality: int = 80,
+    max_pixels: int = 50_000_000,
+) -> List[Variant]:
+    """Return one variant per (width, format), smallest first; `source` is the upload's bytes or a file path.
+
+    Widths larger than the cropped source collapse into the source width, so
+    nothing is upscaled. Re-encoding from pixels discards EXIF/XMP/ICC, so
+    GPS tags and camera details never reach the bucket; the EXIF orientation
+    is applied first.
+    """
+    try:
+        with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+            if img.width * img.height > max_pixels:
+                raise ImageError("image too large")
+            img = ImageOps.exif_transpose(img)
+            img.load()
+    except ImageError:
+        raise
+    except Exception as e:  # Pillow raises a zoo of types for corrupt input
+        raise ImageError(str(e) or "cannot decode image") from e
+    img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P", "PA") and _has_alpha(img) else "RGB")
+    if aspect:
+        img = img.crop(focal_crop_box(img.size, aspect, *focal))
+    targets = sorted({min(w, img.width) for w in widths if w > 0}) or [img.width]
+    variants: List[Variant] = []
+    for width in targets:
+        height = max(1, round(img.height * width / img.width))
+        resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            pil_format, content_type = FORMATS[fmt]
+            out = BytesIO()
+            resized.save(out, pil_format, quality=quality)
+            variants.append(Variant(width, height, content_type, out.getvalue()))
+    return variants
+
+
+def _has_alpha(img: Image.Image) -> bool:
+    if img.mode == "P":
+        return "transparency" in img.info
+    return True
@@ -1,31 +1,61 @@
-from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi import Query, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any, Set, Tuple
+from typing import Optional, List, Dict, Any, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
+import base64
+import hashlib
+import hmac
 import time
 import re
 import json
 import os
-from pathlib import Path
-
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
-from google.oauth2 import service_account
-try:
-    from google.cloud import firestore  # type: ignore
-except Exception:  # pragma: no cover
-    firestore = None  # type: ignore
-try:
-    from google.cloud import storage  # type: ignore
-except Exception:  # pragma: no cover
-    storage = None  # type: ignore
+import threading
+import asyncio
+import heapq
+import tempfile
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from starlette.staticfiles import StaticFiles
+import anyio.to_thread
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import bulk
+from cache import TTLCache
+from credentials import load_service_account
+import images
+from media_storage import GCSStorage, LocalStorage, MediaIndex, MediaStorage
+from metrics import BackendMetrics, CallbackMetric, Instrumented, MetricsMiddleware, Registry
+from ratelimit import Limit, MemoryBackend, RateLimiter, SQLiteBackend, parse_limits
+from search_index import SearchIndex
+from stores import FirestoreStore, MemoryStore, SQLiteStore, Store
+from stores.base import WRITE_METHODS
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup: size the threadpool, then warm up (clients, store probe, seed) once.
+
+    A failed warm-up does not stop the process: /api/v1/ready reports 503 and
+    retries it, while /api/v1/health keeps answering for liveness checks.
+    """
+    _configure_threadpool()
+    await run_in_threadpool(warm_up)
+    try:
+        yield
+    finally:
+        _flush_views()
+        _snapshot_search_index()
+        _stop_image_pool()
 
 
-app = FastAPI(title="Blog API (Python)", version="0.1.0")
+app = FastAPI(title="Blog API (Python)", version="0.1.0", lifespan=lifespan)
 
 # CORS origins: from env CORS_ORIGINS (comma-separated), fallback to local dev
 origins_env = (os.getenv("CORS_ORIGINS") or "").strip()
@@ -40,8 +70,17 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"],
 )
+
+
+def _configure_threadpool():
+    # Sync handlers and run_in_threadpool share this limiter; every Firestore/GCS call blocks one worker
+    if THREADPOOL_SIZE > 0:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
 # Feature flags and limits (env-configurable)
 def _env_bool(name: str, default: bool = False) -> bool:
     val = (os.getenv(name) or "").strip().lower()
@@ -52,13 +91,53 @@ def _env_bool(name: str, default: bool = False) -> bool:
     return default
 
 ALLOW_UNAUTH_WRITE = _env_bool("ALLOW_UNAUTH_WRITE", False)
+SEED_DEMO_ARTICLE = _env_bool("SEED_DEMO_ARTICLE", True)  # create the welcome article at startup when the store is empty
+METRICS_ENABLED = (os.getenv("METRICS_ENABLED") or "true").strip().lower() in ("1", "true", "yes")
+METRICS_TOKEN = (os.getenv("METRICS_TOKEN") or "").strip()  # when set, /api/v1/metrics requires "Bearer <token>"
+ADMIN_UIDS = {u.strip() for u in (os.getenv("ADMIN_UIDS") or "").split(",") if u.strip()}  # may use /api/v1/admin/*
 UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES") or str(10 * 1024 * 1024))  # 10 MB default
 RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS") or "5")
 RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST") or "10")
-
-
-# Very small in-memory token bucket (single-process)
-_rate_buckets: Dict[str, Tuple[float, float]] = {}
+RATE_LIMITS = (os.getenv("RATE_LIMITS") or "").strip()  # per-route overrides, e.g. "uploads=0.2:3,comments=1:5"
+RATE_LIMIT_ROUTES = ("articles", "comments", "likes", "bookmarks", "subscriptions", "uploads")  # names RATE_LIMITS may use
+RATE_LIMIT_BACKEND = (os.getenv("RATE_LIMIT_BACKEND") or "memory").strip().lower()  # memory | sqlite (shared by workers)
+RATE_LIMIT_PATH = (os.getenv("RATE_LIMIT_PATH") or "ratelimit.db").strip()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS") or "100000")  # LRU bound for the memory backend
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT") or "20")
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX") or "100")
+SEARCH_INDEX_PATH = (os.getenv("SEARCH_INDEX_PATH") or "").strip()  # optional snapshot file
+SEARCH_INDEX_SYNC_SECONDS = float(os.getenv("SEARCH_INDEX_SYNC_SECONDS") or "30")  # catch up with other processes' writes
+SEARCH_INDEX_REBUILD_SECONDS = float(os.getenv("SEARCH_INDEX_REBUILD_SECONDS") or "3600")  # full re-read; 0 = never
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE") or "10000")  # verified ID tokens kept in memory
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS") or "30")  # matches the public Cache-Control max-age
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES") or "1000")  # per cache; 0 disables caching
+FOLLOWING_FEED_TTL_SECONDS = float(os.getenv("FOLLOWING_FEED_TTL_SECONDS") or "15")  # per-user merged feed cache
+FOLLOWING_FEED_DEPTH = int(os.getenv("FOLLOWING_FEED_DEPTH") or "100")  # entries materialized per user
+FOLLOWING_FEED_MAX_AUTHORS = int(os.getenv("FOLLOWING_FEED_MAX_AUTHORS") or "500")  # most recently followed first
+FOLLOWING_FEED_FANOUT = int(os.getenv("FOLLOWING_FEED_FANOUT") or "16")  # concurrent per-author queries per request
+VIEWS_FLUSH_INTERVAL = float(os.getenv("VIEWS_FLUSH_INTERVAL") or "10")  # seconds; 0 writes every view through
+VIEWS_SHARDS = int(os.getenv("VIEWS_SHARDS") or "0")  # >0 enables sharded view counters for hot articles
+VIEWS_HOT_THRESHOLD = int(os.getenv("VIEWS_HOT_THRESHOLD") or "50")  # views per flush that make an article hot
+STORE_BACKEND = (os.getenv("STORE_BACKEND") or "").strip().lower()  # memory | firestore | sqlite; empty picks Firestore if configured
+SQLITE_PATH = (os.getenv("SQLITE_PATH") or "blog.db").strip()
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE") or "0")  # worker threads for blocking I/O; 0 keeps the anyio default (40)
+MEDIA_STORAGE = (os.getenv("MEDIA_STORAGE") or "gcs").strip().lower()  # gcs | local
+MEDIA_DIR = (os.getenv("MEDIA_DIR") or "media").strip()  # MEDIA_STORAGE=local only
+MEDIA_BASE_URL = (os.getenv("MEDIA_BASE_URL") or "/media").strip()
+MEDIA_INDEX_PATH = (os.getenv("MEDIA_INDEX_PATH") or "media_index.db").strip()  # content hash -> stored cover variants
+COVER_WIDTHS = [int(w) for w in (os.getenv("COVER_WIDTHS") or "480,768,1200,1600").split(",") if w.strip()]
+COVER_FORMATS = images.available_formats([f.strip().lower() for f in (os.getenv("COVER_FORMATS") or "webp,avif").split(",")]) or ["webp"]
+COVER_ASPECT = images.parse_aspect(os.getenv("COVER_ASPECT") or "16:9")
+COVER_QUALITY = int(os.getenv("COVER_QUALITY") or "80")
+UPLOAD_CHUNK_BYTES = 256 * 1024
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS") or "2")  # processes for cover encoding; 0 encodes in the threadpool
+
+
+rate_limiter = RateLimiter(
+    SQLiteBackend(RATE_LIMIT_PATH) if RATE_LIMIT_BACKEND == "sqlite" else MemoryBackend(RATE_LIMIT_MAX_KEYS),
+    Limit(RATE_LIMIT_RPS, RATE_LIMIT_BURST),
+    parse_limits(RATE_LIMITS, RATE_LIMIT_ROUTES),
+)
 
 def _rate_key(request: Request, uid: Optional[str]) -> str:
     try:
@@ -67,19 +146,14 @@ def _rate_key(request: Request, uid: Optional[str]) -> str:
         ip = ""
     return uid or ip or "anon"
 
-def _rate_allow(key: str) -> bool:
-    if RATE_LIMIT_RPS <= 0:
-        return True
-    now = time.monotonic()
-    tokens, last = _rate_buckets.get(key, (RATE_LIMIT_BURST * 1.0, now))
-    # refill
-    tokens = min(RATE_LIMIT_BURST * 1.0, tokens + (now - last) * RATE_LIMIT_RPS)
-    if tokens >= 1.0:
-        tokens -= 1.0
-        _rate_buckets[key] = (tokens, now)
-        return True
-    _rate_buckets[key] = (tokens, now)
-    return False
+def _rate_limit(request: Request, route: str, uid: Optional[str]) -> None:
+    decision = rate_limiter.check(route, _rate_key(request, uid))
+    if decision is None:
+        return
+    # add_cache_headers copies these onto the successful response
+    request.state.rate_limit = decision
+    if not decision.allowed:
+        raise HTTPException(status_code=429, detail={"error": "rate limit"}, headers=decision.headers())
 
 
 def _sniff_image_type(head: bytes) -> Optional[str]:
@@ -100,54 +174,90 @@ def _sniff_image_type(head: bytes) -> Optional[str]:
 app.add_middleware(GZipMiddleware, minimum_size=500)
 
 
-# Firestore client (lazy)
-def _load_firestore_client():
-    if firestore is None:
-        return None
+class UploadSizeLimit:
+    """Refuse upload bodies over UPLOAD_MAX_BYTES while they stream in.
 
-    def client_from_json(json_text: str):
-        try:
-            info = json.loads(json_text)
-            creds = service_account.Credentials.from_service_account_info(info)
-            project_id = info.get("project_id")
-            return firestore.Client(project=project_id, credentials=creds)
-        except Exception:
-            return None
+    Starlette spools the whole multipart form to disk before the handler runs,
+    so a check in the handler only fires after a 2 GB body has been received.
+    The HTTPException is raised from inside form parsing, so it still goes
+    through the app's exception handling (JSON body, CORS headers).
+    """
 
-    # 1) Preferred: env var with full JSON
-    json_str = (os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON") or "").strip()
-    client = client_from_json(json_str) if json_str else None
+    FORM_OVERHEAD = 64 * 1024  # boundaries, part headers and the small text fields
 
-    # 2) Alternative: env var with a file path
-    if client is None:
-        json_path = (os.getenv("FIREBASE_SERVICE_ACCOUNT_FILE") or "").strip()
-        if json_path:
-            try:
-                json_str = Path(json_path).read_text(encoding="utf-8").strip()
-                client = client_from_json(json_str)
-            except Exception:
-                client = None
+    def __init__(self, app, prefix: str):
+        self.app = app
+        self.prefix = prefix
 
-    # 3) Render Secret Files default mount: /etc/secrets/<filename>
-    if client is None:
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            return await self.app(scope, receive, send)
+        limit = UPLOAD_MAX_BYTES + self.FORM_OVERHEAD
+        declared = dict(scope.get("headers") or []).get(b"content-length")
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            if declared is not None and declared.isdigit() and int(declared) > limit:
+                raise HTTPException(status_code=413, detail={"error": "file too large"})
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise HTTPException(status_code=413, detail={"error": "file too large"})
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadSizeLimit, prefix="/api/v1/upload/")
+
+
+# Prometheus metrics (see metrics.py), scraped at GET /api/v1/metrics
+metrics_registry = Registry()
+backend_metrics = BackendMetrics(metrics_registry)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry, backend=backend_metrics)
+
+
+# Google Cloud SDKs are imported on first use: most of a cold start otherwise goes to
+# loading google.cloud.firestore / storage even when no service account is configured.
+# Tests swap a fake module in as `firestore`.
+firestore: Any = None
+storage: Any = None
+_missing_sdks: set = set()
+
+
+def _firestore_module():
+    global firestore
+    if firestore is None and "firestore" not in _missing_sdks:
         try:
-            secrets_dir = Path("/etc/secrets")
-            if secrets_dir.exists():
-                candidates = list(secrets_dir.glob("*.json")) or list(secrets_dir.iterdir())
-                for p in candidates:
-                    if not p.is_file():
-                        continue
-                    try:
-                        json_str = p.read_text(encoding="utf-8").strip()
-                        client = client_from_json(json_str)
-                        if client is not None:
-                            break
-                    except Exception:
-                        continue
-        except Exception:
-            client = None
+            from google.cloud import firestore as module  # type: ignore
+            firestore = module
+        except Exception:  # pragma: no cover
+            _missing_sdks.add("firestore")
+    return firestore
+
+
+def _storage_module():
+    global storage
+    if storage is None and "storage" not in _missing_sdks:
+        try:
+            from google.cloud import storage as module  # type: ignore
+            storage = module
+        except Exception:  # pragma: no cover
+            _missing_sdks.add("storage")
+    return storage
 
-    return client
+
+# Firestore client (lazy)
+def _load_firestore_client():
+    account = load_service_account()
+    if account is None or _firestore_module() is None:
+        return None
+    try:
+        return firestore.Client(project=account.project_id, credentials=account.credentials)
+    except Exception:
+        return None
 
 
 _fs_client = None  # type: ignore
@@ -169,34 +279,11 @@ def gcs_client():
     global _gcs_client
     if _gcs_client is not None:
         return _gcs_client
-    if storage is None:
+    account = load_service_account()
+    if account is None or _storage_module() is None:
         return None
     try:
-        json_str = (os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON") or "").strip()
-        if not json_str:
-            json_path = (os.getenv("FIREBASE_SERVICE_ACCOUNT_FILE") or "").strip()
-            if json_path:
-                try:
-                    json_str = Path(json_path).read_text(encoding="utf-8").strip()
-                except Exception:
-                    json_str = ""
-        if not json_str:
-            secrets_dir = Path("/etc/secrets")
-            if secrets_dir.exists():
-                for p in (list(secrets_dir.glob("*.json")) or list(secrets_dir.iterdir())):
-                    if p.is_file():
-                        try:
-                            json_str = p.read_text(encoding="utf-8").strip()
-                            json.loads(json_str)
-                            break
-                        except Exception:
-                            continue
-        if not json_str:
-            return None
-        info = json.loads(json_str)
-        creds = service_account.Credentials.from_service_account_info(info)
-        project_id = info.get("project_id")
-        _gcs_client = storage.Client(project=project_id, credentials=creds)
+        _gcs_client = storage.Client(project=account.project_id, credentials=account.credentials)
         return _gcs_client
     except Exception:
         return None
@@ -213,6 +300,10 @@ async def add_cache_headers(request: Request, call_next):
         # Avoid caching for user-specific endpoints
         if "/likes" not in path and "/bookmark" not in path and "/comments" not in path and "/users/" not in path:
             response.headers.setdefault("Cache-Control", "public, max-age=30, stale-while-revalidate=60")
+    decision = getattr(request.state, "rate_limit", None)
+    if decision is not None:
+        for name, value in decision.headers().items():
+            response.headers.setdefault(name, value)
     return response
 
 
@@ -234,6 +325,47 @@ def compute_reading_time_minutes(text: str) -> int:
     return minutes
 
 
+EXCERPT_MAX_CHARS = 200
+
+
+def make_excerpt(text: str, max_chars: int = EXCERPT_MAX_CHARS) -> str:
+    """Plain-text preview of article content (HTML from Trix, Markdown or EditorJS text)."""
+    plain = re.sub(r"<[^>]+>", " ", text or "")
+    plain = re.sub(r"[#>*_`~\[\]]+", " ", plain)
+    plain = re.sub(r"\s+", " ", plain).strip()
+    if len(plain) <= max_chars:
+        return plain
+    cut = plain[:max_chars].rsplit(" ", 1)[0] or plain[:max_chars]
+    return cut.rstrip(" .,;:-") + "…"
+
+
+# Fields rendered by feed cards; list endpoints return only these unless fields=full
+CARD_FIELDS: List[str] = [
+    "slug", "title", "subtitle", "excerpt", "is_published",
+    "created_at", "updated_at", "created_by", "created_by_name", "created_by_photo",
+    "tags", "category", "reading_time_minutes", "likes", "views", "comments_count",
+    "cover_url", "cover_alt", "cover_focal_x", "cover_focal_y", "cover_caption",
+]
+# Names a `fields` list may ask for; anything else would reach Firestore select() as a field path
+SELECTABLE_FIELDS = frozenset(CARD_FIELDS + ["content"])
+
+
+def _resolve_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Map the `fields` query param to a field list; None means the full document."""
+    value = (fields or "card").strip()
+    if value.lower() == "full":
+        return None
+    if value.lower() == "card":
+        return CARD_FIELDS
+    names = {f.strip() for f in value.split(",") if f.strip()}
+    unknown = names - SELECTABLE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail={"error": "unknown fields", "fields": sorted(unknown)})
+    # slug/created_at are needed for cursors and links; comments_count is always reported.
+    # Sorted, so differently ordered lists share one cache entry.
+    return list(dict.fromkeys(["slug", "created_at", "comments_count"] + sorted(names)))
+
+
 class ArticleCreate(BaseModel):
     title: Optional[str] = "Untitled"
     subtitle: Optional[str] = ""
@@ -269,92 +401,437 @@ class CommentCreate(BaseModel):
     author: Optional[str] = None
 
 
-# In-memory stores (fallback if Firestore is not configured)
-articles_by_slug: Dict[str, Dict[str, Any]] = {}
-comments_by_slug: Dict[str, List[Dict[str, Any]]] = {}
-likes_by_slug: Dict[str, Set[str]] = {}
-bookmarks_by_slug: Dict[str, Set[str]] = {}
-subscriptions_by_author: Dict[str, Set[str]] = {}
+# Storage backend (see stores/): STORE_BACKEND, or Firestore when credentials
+# are available and in-process dicts otherwise. Routes only talk to the Store interface.
+memory_store = MemoryStore()
+_firestore_store: Optional[FirestoreStore] = None
+_sqlite_store: Optional[SQLiteStore] = None
+_store_lock = threading.Lock()
+
+
+_instrumented_store: Optional[Instrumented] = None
+
+
+def get_store() -> Store:
+    """The configured backend; with METRICS_ENABLED every call on it is counted and timed."""
+    global _instrumented_store
+    store = _backend_store()
+    if not METRICS_ENABLED:
+        return store
+    wrapped = _instrumented_store
+    if wrapped is None or wrapped.target is not store:
+        wrapped = _instrumented_store = Instrumented(store, store.name, backend_metrics, WRITE_METHODS)
+    return wrapped  # type: ignore[return-value]
+
+
+def _backend_store() -> Store:
+    global _firestore_store, _sqlite_store
+    if STORE_BACKEND == "sqlite":
+        if _sqlite_store is None:
+            with _store_lock:
+                if _sqlite_store is None:
+                    _sqlite_store = SQLiteStore(SQLITE_PATH)
+        return _sqlite_store
+    if STORE_BACKEND == "memory":
+        return memory_store
+    client = fs_client()
+    if client is None:
+        return memory_store
+    if _firestore_store is None or _firestore_store.client is not client:
+        _firestore_store = FirestoreStore(client, firestore)
+    return _firestore_store
+
+
+# Cursor pagination: opaque token encoding the (sort key, tie-breaker) of the last item
+def _encode_cursor(key: Tuple[str, str]) -> str:
+    raw = json.dumps(list(key), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, tie = json.loads(raw.decode("utf-8"))
+        return (str(sort_key), str(tie))
+    except Exception:
+        raise HTTPException(status_code=400, detail={"error": "invalid cursor"})
+
+
+def _split_page(items: List[Dict[str, Any]], limit: int, key) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Callers fetch limit+1 items; the extra one only signals that another page exists
+    if len(items) > limit:
+        items = items[:limit]
+        return items, _encode_cursor(key(items[-1]))
+    return items, None
+
+
+def _page(response: Response, items: List[Dict[str, Any]], limit: int, key) -> List[Dict[str, Any]]:
+    items, next_cursor = _split_page(items, limit, key)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+def _article_key(a: Dict[str, Any]) -> Tuple[str, str]:
+    return (a.get("created_at", ""), a.get("slug", ""))
+
+
+def _comment_key(c: Dict[str, Any]) -> Tuple[str, str]:
+    return (c.get("created_at", ""), c.get("id", ""))
+
+
+# Conditional GETs: serialize the payload once, hash it into an ETag and answer
+# 304 Not Modified when the client's If-None-Match already has that version.
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _etag(body: bytes, weak: bool = False) -> str:
+    tag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    return "W/" + tag if weak else tag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def _conditional_json(request: Request, response: Response, payload: Any, etag: Optional[str] = None) -> Response:
+    """Return `payload` as JSON with an ETag, or an empty 304 if the client is current.
+
+    Pass a precomputed `etag` to decide on 304 without serializing the payload.
+    """
+    body = None
+    if etag is None:
+        body = _dumps(payload)
+        etag = _etag(body)
+    headers = dict(response.headers)
+    headers["ETag"] = etag
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        headers.pop("content-length", None)
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body = _dumps(payload)
+    headers.pop("content-length", None)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Cyrillic -> Latin for slugs (Russian, plus the Ukrainian/Belarusian letters); applied
+# before NFKD so that й and ё are not split into и/е plus a combining mark
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    "і": "i", "ї": "yi", "є": "ye", "ґ": "g", "ў": "u",
+})
+SLUG_MAX_LENGTH = 80
 
 
 def slugify(title: str) -> str:
-    s = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
-    # Avoid reserved slug 'untitled' collision by appending number for new articles
-    if s == "untitled":
-        idx = 1
-        base = s
-        # Check in-memory store
-        if not using_firestore():
-            while f"{base}-{idx}" in articles_by_slug:
-                idx += 1
-            return f"{base}-{idx}"
-        # Firestore mode
-        client = fs_client()
+    """Readable ASCII slug base for a title ("Добро пожаловать" -> "dobro-pozhalovat").
+
+    Cyrillic is transliterated and Latin accents dropped; titles with nothing
+    left become "untitled". Uniqueness is the store's job (create_unique).
+    """
+    text = unicodedata.normalize("NFKD", title.lower().translate(_TRANSLIT))
+    s = re.sub(r"[^a-z0-9]+", "-", text.encode("ascii", "ignore").decode("ascii")).strip("-")
+    if len(s) > SLUG_MAX_LENGTH:
+        cut = s[:SLUG_MAX_LENGTH + 1]
+        s = (cut.rsplit("-", 1)[0] if "-" in cut else cut[:SLUG_MAX_LENGTH]).strip("-")
+    return s or "untitled"
+
+
+def _comments_count(data: Dict[str, Any]) -> int:
+    # Denormalized counter maintained by add_comment (see reconcile_comments_count)
+    try:
+        return int(data.get("comments_count") or 0)
+    except Exception:
+        return 0
+
+
+def reconcile_comments_count() -> int:
+    """Backfill/repair `comments_count` on every article from its comments.
+
+    One-shot maintenance routine (see manage.py); returns the number of fixed articles.
+    """
+    store = get_store()
+    fixed = 0
+    for a in store.iter_articles(["slug", "comments_count"]):
+        actual = store.count_comments(a["slug"])
+        if a.get("comments_count") != actual:
+            store.update(a["slug"], {"comments_count": actual})
+            fixed += 1
+    return fixed
+
+
+def reconcile_subscriber_counts() -> int:
+    """Recompute every author's `subscriber_count` from the follow edges; returns the number fixed."""
+    return get_store().reconcile_subscriber_counts()
+
+
+def backfill_excerpts() -> int:
+    """Compute `excerpt` for articles created before card projections existed."""
+    store = get_store()
+    fixed = 0
+    for a in store.iter_articles(["slug", "content", "excerpt"]):
+        excerpt = make_excerpt(a.get("content") or "")
+        if a.get("excerpt") != excerpt:
+            store.update(a["slug"], {"excerpt": excerpt})
+            fixed += 1
+    return fixed
+
+
+# Full-text search index (see search_index.py); built lazily on the first search, then kept
+# in step with writes from other processes (workers, instances, manage.py) by periodic syncs
+search_index = SearchIndex()
+_search_index_loaded = False
+_search_index_lock = threading.Lock()
+_search_synced = 0.0  # monotonic time of the last sync
+_search_rebuilt = 0.0  # monotonic time of the last full read (or of the restore)
+SEARCH_INDEX_FIELDS = ["slug", "title", "subtitle", "content", "created_at"]
+SEARCH_SYNC_OVERLAP_SECONDS = 60.0  # each catch-up re-reads this much before the previous one
+
+
+def _rebuild_search_index(store: Store):
+    """Re-read every article into a fresh index and swap it in; searches keep using the old one meanwhile.
+
+    Besides clock-skewed writes this picks up what a catch-up cannot see:
+    deletes, and imports that keep their original timestamps.
+    """
+    global search_index
+    fresh = SearchIndex()
+    fresh.rebuild(store.iter_articles(SEARCH_INDEX_FIELDS))
+    # writes applied to the old index during the read are re-read by the next catch-up
+    search_index = fresh
+
+
+def _ensure_search_index():
+    global _search_index_loaded, _search_synced, _search_rebuilt
+    now = time.monotonic()
+    if _search_index_loaded:
+        if now - _search_synced < SEARCH_INDEX_SYNC_SECONDS:
+            return
+        # one request syncs; concurrent ones keep serving the current index
+        if not _search_index_lock.acquire(blocking=False):
+            return
+    else:
+        _search_index_lock.acquire()
+    try:
+        store = get_store()
+        if not _search_index_loaded:
+            # The in-memory store starts empty on every boot, so a snapshot would only be stale
+            if store.persistent and SEARCH_INDEX_PATH and search_index.restore(SEARCH_INDEX_PATH):
+                # Catch up with writes made since the snapshot's last sync
+                search_index.catch_up(lambda since: store.iter_articles(SEARCH_INDEX_FIELDS, since=since), SEARCH_SYNC_OVERLAP_SECONDS)
+            else:
+                _rebuild_search_index(store)
+            _search_rebuilt = now
+            _search_index_loaded = True
+        elif SEARCH_INDEX_REBUILD_SECONDS > 0 and now - _search_rebuilt >= SEARCH_INDEX_REBUILD_SECONDS:
+            _rebuild_search_index(store)
+            _search_rebuilt = now
+        else:
+            search_index.catch_up(lambda since: store.iter_articles(SEARCH_INDEX_FIELDS, since=since), SEARCH_SYNC_OVERLAP_SECONDS)
+        _search_synced = now
+    finally:
+        _search_index_lock.release()
+
+
+def _search_add(data: Dict[str, Any]):
+    # backends with their own full-text index keep it current in the same write
+    if not get_store().native_search:
+        search_index.add_article(data)
+
+
+def _search_remove(slug: str):
+    if not get_store().native_search:
+        search_index.remove(slug)
+
+
+def _snapshot_search_index():
+    if SEARCH_INDEX_PATH and _search_index_loaded:
         try:
-            while client and client.collection("articles").document(f"{base}-{idx}").get().exists:
-                idx += 1
+            search_index.snapshot(SEARCH_INDEX_PATH)
         except Exception:
             pass
-        return f"{base}-{idx}"
-    return s or "untitled"
 
 
-def ensure_seed():
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        # Seed only if no articles exist
-        try:
-            docs = list(client.collection("articles").limit(1).stream())
-            if docs:
+# Read-through caches: article documents by slug and home feed pages
+article_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, name="articles")
+feed_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, name="feed")
+# Per-user following feed: followed authors plus the merged (created_at, slug) keys
+following_feed_cache = TTLCache(CACHE_MAX_ENTRIES, FOLLOWING_FEED_TTL_SECONDS, name="following_feed")
+
+
+def _invalidate_article(slug: str):
+    """Drop cached copies after a write that changes the article or its counters."""
+    article_cache.delete(slug)
+    feed_cache.clear()
+
+
+def export_articles():
+    """NDJSON lines for every article with its comments, likes and bookmarks (see bulk.py)."""
+    return bulk.export_ndjson(get_store())
+
+
+def articles_importer(on_conflict: str = "rename") -> bulk.Importer:
+    """An Importer for the current store that keeps the search index and caches in step."""
+
+    def after_chunk(articles: List[Dict[str, Any]]):
+        for a in articles:
+            _search_add(a)
+        feed_cache.clear()
+
+    return bulk.Importer(get_store(), on_conflict=on_conflict, on_chunk=after_chunk)
+
+
+class ViewCounter:
+    """Aggregates article views in memory and flushes them to the store in batches.
+
+    Each article gets at most one write per flush interval instead of one per
+    page view. Deltas that fail to write are re-queued, and the remainder is
+    flushed on shutdown. Hot articles (VIEWS_SHARDS > 0) spread their writes
+    over sharded counters to stay under Firestore's per-document write limit.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, slug: str) -> int:
+        with self._lock:
+            self._pending[slug] = self._pending.get(slug, 0) + 1
+            pending = self._pending[slug]
+        if self.interval <= 0:
+            self.flush()
+        elif self._thread is None:
+            self.start()
+        return pending
+
+    def pending(self, slug: str) -> int:
+        with self._lock:
+            return self._pending.get(slug, 0)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
                 return
-        except Exception:
-            # If Firestore failed, skip seeding to avoid blocking API
-            return
-        slug = "welcome"
-        article = {
-            "slug": slug,
-            "title": "Добро пожаловать",
-            "subtitle": "Стартовая статья для проверки UI",
-            "content": "# Привет!\n\nЭто демо-статья. Вы можете отредактировать или удалить её.",
-            "is_published": True,
-            "likes": 0,
-            "views": 0,
-            "created_at": now_iso(),
-            "created_by": "system",
-            "created_by_name": "System",
-            "created_by_email": "",
-            "created_by_photo": "",
-            "tags": [],
-            "category": CATEGORIES[0],
-            "reading_time_minutes": compute_reading_time_minutes("# Привет!\n\nЭто демо-статья. Вы можете отредактировать или удалить её."),
-        }
-        client.collection("articles").document(slug).set(article)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _requeue(self, deltas: Dict[str, int]):
+        with self._lock:
+            for slug, delta in deltas.items():
+                self._pending[slug] = self._pending.get(slug, 0) + delta
+
+    def flush(self) -> int:
+        """Write pending deltas; returns the number of views persisted."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, {}
+            if not deltas:
+                return 0
+            try:
+                written, retry = get_store().add_views(deltas, VIEWS_SHARDS, VIEWS_HOT_THRESHOLD)
+            except Exception:
+                written, retry = 0, deltas
+            if retry:
+                self._requeue(retry)
+            # cached documents carry the stored view count, which just changed
+            for slug in deltas:
+                article_cache.delete(slug)
+            return written
+
+
+view_counter = ViewCounter(VIEWS_FLUSH_INTERVAL)
+
+
+def _flush_views():
+    view_counter.stop()
+
+
+def seed_if_empty(store: Store):
+    """Create the demo article when the store has no articles (SEED_DEMO_ARTICLE)."""
+    if not store.is_empty():
         return
+    content = "# Привет!\n\nЭто демо-статья. Вы можете отредактировать или удалить её."
+    article = {
+        "slug": "welcome",
+        "title": "Добро пожаловать",
+        "subtitle": "Стартовая статья для проверки UI",
+        "content": content,
+        "is_published": True,
+        "likes": 0,
+        "views": 0,
+        "comments_count": 0,
+        "created_at": now_iso(),
+        "created_by": "system",
+        "created_by_name": "System",
+        "created_by_email": "",
+        "created_by_photo": "",
+        "tags": [],
+        "category": CATEGORIES[0],
+        "reading_time_minutes": compute_reading_time_minutes(content),
+        "excerpt": make_excerpt(content),
+    }
+    store.create(article)
+    _search_add(article)
+
+
+# Readiness: set by warm_up() once clients are loaded and the store has answered
+_readiness: Dict[str, Any] = {"ready": False, "error": None, "store": None}
+_warm_up_lock = threading.Lock()
 
-    if not articles_by_slug:
-        slug = "welcome"
-        articles_by_slug[slug] = {
-            "slug": slug,
-            "title": "Добро пожаловать",
-            "subtitle": "Стартовая статья для проверки UI",
-            "content": "# Привет!\n\nЭто демо-статья. Вы можете отредактировать или удалить её.",
-            "is_published": True,
-            "likes": 0,
-            "views": 0,
-            "created_at": now_iso(),
-            "created_by": "system",
-            "created_by_name": "System",
-            "created_by_email": "",
-            "created_by_photo": "",
-            "tags": [],
-            "category": CATEGORIES[0],
-            "reading_time_minutes": compute_reading_time_minutes("# Привет!\n\nЭто демо-статья. Вы можете отредактировать или удалить её."),
-        }
-        comments_by_slug[slug] = []
-        likes_by_slug[slug] = set()
-        bookmarks_by_slug[slug] = set()
-        subscriptions_by_author.setdefault("system", set())
+
+def warm_up() -> bool:
+    """Load credentials and clients, probe the store and seed it if empty. Blocking; safe to retry."""
+    with _warm_up_lock:
+        if _readiness["ready"]:
+            return True
+        try:
+            fs_client()
+            if MEDIA_STORAGE == "gcs":
+                gcs_client()
+            store = get_store()
+            if SEED_DEMO_ARTICLE:
+                seed_if_empty(store)
+            else:
+                store.is_empty()
+        except Exception as e:
+            _readiness.update(ready=False, error=f"{type(e).__name__}: {e}")
+            return False
+        _readiness.update(ready=True, error=None, store=store.name)
+        return True
 
 
 @app.get("/api/v1/health")
@@ -362,91 +839,125 @@ def health_root():
     return {"status": "ok"}
 
 
+@app.get("/api/v1/ready")
+def readiness(response: Response):
+    # A failed startup is retried by the next probe instead of needing a restart
+    if not _readiness["ready"] and not warm_up():
+        response.status_code = 503
+        return {"status": "unavailable", "error": _readiness["error"]}
+    return {"status": "ready", "store": _readiness["store"]}
+
+
 @app.get("/api/v1/articles/health")
 def health_articles():
     return {"status": "ok"}
 
 
+def _cache_counters(field: str):
+    def collect() -> Dict[Tuple[str, ...], float]:
+        return {(c.name,): c.stats()[field] for c in (article_cache, feed_cache, following_feed_cache)}
+
+    return collect
+
+
+for _field, _type in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge")):
+    metrics_registry.register(CallbackMetric(
+        f"blog_cache_{_field}" + ("_total" if _type == "counter" else ""),
+        f"Read-through cache {_field}", ("cache",), _cache_counters(_field), type=_type,
+    ))
+
+
+@app.get("/api/v1/metrics")
+def get_metrics(authorization: Optional[str] = Header(default=None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401)
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/v1/cache/stats")
+def cache_stats():
+    return {
+        "articles": article_cache.stats(),
+        "feed": feed_cache.stats(),
+        "following_feed": following_feed_cache.stats(),
+    }
+
+
 @app.get("/api/v1/articles")
-def list_articles():
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        items: List[Dict[str, Any]] = []
-        for d in client.collection("articles").order_by("created_at", direction=firestore.Query.DESCENDING).stream():
-            data = d.to_dict() or {}
-            slug = data.get("slug", d.id)
-            # comments_count: count subcollection (MVP: simple len)
-            try:
-                comments = list(client.collection("articles").document(slug).collection("comments").stream())
-                data["comments_count"] = len(comments)
-            except Exception:
-                data["comments_count"] = 0
-            items.append(data)
-        return items
-
-    base_items = list(articles_by_slug.values())
-    base_items.sort(key=lambda a: a.get("created_at", ""), reverse=True)
-    enriched = []
-    for a in base_items:
-        slug = a.get("slug", "")
-        c = len(comments_by_slug.get(slug, []))
-        item = dict(a)
-        item["comments_count"] = c
-        enriched.append(item)
-    return enriched
+def list_articles(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
+    after = _decode_cursor(cursor)
+    projection = _resolve_fields(fields)
+    cache_key = (cursor or "", limit, tuple(projection) if projection is not None else "full")
+    page = feed_cache.get(cache_key)
+    if page is None:
+        items = get_store().list_recent(limit + 1, after, projection)
+        for item in items:
+            item["comments_count"] = _comments_count(item)
+        items, next_cursor = _split_page(items, limit, _article_key)
+        # the ETag is computed once per cached page, so revalidations skip serialization
+        page = (items, next_cursor, _etag(_dumps(items)))
+        feed_cache.set(cache_key, page)
+    items, next_cursor, etag = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return _conditional_json(request, response, items, etag=etag)
 
 
 @app.get("/api/v1/search")
-def search_articles(q: str = Query(default="")):
-    ensure_seed()
+def search_articles(
+    request: Request,
+    response: Response,
+    q: str = Query(default=""),
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
     query = (q or "").strip().lower()
     if not query:
         return []
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        # Firestore не поддерживает полнотекстовый поиск по contains — читаем список и фильтруем в памяти (MVP)
-        items = []
-        for d in client.collection("articles").order_by("created_at", direction=firestore.Query.DESCENDING).stream():
-            data = d.to_dict() or {}
-            hay = "\n".join([str(data.get("title", "")), str(data.get("subtitle", "")), str(data.get("content", ""))]).lower()
-            if query in hay:
-                slug = data.get("slug", d.id)
-                try:
-                    comments = list(client.collection("articles").document(slug).collection("comments").stream())
-                    data["comments_count"] = len(comments)
-                except Exception:
-                    data["comments_count"] = 0
-                items.append(data)
-        return items
-
-    def matches(a: Dict[str, Any]) -> bool:
-        return any(
-            query in str(a.get(field, "")).lower()
-            for field in ("title", "subtitle", "content")
-        )
-    items = [a for a in articles_by_slug.values() if matches(a)]
-    items.sort(key=lambda a: a.get("created_at", ""), reverse=True)
-    enriched = []
-    for a in items:
-        slug = a.get("slug", "")
-        c = len(comments_by_slug.get(slug, []))
-        item = dict(a)
-        item["comments_count"] = c
-        enriched.append(item)
-    return enriched
+    after = _decode_cursor(cursor)
+    projection = _resolve_fields(fields)
+    # Results are ranked, so the cursor carries the offset into the ranking
+    try:
+        offset = int(after[0]) if after else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail={"error": "invalid cursor"})
+    store = get_store()
+    if store.native_search:
+        hits = store.search(query, offset + limit + 1)[offset:]
+    else:
+        _ensure_search_index()
+        hits = search_index.search(query, limit=offset + limit + 1)[offset:]
+    if len(hits) > limit:
+        hits = hits[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor((str(offset + limit), ""))
+    slugs = [slug for slug, _ in hits]
+
+    # Rank first, then fetch only the page of hits in one round trip
+    docs = store.get_many(slugs, projection)
+    items: List[Dict[str, Any]] = []
+    for slug in slugs:
+        data = docs.get(slug)
+        if data is None:
+            _search_remove(slug)
+            continue
+        data["comments_count"] = _comments_count(data)
+        items.append(data)
+    return _conditional_json(request, response, items)
 
 
 @app.post("/api/v1/articles", status_code=201)
 def create_article(body: ArticleCreate, authorization: Optional[str] = Header(default=None), request: Request = None):
-    ensure_seed()
     user = _verify_user(authorization)
     # rate limit per user (fallback IP if missing)
     uid_key = (user.get("user_id") or user.get("uid") or "").strip()
-    if not _rate_allow(_rate_key(request, uid_key)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
+    _rate_limit(request, "articles", uid_key)
     uid = (user.get("user_id") or user.get("uid") or "").strip()
     author_name = (user.get("name") or user.get("email") or "").strip()
     author_email = (user.get("email") or "").strip()
@@ -462,46 +973,8 @@ def create_article(body: ArticleCreate, authorization: Optional[str] = Header(de
         provided_minutes = None
     reading_minutes = provided_minutes if (provided_minutes is not None and provided_minutes > 0) else compute_reading_time_minutes(body.content or "")
 
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        slug = base
-        idx = 1
-        while client.collection("articles").document(slug).get().exists:
-            idx += 1
-            slug = f"{base}-{idx}"
-        article = {
-            "slug": slug,
-            "title": title,
-            "subtitle": (body.subtitle or ""),
-            "content": (body.content or ""),
-            "is_published": True if body.is_published is None else bool(body.is_published),
-            "created_at": now_iso(),
-            "likes": 0,
-            "views": 0,
-            "created_by": uid or "",
-            "created_by_name": author_name,
-            "created_by_email": author_email,
-            "created_by_photo": author_photo,
-            "tags": list(body.tags or []),
-            "category": (body.category or CATEGORIES[0]),
-            "reading_time_minutes": reading_minutes,
-            "cover_url": body.cover_url,
-            "cover_alt": body.cover_alt,
-            "cover_focal_x": body.cover_focal_x,
-            "cover_focal_y": body.cover_focal_y,
-            "cover_caption": body.cover_caption,
-        }
-        client.collection("articles").document(slug).set(article)
-        return article
-
-    slug = base
-    idx = 1
-    while slug in articles_by_slug:
-        idx += 1
-        slug = f"{base}-{idx}"
+    store = get_store()
     article = {
-        "slug": slug,
         "title": title,
         "subtitle": (body.subtitle or ""),
         "content": (body.content or ""),
@@ -509,6 +982,7 @@ def create_article(body: ArticleCreate, authorization: Optional[str] = Header(de
         "created_at": now_iso(),
         "likes": 0,
         "views": 0,
+        "comments_count": 0,
         "created_by": uid or "",
         "created_by_name": author_name,
         "created_by_email": author_email,
@@ -516,222 +990,220 @@ def create_article(body: ArticleCreate, authorization: Optional[str] = Header(de
         "tags": list(body.tags or []),
         "category": (body.category or CATEGORIES[0]),
         "reading_time_minutes": reading_minutes,
+        "excerpt": make_excerpt(body.content or ""),
         "cover_url": body.cover_url,
         "cover_alt": body.cover_alt,
         "cover_focal_x": body.cover_focal_x,
         "cover_focal_y": body.cover_focal_y,
         "cover_caption": body.cover_caption,
     }
-    articles_by_slug[slug] = article
-    comments_by_slug.setdefault(slug, [])
-    likes_by_slug.setdefault(slug, set())
-    bookmarks_by_slug.setdefault(slug, set())
+    slug = store.create_unique(article, base)
+    article = {"slug": slug, **article}
+    _search_add(article)
+    _invalidate_article(slug)
     return article
 
 
+def _article_etag(a: Dict[str, Any]) -> str:
+    # Weak: the live view counter is left out so a page view doesn't invalidate the client copy
+    return _etag(_dumps({k: v for k, v in a.items() if k != "views"}), weak=True)
+
+
 @app.get("/api/v1/articles/{slug}")
-def get_article(slug: str):
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        doc = ref.get()
-        if not doc.exists:
+def get_article(slug: str, request: Request, response: Response):
+    cached = article_cache.get(slug)
+    if cached is None:
+        data = get_store().get(slug)
+        if data is None:
             raise HTTPException(status_code=404)
-        # increment views atomically
-        try:
-            ref.update({"views": firestore.Increment(1)})
-        except Exception:
-            pass
-        data = doc.to_dict() or {}
-        data["views"] = int(data.get("views", 0)) + 1
-        return data
+        cached = (data, _article_etag(data))
+        article_cache.set(slug, cached)
+    doc_data, etag = cached
+    # views are aggregated in memory and flushed in batches (see ViewCounter)
+    pending = view_counter.record(slug)
+    data = dict(doc_data)
+    data["views"] = int(doc_data.get("views", 0)) + pending
+    return _conditional_json(request, response, data, etag=etag)
 
-    a = articles_by_slug.get(slug)
-    if not a:
-        raise HTTPException(status_code=404)
-    a["views"] = int(a.get("views", 0)) + 1
-    articles_by_slug[slug] = a
-    return a
+
+def _require_admin(authorization: Optional[str]) -> str:
+    user = _verify_user(authorization)
+    uid = (user.get("user_id") or user.get("uid") or "").strip()
+    if uid not in ADMIN_UIDS:
+        raise HTTPException(status_code=403, detail={"error": "admin only"})
+    return uid
+
+
+def _check_owner(a: Dict[str, Any], uid: str):
+    owner = (a.get("created_by") or "").strip()
+    if owner and uid and uid != owner:
+        raise HTTPException(status_code=403, detail={"error": "forbidden"})
 
 
 @app.put("/api/v1/articles/{slug}")
 def update_article(slug: str, body: ArticleUpdate, authorization: Optional[str] = Header(default=None), request: Request = None):
-    ensure_seed()
     user = _verify_user(authorization)
     uid = (user.get("user_id") or user.get("uid") or "").strip()
-    if not _rate_allow(_rate_key(request, uid)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        doc = ref.get()
-        if not doc.exists:
-            raise HTTPException(status_code=404)
-        a = doc.to_dict() or {}
-        owner = (a.get("created_by") or "").strip()
-        if owner and uid and uid != owner:
-            raise HTTPException(status_code=403, detail={"error": "forbidden"})
-        update: Dict[str, Any] = {}
-        if body.title is not None:
-            t = (body.title or "").strip()
-            update["title"] = t or a.get("title", "Untitled")
-        if body.subtitle is not None:
-            update["subtitle"] = body.subtitle or ""
-        content_changed = False
-        if body.content is not None:
-            update["content"] = body.content or ""
-            content_changed = True
-        if body.is_published is not None:
-            update["is_published"] = bool(body.is_published)
-        if body.tags is not None:
-            update["tags"] = list(body.tags or [])
-        if body.category is not None:
-            update["category"] = body.category or CATEGORIES[0]
-        if body.cover_url is not None:
-            update["cover_url"] = body.cover_url or ""
-        if body.cover_alt is not None:
-            update["cover_alt"] = body.cover_alt or ""
-        if body.cover_focal_x is not None:
-            update["cover_focal_x"] = float(body.cover_focal_x)
-        if body.cover_focal_y is not None:
-            update["cover_focal_y"] = float(body.cover_focal_y)
-        if body.cover_caption is not None:
-            update["cover_caption"] = body.cover_caption or ""
-        # reading time logic
-        if body.reading_time_minutes is not None:
-            try:
-                provided = int(body.reading_time_minutes)
-            except Exception:
-                provided = 0
-            if provided > 0:
-                update["reading_time_minutes"] = provided
-            else:
-                update["reading_time_minutes"] = compute_reading_time_minutes(update.get("content", a.get("content") or ""))
-        else:
-            current = a.get("reading_time_minutes")
-            if (current in (None, 0)):
-                update["reading_time_minutes"] = compute_reading_time_minutes(update.get("content", a.get("content") or ""))
-            else:
-                # keep existing
-                pass
-        update["updated_at"] = now_iso()
-        ref.update(update)
-        new_doc = ref.get()
-        return new_doc.to_dict()
-
-    a = articles_by_slug.get(slug)
-    if not a:
+    _rate_limit(request, "articles", uid)
+
+    store = get_store()
+    a = store.get(slug)
+    if a is None:
         raise HTTPException(status_code=404)
-    owner = (a.get("created_by") or "").strip()
-    if owner and uid and uid != owner:
-        raise HTTPException(status_code=403, detail={"error": "forbidden"})
+    _check_owner(a, uid)
+    update: Dict[str, Any] = {}
     if body.title is not None:
         t = (body.title or "").strip()
-        a["title"] = t or a.get("title", "Untitled")
+        update["title"] = t or a.get("title", "Untitled")
     if body.subtitle is not None:
-        a["subtitle"] = body.subtitle or ""
-    content_changed = False
+        update["subtitle"] = body.subtitle or ""
     if body.content is not None:
-        a["content"] = body.content or ""
-        content_changed = True
+        update["content"] = body.content or ""
+        update["excerpt"] = make_excerpt(update["content"])
     if body.is_published is not None:
-        a["is_published"] = bool(body.is_published)
+        update["is_published"] = bool(body.is_published)
     if body.tags is not None:
-        a["tags"] = list(body.tags or [])
+        update["tags"] = list(body.tags or [])
     if body.category is not None:
-        a["category"] = body.category or CATEGORIES[0]
+        update["category"] = body.category or CATEGORIES[0]
     if body.cover_url is not None:
-        a["cover_url"] = body.cover_url or ""
+        update["cover_url"] = body.cover_url or ""
     if body.cover_alt is not None:
-        a["cover_alt"] = body.cover_alt or ""
+        update["cover_alt"] = body.cover_alt or ""
     if body.cover_focal_x is not None:
-        a["cover_focal_x"] = float(body.cover_focal_x)
+        update["cover_focal_x"] = float(body.cover_focal_x)
     if body.cover_focal_y is not None:
-        a["cover_focal_y"] = float(body.cover_focal_y)
+        update["cover_focal_y"] = float(body.cover_focal_y)
     if body.cover_caption is not None:
-        a["cover_caption"] = body.cover_caption or ""
+        update["cover_caption"] = body.cover_caption or ""
+    # reading time logic
     if body.reading_time_minutes is not None:
         try:
             provided = int(body.reading_time_minutes)
         except Exception:
             provided = 0
         if provided > 0:
-            a["reading_time_minutes"] = provided
+            update["reading_time_minutes"] = provided
         else:
-            a["reading_time_minutes"] = compute_reading_time_minutes(a.get("content") or "")
-    else:
-        if ("reading_time_minutes" not in a) or (a.get("reading_time_minutes") in (None, 0)):
-            a["reading_time_minutes"] = compute_reading_time_minutes(a.get("content") or "")
-    a["updated_at"] = now_iso()
-    articles_by_slug[slug] = a
-    return a
+            update["reading_time_minutes"] = compute_reading_time_minutes(update.get("content", a.get("content") or ""))
+    elif a.get("reading_time_minutes") in (None, 0):
+        update["reading_time_minutes"] = compute_reading_time_minutes(update.get("content", a.get("content") or ""))
+    update["updated_at"] = now_iso()
+    data = store.update(slug, update)
+    if data is None:
+        raise HTTPException(status_code=404)
+    _search_add(data)
+    _invalidate_article(slug)
+    return data
 
 
 @app.delete("/api/v1/articles/{slug}", status_code=204)
 def delete_article(slug: str, authorization: Optional[str] = Header(default=None), request: Request = None):
-    ensure_seed()
     user = _verify_user(authorization)
     uid = (user.get("user_id") or user.get("uid") or "").strip()
-    if not _rate_allow(_rate_key(request, uid)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        doc = ref.get()
-        if not doc.exists:
-            raise HTTPException(status_code=404)
-        a = doc.to_dict() or {}
-        owner = (a.get("created_by") or "").strip()
-        if owner and uid and uid != owner:
-            raise HTTPException(status_code=403, detail={"error": "forbidden"})
-        ref.delete()
-        return
-
-    if slug not in articles_by_slug:
+    _rate_limit(request, "articles", uid)
+    store = get_store()
+    a = store.get(slug)
+    if a is None:
         raise HTTPException(status_code=404)
-    a = articles_by_slug.get(slug, {})
-    owner = (a.get("created_by") or "").strip()
-    if owner and uid and uid != owner:
-        raise HTTPException(status_code=403, detail={"error": "forbidden"})
-    del articles_by_slug[slug]
-    comments_by_slug.pop(slug, None)
-    likes_by_slug.pop(slug, None)
+    _check_owner(a, uid)
+    store.delete(slug)
+    _search_remove(slug)
+    _invalidate_article(slug)
     return
 
 
 @app.get("/api/v1/articles/{slug}/comments")
-def list_comments(slug: str):
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        if not client.collection("articles").document(slug).get().exists:
-            raise HTTPException(status_code=404)
-        comments = [d.to_dict() or {} for d in client.collection("articles").document(slug).collection("comments").order_by("created_at", direction=firestore.Query.DESCENDING).stream()]
-        return comments
-    if slug not in articles_by_slug:
+def list_comments(
+    slug: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+):
+    comments = get_store().list_comments(slug, limit + 1, _decode_cursor(cursor))
+    if comments is None:
         raise HTTPException(status_code=404)
-    return comments_by_slug.get(slug, [])
+    return _conditional_json(request, response, _page(response, comments, limit, _comment_key))
+
+
+def _max_age(cache_control: str) -> int:
+    m = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(m.group(1)) if m else 0
+
+
+class _CachingAuthRequest:
+    """google-auth transport that reuses one pooled HTTP session and keeps GET
+    responses (Google's public signing certs) for their Cache-Control max-age."""
+
+    def __init__(self, request=None):
+        if request is None:
+            from google.auth.transport import requests as google_requests
+
+            request = google_requests.Request()
+        self._request = request
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET" or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, **kwargs)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(url)
+        if hit and hit[0] > now:
+            return hit[1]
+        response = self._request(url, method=method, headers=headers, **kwargs)
+        if response.status == 200:
+            resp_headers = response.headers or {}
+            max_age = _max_age(resp_headers.get("cache-control") or resp_headers.get("Cache-Control") or "")
+            if max_age > 0:
+                with self._lock:
+                    self._cache[url] = (now + max_age, response)
+        return response
+
+
+_auth_request: Optional[_CachingAuthRequest] = None
+# sha256(token) -> (exp, claims); LRU-ordered, entries never outlive the token's exp
+_claims_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_claims_lock = threading.Lock()
+
+
+def _auth_transport() -> _CachingAuthRequest:
+    global _auth_request
+    if _auth_request is None:
+        _auth_request = _CachingAuthRequest()
+    return _auth_request
 
 
 def _verify_user(authorization: Optional[str]) -> Dict[str, Any]:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail={"error": "missing bearer token"})
     token = authorization.split(" ", 1)[1].strip()
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    now = time.time()
+    with _claims_lock:
+        hit = _claims_cache.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _claims_cache.move_to_end(key)
+                return hit[1]
+            del _claims_cache[key]
     try:
-        request = google_requests.Request()
         # Verify Firebase ID token. Do not force audience; library validates issuer and signature.
-        claims = google_id_token.verify_firebase_token(token, request)
+        from google.oauth2 import id_token as google_id_token
+
+        claims = google_id_token.verify_firebase_token(token, _auth_transport())
         if not claims:
             raise ValueError("invalid claims")
-        return claims
     except Exception:
         raise HTTPException(status_code=401, detail={"error": "invalid token"})
+    if AUTH_CACHE_SIZE > 0:
+        with _claims_lock:
+            _claims_cache[key] = (float(claims.get("exp") or 0), claims)
+            while len(_claims_cache) > AUTH_CACHE_SIZE:
+                _claims_cache.popitem(last=False)
+    return claims
 
 
 @app.post("/api/v1/articles/{slug}/comments", status_code=201)
@@ -742,7 +1214,6 @@ def add_comment(
     x_user_id: Optional[str] = Header(default=None, alias="X-User-Id"),
     request: Request = None,
 ):
-    ensure_seed()
     # Prefer verified Firebase user; fallback to X-User-Id only if explicitly allowed
     user: Dict[str, Any]
     try:
@@ -758,389 +1229,392 @@ def add_comment(
         raise HTTPException(status_code=400, detail={"error": "text is required"})
     author = (body.author or user.get("name") or user.get("email") or "User").strip()
     uid_for_rl = (user.get("user_id") or user.get("uid") or "").strip()
-    if not _rate_allow(_rate_key(request, uid_for_rl)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
+    _rate_limit(request, "comments", uid_for_rl)
     c = {
         "id": datetime.utcnow().timestamp().__repr__().replace(".", ""),
         "text": text,
         "author": author,
         "created_at": now_iso(),
     }
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        if not client.collection("articles").document(slug).get().exists:
-            raise HTTPException(status_code=404)
-        client.collection("articles").document(slug).collection("comments").document(c["id"]).set(c)
-        return c
-    if slug not in articles_by_slug:
+    if not get_store().add_comment(slug, c):
         raise HTTPException(status_code=404)
-    comments_by_slug.setdefault(slug, [])
-    comments_by_slug[slug].insert(0, c)
+    _invalidate_article(slug)
     return c
 
 
 @app.get("/api/v1/articles/{slug}/likes")
 def get_likes(slug: str, x_user_id: Optional[str] = Header(default=None, alias="X-User-Id"), authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        if not ref.get().exists:
-            raise HTTPException(status_code=404)
-        liked = False
-        uid: Optional[str] = None
-        if authorization:
-            try:
-                claims = _verify_user(authorization)
-                uid = (claims.get("user_id") or claims.get("uid"))  # type: ignore
-            except HTTPException:
-                uid = None
-        elif x_user_id:
-            uid = x_user_id
-        if uid:
-            liked = ref.collection("likes").document(str(uid)).get().exists
-        # likes count — читаем поле или считаем количество документов (если поля нет)
-        doc = ref.get()
-        data = doc.to_dict() or {}
-        likes_count = int(data.get("likes", 0))
-        if likes_count == 0:
-            try:
-                likes_count = len(list(ref.collection("likes").stream()))
-            except Exception:
-                likes_count = 0
-        return {"likes": likes_count, "liked": liked}
-
-    if slug not in articles_by_slug:
-        raise HTTPException(status_code=404)
-    likes_set = likes_by_slug.get(slug, set())
-    liked = False
+    uid: Optional[str] = None
     if authorization:
         try:
             claims = _verify_user(authorization)
-            uid = claims.get("user_id") or claims.get("uid")
-            liked = bool(uid and uid in likes_set)
+            uid = (claims.get("user_id") or claims.get("uid"))  # type: ignore
         except HTTPException:
-            liked = False
+            uid = None
     elif x_user_id:
-        liked = x_user_id in likes_set
-    return {"likes": len(likes_set), "liked": liked}
+        uid = x_user_id
+    state = get_store().like_state(slug, uid)
+    if state is None:
+        raise HTTPException(status_code=404)
+    likes, liked = state
+    return {"likes": likes, "liked": liked}
 
 
 @app.post("/api/v1/articles/{slug}/likes")
 def toggle_like(slug: str, authorization: Optional[str] = Header(default=None), body: Optional[Dict[str, Any]] = None, request: Request = None):
-    ensure_seed()
     claims = _verify_user(authorization)
     user_id = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not user_id:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if not _rate_allow(_rate_key(request, user_id)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        if not ref.get().exists:
-            raise HTTPException(status_code=404)
-        like_ref = ref.collection("likes").document(user_id)
-        if like_ref.get().exists:
-            like_ref.delete()
-            liked = False
-            try:
-                ref.update({"likes": firestore.Increment(-1)})
-            except Exception:
-                pass
-        else:
-            like_ref.set({"uid": user_id, "at": now_iso()})
-            liked = True
-            try:
-                ref.update({"likes": firestore.Increment(1)})
-            except Exception:
-                pass
-        doc = ref.get()
-        data = doc.to_dict() or {}
-        likes_count = int(data.get("likes", 0))
-        return {"likes": likes_count, "liked": liked}
-
-    if slug not in articles_by_slug:
+    _rate_limit(request, "likes", user_id)
+    state = get_store().toggle_like(slug, user_id, now_iso())
+    if state is None:
         raise HTTPException(status_code=404)
-    likes_set = likes_by_slug.setdefault(slug, set())
-    if user_id in likes_set:
-        likes_set.remove(user_id)
-        liked = False
-    else:
-        likes_set.add(user_id)
-        liked = True
-    articles_by_slug[slug]["likes"] = len(likes_set)
-    return {"likes": len(likes_set), "liked": liked}
+    _invalidate_article(slug)
+    likes, liked = state
+    return {"likes": likes, "liked": liked}
 
 
 @app.post("/api/v1/articles/{slug}/likes/increment")
 def increment_like(slug: str):
     """Increment likes counter regardless of user (no auth)."""
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        if not ref.get().exists:
-            raise HTTPException(status_code=404)
-        try:
-            ref.update({"likes": firestore.Increment(1)})
-        except Exception:
-            # if field doesn't exist, set to 1
-            data = ref.get().to_dict() or {}
-            data["likes"] = int(data.get("likes", 0)) + 1
-            ref.set(data, merge=True)
-        data = ref.get().to_dict() or {}
-        return {"likes": int(data.get("likes", 0))}
-    if slug not in articles_by_slug:
+    likes = get_store().increment_likes(slug)
+    if likes is None:
         raise HTTPException(status_code=404)
-    # in-memory fallback
-    a = articles_by_slug[slug]
-    a["likes"] = int(a.get("likes", 0)) + 1
-    return {"likes": int(a.get("likes", 0))}
+    _invalidate_article(slug)
+    return {"likes": likes}
 
 @app.get("/api/v1/articles/{slug}/bookmark")
 def get_bookmark(slug: str, authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        ref = client.collection("articles").document(slug)
-        if not ref.get().exists:
-            raise HTTPException(status_code=404)
-        bookmarked = False
-        try:
-            claims = _verify_user(authorization)
-            uid = (claims.get("user_id") or claims.get("uid") or "").strip()
-            if uid:
-                bookmarked = ref.collection("bookmarks").document(uid).get().exists
-        except HTTPException:
-            bookmarked = False
-        return {"bookmarked": bookmarked}
-
-    if slug not in articles_by_slug:
-        raise HTTPException(status_code=404)
-    bookmarked = False
     try:
         claims = _verify_user(authorization)
         uid = (claims.get("user_id") or claims.get("uid") or "").strip()
-        if uid:
-            bookmarked = uid in bookmarks_by_slug.setdefault(slug, set())
     except HTTPException:
-        bookmarked = False
+        uid = ""
+    bookmarked = get_store().bookmark_state(slug, uid or None)
+    if bookmarked is None:
+        raise HTTPException(status_code=404)
     return {"bookmarked": bookmarked}
 
 
 # Subscriptions (follow authors)
 @app.get("/api/v1/authors/{author_id}/subscription")
 def get_subscription(author_id: str, authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        users_ref = client.collection("authors").document(author_id).collection("subscriptions")
-        subscribed = False
-        try:
-            claims = _verify_user(authorization)
-            uid = (claims.get("user_id") or claims.get("uid") or "").strip()
-            if uid:
-                subscribed = users_ref.document(uid).get().exists
-        except HTTPException:
-            subscribed = False
-        try:
-            count = len(list(users_ref.stream()))
-        except Exception:
-            count = 0
-        return {"subscribed": subscribed, "count": count}
-
     try:
         claims = _verify_user(authorization)
         uid = (claims.get("user_id") or claims.get("uid") or "").strip()
-        subscribed = bool(uid and uid in subscriptions_by_author.setdefault(author_id, set()))
     except HTTPException:
-        subscribed = False
-    count = len(subscriptions_by_author.setdefault(author_id, set()))
+        uid = ""
+    subscribed, count = get_store().subscription_state(author_id, uid or None)
     return {"subscribed": subscribed, "count": count}
 
 
 @app.post("/api/v1/authors/{author_id}/subscription")
 def toggle_subscription(author_id: str, authorization: Optional[str] = Header(default=None), request: Request = None):
-    ensure_seed()
     claims = _verify_user(authorization)
     uid = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not uid:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if not _rate_allow(_rate_key(request, uid)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        users_ref = client.collection("authors").document(author_id).collection("subscriptions")
-        user_ref = users_ref.document(uid)
-        if user_ref.get().exists:
-            user_ref.delete()
-            subscribed = False
-        else:
-            user_ref.set({"uid": uid, "at": now_iso()})
-            subscribed = True
-        try:
-            count = len(list(users_ref.stream()))
-        except Exception:
-            count = 0
-        return {"subscribed": subscribed, "count": count}
-
-    s = subscriptions_by_author.setdefault(author_id, set())
-    if uid in s:
-        s.remove(uid)
-        subscribed = False
-    else:
-        s.add(uid)
-        subscribed = True
-    return {"subscribed": subscribed, "count": len(s)}
+    _rate_limit(request, "subscriptions", uid)
+    subscribed, count = get_store().toggle_subscription(author_id, uid, now_iso())
+    following_feed_cache.delete(uid)
+    return {"subscribed": subscribed, "count": count}
 
 
 @app.get("/api/v1/users/me/subscriptions")
-def list_my_subscriptions(authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
+def list_my_subscriptions(
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+):
     claims = _verify_user(authorization)
     uid = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not uid:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        refs = client.collection("users").document(uid).collection("subscriptions").stream()
-        authors = [d.id for d in refs]
-        return {"authors": authors}
-    authors: List[str] = []
-    for author, users in subscriptions_by_author.items():
-        if uid in users:
-            authors.append(author)
-    return {"authors": authors}
+    # (subscribed_at, author_id) rows from the user-side follow index, newest first
+    rows = get_store().list_subscriptions(uid, limit + 1, _decode_cursor(cursor))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return {"authors": [author for _, author in rows]}
+
+
+async def _merge_author_streams(store: Store, authors: List[str], limit: int, after: Optional[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Newest `limit` (created_at, slug) keys across `authors`, older than `after`.
+
+    Each author's articles come back from one `created_by == author` query,
+    already newest first, so a k-way heap merge of the streams is enough; the
+    queries run concurrently, at most FOLLOWING_FEED_FANOUT at a time.
+    """
+    gate = asyncio.Semaphore(max(1, FOLLOWING_FEED_FANOUT))
+
+    async def stream(author: str) -> List[Tuple[str, str]]:
+        async with gate:
+            rows = await run_in_threadpool(store.list_by_author, author, limit, after, ["slug", "created_at"])
+        return [_article_key(r) for r in rows]
+
+    streams = await asyncio.gather(*(stream(a) for a in authors))
+    merged = heapq.merge(*streams, reverse=True)
+    return [key for _, key in zip(range(limit), merged)]
+
+
+async def _following_feed(store: Store, uid: str) -> Dict[str, Any]:
+    entry = following_feed_cache.get(uid)
+    if entry is None:
+        rows = await run_in_threadpool(store.list_subscriptions, uid, FOLLOWING_FEED_MAX_AUTHORS)
+        authors = [author for _, author in rows]
+        keys = await _merge_author_streams(store, authors, FOLLOWING_FEED_DEPTH, None) if authors else []
+        # fewer keys than the depth means the merge saw every followed article
+        entry = {"authors": authors, "keys": keys, "complete": len(keys) < FOLLOWING_FEED_DEPTH}
+        following_feed_cache.set(uid, entry)
+    return entry
+
+
+# Articles from the authors I follow, newest first
+@app.get("/api/v1/users/me/feed")
+async def list_my_feed(
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
+    claims = await run_in_threadpool(_verify_user, authorization)
+    uid = (claims.get("user_id") or claims.get("uid") or "").strip()
+    if not uid:
+        raise HTTPException(status_code=401, detail={"error": "user_id required"})
+    after = _decode_cursor(cursor)
+    store = get_store()
+    entry = await _following_feed(store, uid)
+    # Pages inside the materialized keys are a slice; past them, merge live from the cursor on
+    keys = entry["keys"]
+    start = 0 if after is None else next((i for i, k in enumerate(keys) if k < after), len(keys))
+    page = keys[start:start + limit + 1]
+    if len(page) <= limit and not entry["complete"] and entry["authors"]:
+        page += await _merge_author_streams(store, entry["authors"], limit + 1 - len(page), page[-1] if page else after)
+    if len(page) > limit:
+        page = page[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(page[-1])
+    # Documents are read fresh, so counters are current and deleted articles drop out
+    docs = await run_in_threadpool(store.get_many, [slug for _, slug in page], _resolve_fields(fields))
+    items = [docs[slug] for _, slug in page if slug in docs]
+    for item in items:
+        item["comments_count"] = _comments_count(item)
+    return items
 
 
 @app.post("/api/v1/articles/{slug}/bookmark")
 def toggle_bookmark(slug: str, authorization: Optional[str] = Header(default=None), request: Request = None):
-    ensure_seed()
     claims = _verify_user(authorization)
     uid = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not uid:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if not _rate_allow(_rate_key(request, uid)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        aref = client.collection("articles").document(slug)
-        if not aref.get().exists:
-            raise HTTPException(status_code=404)
-        a_user = aref.collection("bookmarks").document(uid)
-        uref = client.collection("users").document(uid).collection("bookmarks").document(slug)
-        if a_user.get().exists:
-            a_user.delete()
-            uref.delete()
-            bookmarked = False
-        else:
-            a_user.set({"uid": uid, "at": now_iso()})
-            uref.set({"slug": slug, "at": now_iso()})
-            bookmarked = True
-        return {"bookmarked": bookmarked}
-
-    if slug not in articles_by_slug:
+    _rate_limit(request, "bookmarks", uid)
+    bookmarked = get_store().toggle_bookmark(slug, uid, now_iso())
+    if bookmarked is None:
         raise HTTPException(status_code=404)
-    s = bookmarks_by_slug.setdefault(slug, set())
-    if uid in s:
-        s.remove(uid)
-        bookmarked = False
-    else:
-        s.add(uid)
-        bookmarked = True
     return {"bookmarked": bookmarked}
 
 
-# List current user's bookmarks
+# List current user's bookmarks (newest bookmark first)
 @app.get("/api/v1/users/me/bookmarks")
-def list_my_bookmarks(authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
+def list_my_bookmarks(
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
     claims = _verify_user(authorization)
     uid = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not uid:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        # Читаем список slug из users/{uid}/bookmarks, затем подтягиваем статьи
-        slugs = [d.id for d in client.collection("users").document(uid).collection("bookmarks").stream()]
-        items: List[Dict[str, Any]] = []
-        for slug in slugs:
-            doc = client.collection("articles").document(slug).get()
-            if not doc.exists:
-                continue
-            data = doc.to_dict() or {}
-            try:
-                c = len(list(client.collection("articles").document(slug).collection("comments").stream()))
-            except Exception:
-                c = 0
-            data["comments_count"] = c
-            items.append(data)
-        items.sort(key=lambda a: a.get("created_at", ""), reverse=True)
-        return items
-
-    result: List[Dict[str, Any]] = []
-    for slug, users in bookmarks_by_slug.items():
-        if uid in users and slug in articles_by_slug:
-            a = articles_by_slug[slug]
-            item = dict(a)
-            item["comments_count"] = len(comments_by_slug.get(slug, []))
-            result.append(item)
-    result.sort(key=lambda a: a.get("created_at", ""), reverse=True)
-    return result
+    store = get_store()
+    # Читаем страницу (at, slug) закладок, затем подтягиваем статьи одним batch-запросом
+    rows = store.list_bookmarks(uid, limit + 1, _decode_cursor(cursor))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    docs = store.get_many([slug for _, slug in rows], _resolve_fields(fields))
+    items: List[Dict[str, Any]] = []
+    for _, slug in rows:
+        data = docs.get(slug)
+        if data is None:
+            continue
+        data["comments_count"] = _comments_count(data)
+        items.append(data)
+    return items
 
 # List my articles
 @app.get("/api/v1/users/me/articles")
-def list_my_articles(authorization: Optional[str] = Header(default=None)):
-    ensure_seed()
+def list_my_articles(
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+):
     claims = _verify_user(authorization)
     uid = (claims.get("user_id") or claims.get("uid") or "").strip()
     if not uid:
         raise HTTPException(status_code=401, detail={"error": "user_id required"})
-    if using_firestore():
-        client = fs_client()
-        assert client is not None
-        items: List[Dict[str, Any]] = []
-        for d in client.collection("articles").where("created_by", "==", uid).order_by("created_at", direction=firestore.Query.DESCENDING).stream():
-            data = d.to_dict() or {}
-            slug = data.get("slug", d.id)
-            try:
-                c = len(list(client.collection("articles").document(slug).collection("comments").stream()))
-            except Exception:
-                c = 0
-            data["comments_count"] = c
-            items.append(data)
-        return items
-
-    base_items = [a for a in articles_by_slug.values() if (a.get("created_by") or "") == uid]
-    base_items.sort(key=lambda a: a.get("created_at", ""), reverse=True)
-    enriched = []
-    for a in base_items:
-        slug = a.get("slug", "")
-        item = dict(a)
-        item["comments_count"] = len(comments_by_slug.get(slug, []))
-        enriched.append(item)
-    return enriched
+    items = get_store().list_by_author(uid, limit + 1, _decode_cursor(cursor), _resolve_fields(fields))
+    for item in items:
+        item["comments_count"] = _comments_count(item)
+    return _page(response, items, limit, _article_key)
+
+# Bulk export/import (admins only); manage.py has the same as CLI commands
+@app.get("/api/v1/admin/export")
+def export_ndjson(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    # a sync iterator: Starlette pulls it from the threadpool, one article at a time
+    return StreamingResponse(
+        export_articles(), media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="articles.ndjson"'},
+    )
+
+
+@app.post("/api/v1/admin/import")
+async def import_ndjson(
+    request: Request,
+    on_conflict: str = Query(default="rename", pattern="^(rename|skip)$"),
+    authorization: Optional[str] = Header(default=None),
+):
+    await run_in_threadpool(_require_admin, authorization)
+    importer = articles_importer(on_conflict)
+    # the body is consumed as it arrives: at most one chunk of lines is held in memory
+    chunk: List[bytes] = []
+    tail = b""
+    async for data in request.stream():
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        chunk.extend(lines)
+        if len(chunk) >= bulk.CHUNK_SIZE:
+            await run_in_threadpool(importer.feed, chunk)
+            chunk = []
+    if tail:
+        chunk.append(tail)
+    if chunk:
+        await run_in_threadpool(importer.feed, chunk)
+    return importer.report()
+
 
 # For local dev: uvicorn main:app --host 0.0.0.0 --port 4000
 
 
-# Upload cover to Google Cloud Storage (Firebase Storage)
+_image_pool: Optional[ProcessPoolExecutor] = None
+_image_pool_lock = threading.Lock()
+_media_index: Optional[MediaIndex] = None
+
+if MEDIA_STORAGE == "local" and MEDIA_BASE_URL.startswith("/"):
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    app.mount(MEDIA_BASE_URL, StaticFiles(directory=MEDIA_DIR), name="media")
+
+
+def media_storage() -> Optional[MediaStorage]:
+    """Blocking (GCS client setup); None when storage isn't configured."""
+    if MEDIA_STORAGE == "local":
+        storage: MediaStorage = LocalStorage(MEDIA_DIR, MEDIA_BASE_URL)
+    else:
+        client = gcs_client()
+        bucket_name = os.getenv("FIREBASE_STORAGE_BUCKET") or os.getenv("GCS_BUCKET")
+        if client is None or not bucket_name:
+            return None
+        storage = GCSStorage(client.bucket(bucket_name))  # type: ignore
+    if METRICS_ENABLED:
+        return Instrumented(storage, "gcs" if isinstance(storage, GCSStorage) else "local_media", backend_metrics, {"put"})  # type: ignore[return-value]
+    return storage
+
+
+def media_index() -> MediaIndex:
+    global _media_index
+    if _media_index is None:
+        with _image_pool_lock:
+            if _media_index is None:
+                _media_index = MediaIndex(MEDIA_INDEX_PATH)
+    return _media_index
+
+
+def _image_executor() -> Optional[ProcessPoolExecutor]:
+    global _image_pool
+    if IMAGE_WORKERS <= 0:
+        return None
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _image_pool
+
+
+def _stop_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+
+async def _process_cover(path: str, focal: Tuple[float, float]) -> List[images.Variant]:
+    # Workers open the spooled file themselves: only the path crosses the process boundary
+    args = (path, COVER_WIDTHS, COVER_FORMATS, COVER_ASPECT, focal, COVER_QUALITY)
+    pool = _image_executor()
+    if pool is None:
+        return await run_in_threadpool(images.process_cover, *args)
+    # Decoding and encoding hold the GIL for hundreds of ms on phone photos; keep them out of this process
+    return await asyncio.get_running_loop().run_in_executor(pool, images.process_cover, *args)
+
+
+async def _spool_upload(file: UploadFile, out) -> str:
+    """Copy the upload into `out` chunk by chunk; returns its SHA-256 hex digest.
+
+    Memory stays at one chunk per upload; the limit is re-checked per chunk in
+    case the body arrived without a usable Content-Length.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        if size == 0 and _sniff_image_type(chunk[:64]) is None:
+            raise HTTPException(status_code=400, detail={"error": "invalid image signature"})
+        size += len(chunk)
+        if size > UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail={"error": "file too large"})
+        digest.update(chunk)
+        await run_in_threadpool(out.write, chunk)
+    if size == 0:
+        raise HTTPException(status_code=400, detail={"error": "invalid image signature"})
+    await run_in_threadpool(out.flush)
+    return digest.hexdigest()
+
+
+def _cover_key(digest: str, focal: Tuple[float, float]) -> str:
+    # Same bytes + same pipeline settings => same variants, so they share one set of objects
+    settings = json.dumps([digest, COVER_WIDTHS, COVER_FORMATS, COVER_ASPECT, [round(f, 3) for f in focal], COVER_QUALITY])
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:32]
+
+
+def _cover_response(variants: List[Dict[str, Any]], alt: str) -> Dict[str, Any]:
+    srcset: Dict[str, str] = {}
+    for item in variants:
+        entry = f"{item['url']} {item['width']}w"
+        srcset[item["type"]] = f"{srcset[item['type']]}, {entry}" if item["type"] in srcset else entry
+    # `url` stays the single-image fallback: the widest variant in the first (most compatible) format
+    fallback = [item for item in variants if item["type"] == variants[0]["type"]][-1]
+    return {
+        "url": fallback["url"], "alt": alt, "width": fallback["width"], "height": fallback["height"],
+        "variants": variants, "srcset": srcset,
+    }
+
+
+# Upload a cover: re-encoded to a srcset of WebP/AVIF variants in GCS (Firebase Storage)
 @app.post("/api/v1/upload/cover")
 async def upload_cover(
     file: UploadFile = File(...),
     alt: str = Form(...),
     user_id: Optional[str] = Form(default=None),
+    focal_x: float = Form(default=0.5),
+    focal_y: float = Form(default=0.5),
     authorization: Optional[str] = Header(default=None),
     request: Request = None,
 ):
@@ -1161,43 +1635,43 @@ async def upload_cover(
         raise HTTPException(status_code=401, detail={"error": "auth required"})
 
     # Rate limit uploads per user/IP
-    if not _rate_allow(_rate_key(request, uid)):
-        raise HTTPException(status_code=429, detail={"error": "rate limit"})
-
-    # Enforce server-side size limit and basic signature checks
-    try:
-        # Read up to MAX+1 to detect overflow
-        head = await file.read(min(UPLOAD_MAX_BYTES + 1, 1024 * 1024 * 2))  # read up to 2MB for sniffing
-        if len(head) > UPLOAD_MAX_BYTES:
-            raise HTTPException(status_code=413, detail={"error": "file too large"})
-        sig = _sniff_image_type(head)
-        if sig is None:
-            raise HTTPException(status_code=400, detail={"error": "invalid image signature"})
-        # Reset stream for upload
-        await file.seek(0)
-    except HTTPException:
-        raise
-    except Exception:
-        raise HTTPException(status_code=400, detail={"error": "invalid upload"})
+    _rate_limit(request, "uploads", uid)
 
-    client = gcs_client()
-    if client is None:
+    # The storage SDK is synchronous: keep its network calls off the event loop
+    media = await run_in_threadpool(media_storage)
+    if media is None:
         raise HTTPException(status_code=500, detail={"error": "storage not configured"})
-    bucket_name = os.getenv("FIREBASE_STORAGE_BUCKET") or os.getenv("GCS_BUCKET")
-    if not bucket_name:
-        raise HTTPException(status_code=500, detail={"error": "bucket not set"})
-
-    bucket = client.bucket(bucket_name)  # type: ignore
-    safe_name = re.sub(r"[^a-zA-Z0-9._-]", "_", file.filename or "image")
-    object_name = f"covers/{uid}/{int(datetime.utcnow().timestamp())}_{safe_name}"
-    blob = bucket.blob(object_name)
-    blob.cache_control = "public, max-age=31536000, immutable"
-    blob.content_type = file.content_type
-    blob.upload_from_file(file.file)  # type: ignore
-    try:
-        blob.make_public()
-        url = blob.public_url
-    except Exception:
-        url = blob.generate_signed_url(expiration=60 * 60 * 24 * 365)
 
-    return {"url": url, "alt": alt}
+    # Enforce the size limit and the signature check while streaming to a temp file
+    focal = (min(max(focal_x, 0.0), 1.0), min(max(focal_y, 0.0), 1.0))
+    index = media_index()
+    now = now_iso()
+    with tempfile.NamedTemporaryFile(prefix="cover-") as spooled:
+        try:
+            digest = await _spool_upload(file, spooled)
+        except HTTPException:
+            raise
+        except Exception:
+            raise HTTPException(status_code=400, detail={"error": "invalid upload"})
+        key = _cover_key(digest, focal)
+        stored = await run_in_threadpool(index.get, key)
+        if stored is not None:
+            # Re-upload of a known image: no decoding, no storage writes, same (CDN-cached) URLs
+            await run_in_threadpool(index.add_ref, key, uid, now)
+            return _cover_response(stored, alt)
+        try:
+            variants = await _process_cover(spooled.name, focal)
+        except images.ImageError:
+            raise HTTPException(status_code=400, detail={"error": "invalid image"})
+
+    names = [f"covers/{key[:2]}/{key}/{v.width}.{v.content_type.split('/')[1]}" for v in variants]
+    urls = await asyncio.gather(*(
+        run_in_threadpool(media.put, name, v.data, v.content_type) for name, v in zip(names, variants)
+    ))
+    stored = [
+        {"url": url, "width": v.width, "height": v.height, "type": v.content_type}
+        for url, v in zip(urls, variants)
+    ]
+    await run_in_threadpool(index.put, key, stored, now)
+    await run_in_threadpool(index.add_ref, key, uid, now)
+    return _cover_response(stored, alt)
@@ -0,0 +1,102 @@
+"""Maintenance commands for the blog API.
+
+Usage (from services/python/api):
+    python manage.py reconcile-comments
+    python manage.py reconcile-subscribers
+    python manage.py backfill-excerpts
+    python manage.py export-articles [--output articles.ndjson]
+    python manage.py import-articles articles.ndjson [--on-conflict rename|skip]
+"""
+import argparse
+import sys
+import time
+
+import bulk
+
+import main
+
+
+def cmd_reconcile_comments(args: argparse.Namespace) -> int:
+    fixed = main.reconcile_comments_count()
+    print(f"comments_count fixed on {fixed} article(s)")
+    return 0
+
+
+def cmd_reconcile_subscribers(args: argparse.Namespace) -> int:
+    fixed = main.reconcile_subscriber_counts()
+    print(f"subscriber_count fixed on {fixed} author(s)")
+    return 0
+
+
+def cmd_backfill_excerpts(args: argparse.Namespace) -> int:
+    fixed = main.backfill_excerpts()
+    print(f"excerpt updated on {fixed} article(s)")
+    return 0
+
+
+def cmd_export_articles(args: argparse.Namespace) -> int:
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    count = 0
+    started = time.monotonic()
+    try:
+        for line in main.export_articles():
+            out.write(line)
+            count += 1
+            if count % args.progress_every == 0:
+                print(f"exported {count} article(s), {count / (time.monotonic() - started):.0f}/s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"exported {count} article(s)", file=sys.stderr)
+    return 0
+
+
+def cmd_import_articles(args: argparse.Namespace) -> int:
+    def progress(importer: bulk.Importer):
+        elapsed = time.monotonic() - importer.started
+        print(
+            f"line {importer.lines}: created {importer.created} (renamed {importer.renamed}),"
+            f" skipped {importer.skipped}, failed {importer.failed}, {importer.lines / max(elapsed, 1e-9):.0f} lines/s",
+            file=sys.stderr,
+        )
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    try:
+        report = bulk.import_ndjson(main.articles_importer(args.on_conflict), src, args.batch, progress)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+    for err in report["errors"]:
+        print(f"line {err['line']}: {err['error']}", file=sys.stderr)
+    print(f"imported {report['created']} article(s) in {report['seconds']}s")
+    return 1 if report["failed"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="manage.py", description="Blog API maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("reconcile-comments", help="backfill comments_count from comment subcollections")
+    p.set_defaults(func=cmd_reconcile_comments)
+    p = sub.add_parser("reconcile-subscribers", help="recompute author subscriber_count from follow edges")
+    p.set_defaults(func=cmd_reconcile_subscribers)
+    p = sub.add_parser("backfill-excerpts", help="compute card excerpts for existing articles")
+    p.set_defaults(func=cmd_backfill_excerpts)
+    p = sub.add_parser("export-articles", help="write every article with comments/likes/bookmarks as NDJSON")
+    p.add_argument("--output", default="-", help="file to write (default: stdout)")
+    p.add_argument("--progress-every", type=int, default=1000, metavar="N")
+    p.set_defaults(func=cmd_export_articles)
+    p = sub.add_parser("import-articles", help="bulk-load an NDJSON export")
+    p.add_argument("input", help="NDJSON file, or - for stdin")
+    p.add_argument("--on-conflict", choices=bulk.ON_CONFLICT, default="rename", help="existing slug: rename to slug-N (default) or skip")
+    p.add_argument("--batch", type=int, default=bulk.CHUNK_SIZE, help="articles per write batch/transaction")
+    p.set_defaults(func=cmd_import_articles)
+    return parser
+
+
+def run(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
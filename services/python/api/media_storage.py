@@ -0,0 +1,128 @@
+"""Where uploaded media ends up: a GCS bucket in production, a local directory in dev and tests.
+
+`MediaIndex` remembers which content-addressed objects were already written
+and which users uploaded them, so repeated uploads skip processing and storage.
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, List, Optional
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+class MediaStorage(ABC):
+    @abstractmethod
+    def put(self, name: str, data: bytes, content_type: str) -> str:
+        """Store `data` under object `name` and return its public URL. Blocking."""
+
+
+class GCSStorage(MediaStorage):
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def put(self, name: str, data: bytes, content_type: str) -> str:
+        blob = self.bucket.blob(name)
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_string(data, content_type=content_type)
+        try:
+            blob.make_public()
+            return blob.public_url
+        except Exception:
+            return blob.generate_signed_url(expiration=60 * 60 * 24 * 365)
+
+
+class LocalStorage(MediaStorage):
+    """Writes objects under `root`; main.py serves that directory at `base_url`."""
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, name: str) -> Path:
+        path = (self.root / name).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"object name escapes the media root: {name}")
+        return path
+
+    def put(self, name: str, data: bytes, content_type: str) -> str:
+        path = self.path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so a reader never sees a half-written file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return f"{self.base_url}/{name}"
+
+
+class MediaIndex:
+    """Content key -> stored variants, plus (key, uid) references; a WAL-mode SQLite file shared by workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS objects (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at TEXT NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS refs (
+                key TEXT NOT NULL, uid TEXT NOT NULL, at TEXT NOT NULL, PRIMARY KEY (key, uid)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS refs_uid ON refs (uid, at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT value FROM objects WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Any, at: str):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO objects (key, value, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), at),
+        )
+
+    def add_ref(self, key: str, uid: str, at: str):
+        # keeps the first upload time per user
+        self._conn().execute("INSERT OR IGNORE INTO refs (key, uid, at) VALUES (?, ?, ?)", (key, uid, at))
+
+    def release(self, key: str, uid: str):
+        self._conn().execute("DELETE FROM refs WHERE key = ? AND uid = ?", (key, uid))
+
+    def keys_for(self, uid: str) -> List[str]:
+        rows = self._conn().execute("SELECT key FROM refs WHERE uid = ? ORDER BY at DESC", (uid,))
+        return [r[0] for r in rows]
+
+    def unreferenced(self) -> List[str]:
+        """Objects no user references any more: candidates for deletion from storage."""
+        rows = self._conn().execute(
+            "SELECT key FROM objects WHERE NOT EXISTS (SELECT 1 FROM refs WHERE refs.key = objects.key) ORDER BY key"
+        )
+        return [r[0] for r in rows]
+
+    def forget(self, key: str):
+        self._conn().execute("DELETE FROM objects WHERE key = ?", (key,))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,276 @@
+"""Prometheus metrics without the client library: labelled counters and histograms, text exposition.
+
+`MetricsMiddleware` records per-route latency, response size and status.
+`Instrumented` wraps a backend object (the store, media storage) and counts
+and times every public method call; the calls made while serving a request
+are also tallied per request, so a route that does one backend call per
+list item (an N+1) shows up in `backend_operations_per_request`.
+"""
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Sequence[str], Labels, float]]:
+        """(sample name, label names, label values, value) rows."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, names, values, value in self.samples():
+            lines.append(f"{name}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            rows = sorted(self._values.items())
+        for values, value in rows:
+            yield self.name, self.labelnames, values, value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Labels, List[float]] = {}  # per-bucket counts, then +Inf count, then sum
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def count(self, **labels: str) -> int:
+        row = self._values.get(self._key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def samples(self):
+        with self._lock:
+            rows = sorted((k, list(v)) for k, v in self._values.items())
+        names = self.labelnames + ("le",)
+        for values, row in rows:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                yield f"{self.name}_bucket", names, values + (_format_value(bound),), cumulative
+            yield f"{self.name}_count", self.labelnames, values, cumulative
+            yield f"{self.name}_sum", self.labelnames, values, row[-1]
+
+
+class CallbackMetric(Metric):
+    """Values read at scrape time from `collect()`, which returns {label values: value}."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], collect: Callable[[], Dict[Labels, float]], type: str = "gauge"):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.collect = collect
+
+    def samples(self):
+        for values, value in sorted(self.collect().items()):
+            yield self.name, self.labelnames, values, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+# Backend calls made while serving the current request (a one-element list, shared with worker threads)
+_request_tally: ContextVar[Optional[List[int]]] = ContextVar("request_tally", default=None)
+
+
+class BackendMetrics:
+    def __init__(self, registry: Registry, prefix: str = "blog"):
+        self.operations = registry.counter(f"{prefix}_backend_operations_total", "Backend calls", ("backend", "op", "kind"))
+        self.documents = registry.counter(f"{prefix}_backend_documents_total", "Documents returned by backend calls", ("backend", "op"))
+        self.errors = registry.counter(f"{prefix}_backend_errors_total", "Backend calls that raised", ("backend", "op"))
+        self.latency = registry.histogram(f"{prefix}_backend_operation_seconds", "Backend call latency", ("backend", "op"))
+
+    def record(self, backend: str, op: str, kind: str, seconds: float, documents: int, error: bool):
+        self.operations.inc(backend=backend, op=op, kind=kind)
+        self.latency.observe(seconds, backend=backend, op=op)
+        if documents:
+            self.documents.inc(documents, backend=backend, op=op)
+        if error:
+            self.errors.inc(backend=backend, op=op)
+        tally = _request_tally.get()
+        if tally is not None:
+            tally[0] += 1
+
+    def counted(self, backend: str, op: str, items: Iterator[Any]) -> Iterator[Any]:
+        """Pass a streamed result through, adding its items to the document count as they are consumed."""
+        n = 0
+        try:
+            for item in items:
+                n += 1
+                yield item
+        finally:
+            if n:
+                self.documents.inc(n, backend=backend, op=op)
+
+
+def _documents(result: Any) -> int:
+    """Documents in a read result: list items, entries of a {slug: doc} map, or one for any other value."""
+    if result is None or isinstance(result, (bool, int, float, str)):
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and result and all(isinstance(v, dict) for v in result.values()):
+        return len(result)
+    return 1
+
+
+class Instrumented:
+    """Proxy that records every public method call on `target`; attributes pass through."""
+
+    def __init__(self, target: Any, backend: str, metrics: BackendMetrics, writes: Iterable[str] = ()):
+        self._target = target
+        self._backend = backend
+        self._metrics = metrics
+        self._writes: FrozenSet[str] = frozenset(writes)
+
+    @property
+    def target(self) -> Any:
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        kind = "write" if name in self._writes else "read"
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except BaseException:
+                self._metrics.record(self._backend, name, kind, time.perf_counter() - start, 0, True)
+                raise
+            streamed = isinstance(result, Iterator)
+            documents = 0 if kind == "write" or streamed else _documents(result)
+            self._metrics.record(self._backend, name, kind, time.perf_counter() - start, documents, False)
+            return self._metrics.counted(self._backend, name, result) if streamed else result
+
+        return call
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route request latency, response size and status, plus backend calls per request.
+
+    Routes are labelled with their path template ("/api/v1/articles/{slug}")
+    so label cardinality stays bounded; requests no route matched share
+    the label "unmatched".
+    """
+
+    def __init__(self, app, registry: Registry, backend: BackendMetrics, prefix: str = "blog"):
+        self.app = app
+        self.backend = backend
+        self.requests = registry.counter(f"{prefix}_http_requests_total", "HTTP requests", ("method", "route", "status"))
+        self.latency = registry.histogram(f"{prefix}_http_request_duration_seconds", "Request latency", ("method", "route"))
+        self.sizes = registry.histogram(f"{prefix}_http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS)
+        self.per_request = registry.histogram(
+            f"{prefix}_backend_operations_per_request", "Backend calls made by one request", ("method", "route"), COUNT_BUCKETS
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        tally = [0]
+        token = _request_tally.set(tally)
+
+        async def counting_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            _request_tally.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.requests.inc(method=method, route=route, status=str(status))
+            self.latency.observe(time.perf_counter() - start, method=method, route=route)
+            self.sizes.observe(size, method=method, route=route)
+            self.per_request.observe(tally[0], method=method, route=route)
@@ -0,0 +1,167 @@
+"""Token-bucket rate limiting with per-route limits and pluggable bucket storage.
+
+`MemoryBackend` keeps buckets in a bounded LRU for a single process.
+`SQLiteBackend` shares them through one database file so every uvicorn worker
+on the host draws from the same bucket. Another shared store (e.g. Redis with
+a Lua script) only needs to implement `RateLimitBackend.take` atomically.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+import math
+import sqlite3
+import threading
+import time
+
+
+class Limit(NamedTuple):
+    rate: float  # tokens refilled per second
+    burst: int  # bucket capacity
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # seconds until the bucket is full again
+    retry_after: int  # seconds until the next request would be allowed (0 if allowed)
+
+    def headers(self) -> Dict[str, str]:
+        h = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(self.retry_after)
+        return h
+
+
+def parse_limits(spec: str, routes: Optional[Iterable[str]] = None) -> Dict[str, Limit]:
+    """Parse "uploads=0.2:3,comments=1:5" into per-route limits; malformed entries are skipped.
+
+    With `routes`, a name outside it raises ValueError: a misspelt route
+    would otherwise silently fall back to the default limit.
+    """
+    known = set(routes) if routes is not None else None
+    limits: Dict[str, Limit] = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.strip().partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            limit = Limit(float(rate), int(burst))
+        except ValueError:
+            continue
+        name = name.strip()
+        if known is not None and name not in known:
+            raise ValueError(f"unknown rate limit route {name!r}; expected one of {', '.join(sorted(known))}")
+        limits[name] = limit
+    return limits
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> float:
+    return min(float(limit.burst), tokens + max(0.0, now - updated) * limit.rate)
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        """Refill and try to take one token atomically; returns (allowed, tokens left)."""
+
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process buckets in an LRU capped at `max_keys`.
+
+    Evicting the least recently seen key at worst forgives a client that went
+    quiet, and a bucket idle for burst/rate seconds is full anyway.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(limit.burst), now))
+            tokens = _refill(tokens, updated, now, limit)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+
+class SQLiteBackend(RateLimitBackend):
+    """Buckets shared by every process on the host through a WAL-mode SQLite file."""
+
+    PRUNE_EVERY = 1000  # takes between deletions of idle buckets
+
+    def __init__(self, path: str, idle_seconds: float = 3600.0):
+        # buckets untouched for idle_seconds are deleted; keep it above the slowest burst/rate refill
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, limit) if row else float(limit.burst)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                # buckets idle long enough to be full are indistinguishable from new ones
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_seconds,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return allowed, tokens
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, default: Limit, routes: Optional[Dict[str, Limit]] = None):
+        self.backend = backend
+        self.default = default
+        self.routes = dict(routes or {})
+
+    def limit_for(self, route: str) -> Limit:
+        return self.routes.get(route, self.default)
+
+    def check(self, route: str, key: str) -> Optional[Decision]:
+        """Take a token from `key`'s bucket for `route`; None when the route is unlimited."""
+        limit = self.limit_for(route)
+        if limit.rate <= 0:
+            return None
+        # wall clock, not monotonic: buckets may be shared between processes
+        allowed, tokens = self.backend.take(f"{route}:{key}", limit, time.time())
+        reset = math.ceil((limit.burst - tokens) / limit.rate)
+        retry_after = 0 if allowed else max(1, math.ceil((1.0 - tokens) / limit.rate))
+        return Decision(allowed, limit.burst, int(tokens), reset, retry_after)
@@ -0,0 +1,250 @@
+"""In-process inverted index for article search.
+
+Tokenizes Cyrillic and Latin text, supports prefix matching on query terms
+and ranks hits with BM25 (title/subtitle weighted over body). The index is
+updated incrementally on article writes and can be snapshotted to disk so a
+restart does not need to re-read every article.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import bisect
+import gzip
+import json
+import math
+import os
+import re
+import threading
+
+# BM25 parameters and per-field term weights
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"title": 3.0, "subtitle": 2.0, "content": 1.0}
+PREFIX_MIN_LEN = 2
+PREFIX_MAX_EXPANSIONS = 64
+PREFIX_PENALTY = 0.8
+SNAPSHOT_VERSION = 1
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; HTML tags are dropped and 'ё' folds to 'е'."""
+    text = _TAG_RE.sub(" ", text or "").lower().replace("ё", "е")
+    return _TOKEN_RE.findall(text)
+
+
+def _term_frequencies(title: str, subtitle: str, content: str) -> Dict[str, float]:
+    tf: Dict[str, float] = {}
+    for field, text in (("title", title), ("subtitle", subtitle), ("content", content)):
+        weight = FIELD_WEIGHTS[field]
+        for tok in tokenize(text):
+            tf[tok] = tf.get(tok, 0.0) + weight
+    return tf
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _earlier(stamp: str, seconds: float) -> str:
+    try:
+        return (datetime.fromisoformat(stamp.rstrip("Z")) - timedelta(seconds=seconds)).isoformat() + "Z"
+    except ValueError:
+        return ""
+
+
+def _article_fields(a: Dict[str, Any]) -> Tuple[str, str, str, str, str]:
+    return (
+        str(a.get("slug", "")),
+        str(a.get("title") or ""),
+        str(a.get("subtitle") or ""),
+        str(a.get("content") or ""),
+        str(a.get("created_at") or ""),
+    )
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._docs: Dict[str, Tuple[float, str, Dict[str, float]]] = {}  # id -> (length, created_at, tf)
+        self._vocab: List[str] = []  # sorted, for prefix lookups
+        self._total_len = 0.0
+        # Start of the last successful read from the store: everything written
+        # before it (by any process) is indexed. Only rebuild/catch_up move it.
+        self.built_at = ""
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    # --- writes ---
+
+    def add(self, doc_id: str, title: str = "", subtitle: str = "", content: str = "", created_at: str = ""):
+        tf = _term_frequencies(title, subtitle, content)
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._insert_locked(doc_id, sum(tf.values()), created_at or "", tf)
+
+    def add_article(self, a: Dict[str, Any]):
+        self.add(*_article_fields(a))
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._vocab = []
+            self._total_len = 0.0
+
+    def _insert_locked(self, doc_id: str, length: float, created_at: str, tf: Dict[str, float], bulk: bool = False):
+        # bulk loads skip the sorted-vocab maintenance; the caller re-sorts once at the end
+        self._docs[doc_id] = (length, created_at, tf)
+        self._total_len += length
+        for term, freq in tf.items():
+            plist = self._postings.get(term)
+            if plist is None:
+                plist = self._postings[term] = {}
+                if not bulk:
+                    bisect.insort(self._vocab, term)
+            plist[doc_id] = freq
+
+    def _remove_locked(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        length, _, tf = entry
+        self._total_len -= length
+        for term in tf:
+            plist = self._postings.get(term)
+            if plist is None:
+                continue
+            plist.pop(doc_id, None)
+            if not plist:
+                del self._postings[term]
+                i = bisect.bisect_left(self._vocab, term)
+                if i < len(self._vocab) and self._vocab[i] == term:
+                    del self._vocab[i]
+
+    # --- reads ---
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        terms: List[Tuple[str, float]] = []
+        if token in self._postings:
+            terms.append((token, 1.0))
+        if len(token) >= PREFIX_MIN_LEN:
+            i = bisect.bisect_right(self._vocab, token)
+            while i < len(self._vocab) and len(terms) < PREFIX_MAX_EXPANSIONS and self._vocab[i].startswith(token):
+                terms.append((self._vocab[i], PREFIX_PENALTY))
+                i += 1
+        return terms
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return (doc_id, score) for documents matching every query token, best first.
+
+        Query tokens also match as prefixes (at a small penalty), so partially
+        typed words still hit; ties are broken by recency.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            n = len(self._docs)
+            if n == 0:
+                return []
+            avgdl = (self._total_len / n) or 1.0
+            scores: Optional[Dict[str, float]] = None
+            for tok in tokens:
+                partial: Dict[str, float] = {}
+                for term, boost in self._expand(tok):
+                    plist = self._postings[term]
+                    idf = math.log(1.0 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                    for doc_id, freq in plist.items():
+                        if scores is not None and doc_id not in scores:
+                            continue
+                        dl = self._docs[doc_id][0]
+                        s = boost * idf * freq * (K1 + 1) / (freq + K1 * (1 - B + B * dl / avgdl))
+                        if s > partial.get(doc_id, 0.0):
+                            partial[doc_id] = s
+                if scores is None:
+                    scores = partial
+                else:
+                    scores = {d: scores[d] + s for d, s in partial.items()}
+                if not scores:
+                    return []
+            ranked = sorted(
+                scores.items(),
+                key=lambda kv: (kv[1], self._docs[kv[0]][1], kv[0]),
+                reverse=True,
+            )
+        return ranked[:limit] if limit is not None else ranked
+
+    # --- persistence ---
+
+    def snapshot(self, path: str):
+        """Write the index to `path` (gzip JSON) atomically."""
+        with self._lock:
+            # built_at, not now: writes made by other processes since the last sync are not in
+            # the index, and the catch-up after a restore has to read them
+            payload = {
+                "version": SNAPSHOT_VERSION,
+                "built_at": self.built_at,
+                "docs": {d: [length, created_at, tf] for d, (length, created_at, tf) in self._docs.items()},
+            }
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def restore(self, path: str) -> bool:
+        """Load a snapshot written by `snapshot`; returns False if missing or incompatible."""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except Exception:
+            return False
+        if payload.get("version") != SNAPSHOT_VERSION:
+            return False
+        with self._lock:
+            self.clear()
+            for doc_id, (length, created_at, tf) in payload.get("docs", {}).items():
+                self._insert_locked(doc_id, float(length), created_at, tf, bulk=True)
+            self._vocab = sorted(self._postings)
+            self.built_at = payload.get("built_at") or ""
+        return True
+
+    def catch_up(self, read_since: Callable[[str], Iterable[Dict[str, Any]]], overlap: float = 0.0) -> int:
+        """Index the articles `read_since(stamp)` returns for the last sync; returns how many.
+
+        The stamp goes back `overlap` seconds, since a write stamped just
+        before the last sync may have become visible only after it. built_at
+        moves only once the read has finished, so a failed read is retried
+        from the same point.
+        """
+        started = _now()
+        since = _earlier(self.built_at, overlap) if self.built_at and overlap else self.built_at
+        n = 0
+        for a in read_since(since):
+            self.add_article(a)
+            n += 1
+        self.built_at = started
+        return n
+
+    def rebuild(self, articles: Iterable[Dict[str, Any]]):
+        # Stamp before reading so writes racing with the build are caught up later
+        started = _now()
+        with self._lock:
+            self.clear()
+            for a in articles:
+                doc_id, title, subtitle, content, created_at = _article_fields(a)
+                tf = _term_frequencies(title, subtitle, content)
+                self._remove_locked(doc_id)
+                self._insert_locked(doc_id, sum(tf.values()), created_at, tf, bulk=True)
+            self._vocab = sorted(self._postings)
+            self.built_at = started
@@ -0,0 +1,7 @@
+"""Pluggable storage backends for the API (see base.py for the interface)."""
+from .base import ArticleStore, Cursor, SocialStore, Store, project
+from .firestore import FirestoreStore
+from .memory import MemoryStore
+from .sqlite import SQLiteStore
+
+__all__ = ["ArticleStore", "Cursor", "FirestoreStore", "MemoryStore", "SQLiteStore", "SocialStore", "Store", "project"]
@@ -0,0 +1,176 @@
+"""Storage interfaces the API routes are written against.
+
+A backend implements both `ArticleStore` and `SocialStore`. Documents are
+plain dicts shaped like the public API payloads. Methods return None (or
+False) when the article they operate on does not exist, and the route turns
+that into a 404. Cursors are the decoded (sort key, tie-breaker) tuples from
+main.py. List methods return at most `limit` items; routes ask for limit+1
+to learn whether another page exists.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Cursor = Tuple[str, str]
+
+
+def project(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Copy of `data` limited to `fields`; None keeps the full document."""
+    if fields is None:
+        return dict(data)
+    return {k: data[k] for k in fields if k in data}
+
+
+class ArticleStore(ABC):
+    # False for the in-process dicts: nothing survives a restart, so there is
+    # no point snapshotting derived state such as the search index
+    persistent = True
+    # True when search() is backed by the database's own full-text index
+    native_search = False
+
+    @abstractmethod
+    def is_empty(self) -> bool: ...
+
+    @abstractmethod
+    def exists(self, slug: str) -> bool: ...
+
+    @abstractmethod
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        """Full article document, `views` including any sharded counters."""
+
+    @abstractmethod
+    def get_many(self, slugs: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Existing articles among `slugs`, keyed by slug, in one round trip."""
+
+    @abstractmethod
+    def create(self, article: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def create_unique(self, article: Dict[str, Any], base: str) -> str:
+        """Create the article as `base`, or `base-2`, `base-3`, ... if taken; returns the slug used.
+
+        A per-base counter keeps the last number handed out, so this takes a
+        constant number of operations however many articles share the base.
+        A taken candidate (an article from before the counter, or another
+        title's `base-N`) only moves the counter on.
+        """
+
+    @abstractmethod
+    def update(self, slug: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Merge `changes` into the article and return the updated document."""
+
+    @abstractmethod
+    def delete(self, slug: str) -> bool:
+        """Remove the article with its comments, likes and bookmarks."""
+
+    @abstractmethod
+    def list_recent(self, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Articles newest first, strictly after the (created_at, slug) cursor."""
+
+    @abstractmethod
+    def list_by_author(self, uid: str, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def iter_articles(self, fields: Optional[List[str]] = None, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Every article, or only those created/updated after `since` (may repeat)."""
+
+    @abstractmethod
+    def add_views(self, deltas: Dict[str, int], shards: int = 0, hot_threshold: int = 0) -> Tuple[int, Dict[str, int]]:
+        """Persist buffered view deltas; returns (views written, deltas to retry).
+
+        Deltas for articles that no longer exist are dropped.
+        """
+
+    @abstractmethod
+    def increment_likes(self, slug: str) -> Optional[int]: ...
+
+    @abstractmethod
+    def import_articles(self, bundles: List[Dict[str, Any]]) -> None:
+        """Bulk-write new articles with everything hanging off them.
+
+        A bundle is {"article", "comments", "likes", "bookmarks"} as produced by
+        `dump_social`; slugs are already resolved and counters already match
+        the lists. Written in as few round trips/transactions as the backend allows.
+        """
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Ranked (slug, score) hits, best first; only when `native_search` is set."""
+        raise NotImplementedError
+
+
+class SocialStore(ABC):
+    @abstractmethod
+    def list_comments(self, slug: str, limit: int, after: Optional[Cursor] = None) -> Optional[List[Dict[str, Any]]]:
+        """Comments newest first, strictly after the (created_at, id) cursor."""
+
+    @abstractmethod
+    def add_comment(self, slug: str, comment: Dict[str, Any]) -> bool:
+        """Store the comment and bump the article's `comments_count` together."""
+
+    @abstractmethod
+    def count_comments(self, slug: str) -> int: ...
+
+    @abstractmethod
+    def dump_social(self, slug: str) -> Dict[str, List[Dict[str, Any]]]:
+        """{"comments": [...], "likes": [{"uid", "at"}], "bookmarks": [{"uid", "at"}]} for export."""
+
+    @abstractmethod
+    def like_state(self, slug: str, uid: Optional[str]) -> Optional[Tuple[int, bool]]:
+        """(likes, liked by uid) for the article."""
+
+    @abstractmethod
+    def toggle_like(self, slug: str, uid: str, at: str) -> Optional[Tuple[int, bool]]: ...
+
+    @abstractmethod
+    def bookmark_state(self, slug: str, uid: Optional[str]) -> Optional[bool]: ...
+
+    @abstractmethod
+    def toggle_bookmark(self, slug: str, uid: str, at: str) -> Optional[bool]: ...
+
+    @abstractmethod
+    def list_bookmarks(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        """(bookmarked_at, slug) rows for the user, newest bookmark first."""
+
+    @abstractmethod
+    def subscription_state(self, author_id: str, uid: Optional[str]) -> Tuple[bool, int]:
+        """(uid follows author, follower count); the count is a maintained counter, not a scan."""
+
+    @abstractmethod
+    def toggle_subscription(self, author_id: str, uid: str, at: str) -> Tuple[bool, int]:
+        """Flip the follow edge and adjust the author's subscriber count atomically."""
+
+    @abstractmethod
+    def reconcile_subscriber_counts(self) -> int:
+        """Recount followers for every author and repair drifted counters; returns the number fixed."""
+
+    @abstractmethod
+    def list_subscriptions(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        """(subscribed_at, author_id) rows the user follows, newest first, from the user-side index."""
+
+
+class Store(ArticleStore, SocialStore):
+    """A complete backend."""
+
+    name = ""
+
+
+# Methods that change data; everything else on a Store only reads (used to label metrics)
+WRITE_METHODS = frozenset({
+    "create", "create_unique", "update", "delete", "add_views", "increment_likes", "import_articles", "add_comment",
+    "toggle_like", "toggle_bookmark", "toggle_subscription", "reconcile_subscriber_counts",
+})
+
+
+def numbered_slug(base: str, n: int) -> str:
+    """The n-th slug of `base`: base, base-2, base-3, ..."""
+    return base if n <= 1 else f"{base}-{n}"
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,459 @@
+"""Cloud Firestore backend.
+
+Layout: `articles/{slug}` with `comments`, `likes`, `bookmarks` and
+`view_shards` subcollections, `users/{uid}/bookmarks/{slug}` and
+`users/{uid}/subscriptions/{author}` for per-user lists, and
+`authors/{id}/subscriptions/{uid}` for followers with the count kept in
+`authors/{id}.subscriber_count`. `slug_counters/{base}.n` is the last
+number create_unique handed out for a slug base.
+Multi-document reads go through one `get_all` and paired writes through one
+batch so each call is a single round trip where Firestore allows it.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import random
+
+from .base import Cursor, Store, batched, numbered_slug
+
+BATCH_LIMIT = 500  # max operations per Firestore batched write
+# On a sharded article: the sum of its view_shards as of the last flush that
+# wrote to them, so card reads report the views without reading the shards
+SHARD_VIEWS = "views_in_shards"
+SHARDED_FLAG = "views_sharded"  # set once an article's views go to view_shards
+
+
+def _fold_views(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the folded shard total into `views`; the helper fields are not part of the API."""
+    data.pop(SHARDED_FLAG, None)
+    folded = data.pop(SHARD_VIEWS, None)
+    if folded:
+        data["views"] = int(data.get("views") or 0) + int(folded)
+    return data
+
+
+def _with_shard_views(fields: Optional[List[str]]) -> Optional[List[str]]:
+    return fields + [SHARD_VIEWS] if fields is not None and "views" in fields else fields
+
+
+class FirestoreStore(Store):
+    name = "firestore"
+
+    def __init__(self, client, firestore_module):
+        # the module provides Increment and Query; injected so tests can pass a fake
+        self.client = client
+        self.fs = firestore_module
+        self._sharded: set = set()  # articles whose views live in view_shards
+
+    def _articles(self):
+        return self.client.collection("articles")
+
+    def _ref(self, slug: str):
+        return self._articles().document(slug)
+
+    def _get_many(self, refs: List[Any], transaction=None) -> List[Any]:
+        """Fetch several documents in one round trip (get_all), returned in the order given."""
+        docs = self.client.get_all(refs, transaction=transaction) if transaction is not None else self.client.get_all(refs)
+        by_path = {d.reference.path: d for d in docs}
+        return [by_path[r.path] for r in refs]
+
+    def _desc(self):
+        return self.fs.Query.DESCENDING
+
+    def _newest(self, query, field: str, after: Optional[Cursor]):
+        """`query` newest first by `field`, ties broken by document id, strictly after the (value, id) cursor.
+
+        The id order is what Firestore applies implicitly, so it needs no extra index.
+        """
+        query = query.order_by(field, direction=self._desc()).order_by("__name__", direction=self._desc())
+        if after:
+            query = query.start_after({field: after[0], "__name__": after[1]})
+        return query
+
+    def stored_views(self, ref, data: Dict[str, Any]) -> int:
+        views = int(data.get("views", 0) or 0)
+        if data.get(SHARDED_FLAG):
+            try:
+                views += sum(int((d.to_dict() or {}).get("count", 0)) for d in ref.collection("view_shards").stream())
+            except Exception:
+                pass
+        return views
+
+    # --- articles ---
+
+    def is_empty(self) -> bool:
+        return not list(self._articles().limit(1).stream())
+
+    def exists(self, slug: str) -> bool:
+        return self._ref(slug).get().exists
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        ref = self._ref(slug)
+        doc = ref.get()
+        if not doc.exists:
+            return None
+        return self._with_live_views(ref, doc.to_dict() or {})
+
+    def _with_live_views(self, ref, data: Dict[str, Any]) -> Dict[str, Any]:
+        """The full document as the API returns it: `views` with the live shard sum, storage fields dropped."""
+        data["views"] = self.stored_views(ref, data)
+        data.pop(SHARD_VIEWS, None)
+        data.pop(SHARDED_FLAG, None)
+        return data
+
+    def get_many(self, slugs: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        if not slugs:
+            return {}
+        refs = [self._ref(s) for s in slugs]
+        docs = self.client.get_all(refs, field_paths=_with_shard_views(fields))
+        return {d.id: _fold_views(d.to_dict() or {}) for d in docs if d.exists}
+
+    def create(self, article: Dict[str, Any]) -> None:
+        self._ref(article["slug"]).set(article)
+
+    def create_unique(self, article: Dict[str, Any], base: str) -> str:
+        counter = self.client.collection("slug_counters").document(base)
+
+        @self.fs.transactional
+        def allocate(transaction):
+            (snap,) = self._get_many([counter], transaction=transaction)
+            n = int((snap.to_dict() or {}).get("n", 0)) + 1 if snap.exists else 1
+            # the next number is almost always free; if not (articles from before the counter),
+            # probe a widening window of numbers per read instead of one read per collision
+            window = 1
+            while True:
+                numbers = range(n, n + window)
+                docs = self._get_many([self._ref(numbered_slug(base, i)) for i in numbers], transaction=transaction)
+                free = next((i for i, d in zip(numbers, docs) if not d.exists), None)
+                if free is not None:
+                    break
+                n += window
+                window *= 4
+            slug = numbered_slug(base, free)
+            transaction.set(counter, {"n": free})
+            transaction.set(self._ref(slug), {**article, "slug": slug})
+            return slug
+
+        return allocate(self.client.transaction())
+
+    def update(self, slug: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ref = self._ref(slug)
+        try:
+            ref.update(changes)
+        except Exception:
+            if not ref.get().exists:
+                return None
+            raise
+        return self._with_live_views(ref, ref.get().to_dict() or {})
+
+    def delete(self, slug: str) -> bool:
+        ref = self._ref(slug)
+        if not ref.get().exists:
+            return False
+        # Firestore keeps subcollections of deleted documents, so remove them explicitly
+        refs = []
+        for sub in ("comments", "likes", "view_shards"):
+            refs.extend(d.reference for d in ref.collection(sub).select([]).stream())
+        for d in ref.collection("bookmarks").select([]).stream():
+            refs.append(d.reference)
+            refs.append(self.client.collection("users").document(d.id).collection("bookmarks").document(slug))
+        refs.append(ref)
+        for chunk in batched(refs, BATCH_LIMIT):
+            batch = self.client.batch()
+            for r in chunk:
+                batch.delete(r)
+            batch.commit()
+        self._sharded.discard(slug)
+        return True
+
+    def _page(self, query, limit: int, after: Optional[Cursor], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        query = self._newest(query, "created_at", after)
+        if fields is not None:
+            query = query.select(_with_shard_views(fields))
+        return [_fold_views(d.to_dict() or {}) for d in query.limit(limit).stream()]
+
+    def list_recent(self, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._page(self._articles(), limit, after, fields)
+
+    def list_by_author(self, uid: str, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._page(self._articles().where("created_by", "==", uid), limit, after, fields)
+
+    def iter_articles(self, fields: Optional[List[str]] = None, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        articles = self._articles()
+        queries = [articles] if since is None else [articles.where(f, ">", since) for f in ("created_at", "updated_at")]
+        for query in queries:
+            if fields is not None:
+                query = query.select(_with_shard_views(fields))
+            for d in query.stream():
+                data = _fold_views(d.to_dict() or {})
+                data.setdefault("slug", d.id)
+                yield data
+
+    def add_views(self, deltas: Dict[str, int], shards: int = 0, hot_threshold: int = 0) -> Tuple[int, Dict[str, int]]:
+        written = 0
+        retry: Dict[str, int] = {}
+        touched: List[str] = []  # articles whose shards this flush wrote to
+        for chunk in batched(deltas.items(), BATCH_LIMIT):
+            try:
+                batch = self.client.batch()
+                hot = [slug for slug, delta in chunk if self._add_views_to_batch(batch, slug, delta, shards, hot_threshold)]
+                batch.commit()
+                self._sharded.update(hot)
+                touched.extend(hot)
+                written += sum(d for _, d in chunk)
+            except Exception:
+                # A failed batch is usually one deleted article; retry individually and
+                # only re-queue deltas for articles that still exist.
+                for slug, delta in chunk:
+                    try:
+                        batch = self.client.batch()
+                        hot_one = self._add_views_to_batch(batch, slug, delta, shards, hot_threshold)
+                        batch.commit()
+                        if hot_one:
+                            self._sharded.add(slug)
+                            touched.append(slug)
+                        written += delta
+                    except Exception:
+                        try:
+                            if self._ref(slug).get().exists:
+                                retry[slug] = delta
+                        except Exception:
+                            retry[slug] = delta
+        self._fold_shards(touched)
+        return written, retry
+
+    def _fold_shards(self, slugs: List[str]):
+        """Copy each article's current shard sum onto the article (SHARD_VIEWS).
+
+        One article write per flush, like an unsharded article. Flushes from
+        several processes may briefly leave an older total; the next flush
+        that touches the shards corrects it.
+        """
+        totals = []
+        for slug in slugs:
+            ref = self._ref(slug)
+            try:
+                total = sum(int((d.to_dict() or {}).get("count", 0)) for d in ref.collection("view_shards").stream())
+            except Exception:
+                continue
+            totals.append((ref, total))
+        for chunk in batched(totals, BATCH_LIMIT):
+            try:
+                batch = self.client.batch()
+                for ref, total in chunk:
+                    batch.update(ref, {SHARD_VIEWS: total})
+                batch.commit()
+            except Exception:
+                # most likely an article deleted since the flush; fold the others one by one
+                for ref, total in chunk:
+                    try:
+                        ref.update({SHARD_VIEWS: total})
+                    except Exception:
+                        pass
+
+    def _add_views_to_batch(self, batch, slug: str, delta: int, shards: int, hot_threshold: int) -> bool:
+        """Queue one article's delta; returns True if it went to a shard.
+
+        Hot articles spread their writes over `view_shards/*` to stay under
+        the per-document write rate limit.
+        """
+        ref = self._ref(slug)
+        if shards > 0 and (delta >= hot_threshold or slug in self._sharded):
+            shard = ref.collection("view_shards").document(str(random.randrange(shards)))
+            batch.set(shard, {"count": self.fs.Increment(delta)}, merge=True)
+            if slug not in self._sharded:
+                batch.update(ref, {SHARDED_FLAG: True})
+            return True
+        batch.update(ref, {"views": self.fs.Increment(delta)})
+        return False
+
+    def increment_likes(self, slug: str) -> Optional[int]:
+        ref = self._ref(slug)
+        try:
+            ref.update({"likes": self.fs.Increment(1)})
+        except Exception:
+            if not ref.get().exists:
+                return None
+            raise
+        return int((ref.get().to_dict() or {}).get("likes", 0))
+
+    def import_articles(self, bundles: List[Dict[str, Any]]) -> None:
+        users = self.client.collection("users")
+        writes = []
+        for bundle in bundles:
+            article = bundle["article"]
+            slug = article["slug"]
+            ref = self._ref(slug)
+            writes.append((ref, article))
+            writes.extend((ref.collection("comments").document(c["id"]), c) for c in bundle.get("comments", []))
+            writes.extend((ref.collection("likes").document(l["uid"]), {"uid": l["uid"], "at": l.get("at", "")}) for l in bundle.get("likes", []))
+            for b in bundle.get("bookmarks", []):
+                at = b.get("at", "")
+                writes.append((ref.collection("bookmarks").document(b["uid"]), {"uid": b["uid"], "at": at}))
+                writes.append((users.document(b["uid"]).collection("bookmarks").document(slug), {"slug": slug, "at": at}))
+        # pack across articles: a chunk of small articles costs one commit, not one per article
+        for chunk in batched(writes, BATCH_LIMIT):
+            batch = self.client.batch()
+            for ref, data in chunk:
+                batch.set(ref, data)
+            batch.commit()
+
+    # --- comments ---
+
+    def list_comments(self, slug: str, limit: int, after: Optional[Cursor] = None) -> Optional[List[Dict[str, Any]]]:
+        ref = self._ref(slug)
+        if not ref.get().exists:
+            return None
+        query = self._newest(ref.collection("comments"), "created_at", after)
+        return [d.to_dict() or {} for d in query.limit(limit).stream()]
+
+    def add_comment(self, slug: str, comment: Dict[str, Any]) -> bool:
+        ref = self._ref(slug)
+        if not ref.get().exists:
+            return False
+        # Write the comment and bump the denormalized counter atomically
+        batch = self.client.batch()
+        batch.set(ref.collection("comments").document(comment["id"]), comment)
+        batch.update(ref, {"comments_count": self.fs.Increment(1)})
+        batch.commit()
+        return True
+
+    def count_comments(self, slug: str) -> int:
+        return len(list(self._ref(slug).collection("comments").stream()))
+
+    def dump_social(self, slug: str) -> Dict[str, List[Dict[str, Any]]]:
+        ref = self._ref(slug)
+        comments = [d.to_dict() or {} for d in ref.collection("comments").order_by("created_at", direction=self._desc()).stream()]
+        marks = {}
+        for sub in ("likes", "bookmarks"):
+            marks[sub] = [{"uid": d.id, "at": str((d.to_dict() or {}).get("at", ""))} for d in ref.collection(sub).stream()]
+        return {"comments": comments, **marks}
+
+    # --- likes, bookmarks, subscriptions ---
+
+    def like_state(self, slug: str, uid: Optional[str]) -> Optional[Tuple[int, bool]]:
+        ref = self._ref(slug)
+        # article and like marker in one round trip
+        refs = [ref] + ([ref.collection("likes").document(str(uid))] if uid else [])
+        docs = self._get_many(refs)
+        if not docs[0].exists:
+            return None
+        liked = bool(uid) and docs[1].exists
+        # likes count — читаем поле или считаем количество документов (если поля нет)
+        likes = int((docs[0].to_dict() or {}).get("likes", 0))
+        if likes == 0:
+            try:
+                likes = len(list(ref.collection("likes").stream()))
+            except Exception:
+                likes = 0
+        return likes, liked
+
+    def toggle_like(self, slug: str, uid: str, at: str) -> Optional[Tuple[int, bool]]:
+        ref = self._ref(slug)
+        like_ref = ref.collection("likes").document(uid)
+        doc, like_doc = self._get_many([ref, like_ref])
+        if not doc.exists:
+            return None
+        # marker and counter change together in one batched write
+        batch = self.client.batch()
+        if like_doc.exists:
+            batch.delete(like_ref)
+            batch.update(ref, {"likes": self.fs.Increment(-1)})
+            liked = False
+        else:
+            batch.set(like_ref, {"uid": uid, "at": at})
+            batch.update(ref, {"likes": self.fs.Increment(1)})
+            liked = True
+        batch.commit()
+        likes = max(0, int((doc.to_dict() or {}).get("likes", 0)) + (1 if liked else -1))
+        return likes, liked
+
+    def bookmark_state(self, slug: str, uid: Optional[str]) -> Optional[bool]:
+        ref = self._ref(slug)
+        refs = [ref] + ([ref.collection("bookmarks").document(uid)] if uid else [])
+        docs = self._get_many(refs)
+        if not docs[0].exists:
+            return None
+        return bool(uid) and docs[1].exists
+
+    def toggle_bookmark(self, slug: str, uid: str, at: str) -> Optional[bool]:
+        aref = self._ref(slug)
+        a_user = aref.collection("bookmarks").document(uid)
+        uref = self.client.collection("users").document(uid).collection("bookmarks").document(slug)
+        article_doc, marker = self._get_many([aref, a_user])
+        if not article_doc.exists:
+            return None
+        batch = self.client.batch()
+        if marker.exists:
+            batch.delete(a_user)
+            batch.delete(uref)
+            bookmarked = False
+        else:
+            batch.set(a_user, {"uid": uid, "at": at})
+            batch.set(uref, {"slug": slug, "at": at})
+            bookmarked = True
+        batch.commit()
+        return bookmarked
+
+    def list_bookmarks(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        query = self._newest(self.client.collection("users").document(uid).collection("bookmarks"), "at", after)
+        return [(str((d.to_dict() or {}).get("at", "")), d.id) for d in query.limit(limit).stream()]
+
+    def _author(self, author_id: str):
+        return self.client.collection("authors").document(author_id)
+
+    def _followers(self, author_id: str):
+        return self._author(author_id).collection("subscriptions")
+
+    def _count_followers(self, author_id: str, transaction=None) -> int:
+        query = self._followers(author_id).select([])
+        docs = query.stream(transaction=transaction) if transaction is not None else query.stream()
+        return len(list(docs))
+
+    def _subscriber_count(self, author_id: str, author_doc, transaction=None) -> int:
+        count = (author_doc.to_dict() or {}).get("subscriber_count") if author_doc.exists else None
+        # authors followed before the counter existed: count once (reconcile_subscriber_counts backfills)
+        return int(count) if count is not None else self._count_followers(author_id, transaction)
+
+    def subscription_state(self, author_id: str, uid: Optional[str]) -> Tuple[bool, int]:
+        refs = [self._author(author_id)] + ([self._followers(author_id).document(uid)] if uid else [])
+        docs = self._get_many(refs)
+        return bool(uid) and docs[1].exists, self._subscriber_count(author_id, docs[0])
+
+    def toggle_subscription(self, author_id: str, uid: str, at: str) -> Tuple[bool, int]:
+        author_ref = self._author(author_id)
+        follower = self._followers(author_id).document(uid)
+        # users/{uid}/subscriptions is what list_subscriptions reads; both sides and the counter change together
+        mine = self.client.collection("users").document(uid).collection("subscriptions").document(author_id)
+
+        @self.fs.transactional
+        def flip(transaction):
+            author_doc, marker = self._get_many([author_ref, follower], transaction=transaction)
+            # the fallback count is read in the transaction too, so a concurrent first toggle retries
+            count = self._subscriber_count(author_id, author_doc, transaction)
+            if marker.exists:
+                transaction.delete(follower)
+                transaction.delete(mine)
+                subscribed, count = False, max(0, count - 1)
+            else:
+                transaction.set(follower, {"uid": uid, "at": at})
+                transaction.set(mine, {"author": author_id, "at": at})
+                subscribed, count = True, count + 1
+            # absolute value: the transaction read the counter, so concurrent toggles retry instead of racing
+            transaction.set(author_ref, {"subscriber_count": count}, merge=True)
+            return subscribed, count
+
+        return flip(self.client.transaction())
+
+    def reconcile_subscriber_counts(self) -> int:
+        fixed = 0
+        # list_documents also returns authors that only exist as a parent of subscriptions
+        for ref in self.client.collection("authors").list_documents():
+            actual = self._count_followers(ref.id)
+            doc = ref.get()
+            if not doc.exists or (doc.to_dict() or {}).get("subscriber_count") != actual:
+                ref.set({"subscriber_count": actual}, merge=True)
+                fixed += 1
+        return fixed
+
+    def list_subscriptions(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        query = self._newest(self.client.collection("users").document(uid).collection("subscriptions"), "at", after)
+        return [(str((d.to_dict() or {}).get("at", "")), d.id) for d in query.limit(limit).stream()]
@@ -0,0 +1,305 @@
+"""In-process store used when no database is configured (local dev, tests).
+
+Nothing survives a restart. Besides the primary dicts it keeps the secondary
+indexes the routes need, maintained on every write: articles sorted by
+(created_at, slug) globally and per author, each user's bookmarks sorted by
+(bookmarked_at, slug) and the authors each user follows sorted by
+(subscribed_at, author). A page is then a bisect plus a slice, O(log n + k),
+instead of a scan over every article or bookmark.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import bisect
+import threading
+
+from .base import Cursor, Store, numbered_slug, project
+
+
+def _comment_key(c: Dict[str, Any]) -> Cursor:
+    return (c.get("created_at", ""), c.get("id", ""))
+
+
+def _article_key(a: Dict[str, Any]) -> Cursor:
+    return (a.get("created_at", ""), a.get("slug", ""))
+
+
+def _discard(index: List[Cursor], key: Cursor) -> None:
+    i = bisect.bisect_left(index, key)
+    if i < len(index) and index[i] == key:
+        del index[i]
+
+
+def _newest(index: List[Cursor], limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+    """Up to `limit` keys of an ascending index, newest first, strictly before the cursor."""
+    end = bisect.bisect_left(index, after) if after else len(index)
+    return index[max(0, end - limit):end][::-1]
+
+
+class MemoryStore(Store):
+    name = "memory"
+    persistent = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.articles_by_slug: Dict[str, Dict[str, Any]] = {}
+        self.comments_by_slug: Dict[str, List[Dict[str, Any]]] = {}  # newest first
+        self.likes_by_slug: Dict[str, Dict[str, str]] = {}  # slug -> {uid: liked_at}
+        self.bookmarks_by_slug: Dict[str, Set[str]] = {}
+        self.subscriptions_by_author: Dict[str, Set[str]] = {}
+        # Secondary indexes
+        self.articles_index: List[Cursor] = []  # (created_at, slug), ascending
+        self.articles_by_author: Dict[str, List[Cursor]] = {}  # created_by -> (created_at, slug), ascending
+        self.bookmarks_by_user: Dict[str, Dict[str, str]] = {}  # uid -> {slug: bookmarked_at}
+        self.bookmarks_index: Dict[str, List[Cursor]] = {}  # uid -> (bookmarked_at, slug), ascending
+        self.subscriptions_by_user: Dict[str, Dict[str, str]] = {}  # uid -> {author_id: subscribed_at}
+        self.subscriptions_index: Dict[str, List[Cursor]] = {}  # uid -> (subscribed_at, author_id), ascending
+        self.slug_counters: Dict[str, int] = {}  # slug base -> last number handed out by create_unique
+
+    def _index(self, a: Dict[str, Any]):
+        key = _article_key(a)
+        bisect.insort(self.articles_index, key)
+        bisect.insort(self.articles_by_author.setdefault(a.get("created_by") or "", []), key)
+
+    def _unindex(self, a: Dict[str, Any]):
+        key = _article_key(a)
+        _discard(self.articles_index, key)
+        author = a.get("created_by") or ""
+        by_author = self.articles_by_author.get(author)
+        if by_author is not None:
+            _discard(by_author, key)
+            if not by_author:
+                del self.articles_by_author[author]
+
+    def _set_mark(self, marks: Dict[str, Dict[str, str]], index: Dict[str, List[Cursor]], uid: str, target: str, at: str):
+        by_user = marks.setdefault(uid, {})
+        old = by_user.get(target)
+        if old is not None:
+            _discard(index[uid], (old, target))
+        by_user[target] = at
+        bisect.insort(index.setdefault(uid, []), (at, target))
+
+    def _drop_mark(self, marks: Dict[str, Dict[str, str]], index: Dict[str, List[Cursor]], uid: str, target: str):
+        at = marks.get(uid, {}).pop(target, None)
+        if at is None:
+            return
+        _discard(index[uid], (at, target))
+        if not marks[uid]:
+            del marks[uid], index[uid]
+
+    # --- articles ---
+
+    def is_empty(self) -> bool:
+        return not self.articles_by_slug
+
+    def exists(self, slug: str) -> bool:
+        return slug in self.articles_by_slug
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            a = self.articles_by_slug.get(slug)
+            return dict(a) if a is not None else None
+
+    def get_many(self, slugs: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {s: project(self.articles_by_slug[s], fields) for s in slugs if s in self.articles_by_slug}
+
+    def create(self, article: Dict[str, Any]) -> None:
+        slug = article["slug"]
+        with self._lock:
+            old = self.articles_by_slug.get(slug)
+            if old is not None:
+                self._unindex(old)
+            self.articles_by_slug[slug] = dict(article)
+            self._index(self.articles_by_slug[slug])
+            self.comments_by_slug.setdefault(slug, [])
+            self.likes_by_slug.setdefault(slug, {})
+            self.bookmarks_by_slug.setdefault(slug, set())
+
+    def create_unique(self, article: Dict[str, Any], base: str) -> str:
+        with self._lock:
+            n = self.slug_counters.get(base, 0) + 1
+            while numbered_slug(base, n) in self.articles_by_slug:
+                n += 1
+            self.slug_counters[base] = n
+            slug = numbered_slug(base, n)
+            self.create({**article, "slug": slug})
+        return slug
+
+    def import_articles(self, bundles: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for bundle in bundles:
+                slug = bundle["article"]["slug"]
+                self.create(bundle["article"])
+                comments = [dict(c) for c in bundle.get("comments", [])]
+                self.comments_by_slug[slug] = sorted(comments, key=_comment_key, reverse=True)
+                self.likes_by_slug[slug] = {l["uid"]: l.get("at", "") for l in bundle.get("likes", [])}
+                for b in bundle.get("bookmarks", []):
+                    self.bookmarks_by_slug[slug].add(b["uid"])
+                    self._set_mark(self.bookmarks_by_user, self.bookmarks_index, b["uid"], slug, b.get("at", ""))
+
+    def update(self, slug: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            a = self.articles_by_slug.get(slug)
+            if a is None:
+                return None
+            self._unindex(a)
+            a.update(changes)
+            self._index(a)
+            return dict(a)
+
+    def delete(self, slug: str) -> bool:
+        with self._lock:
+            a = self.articles_by_slug.pop(slug, None)
+            if a is None:
+                return False
+            self._unindex(a)
+            self.comments_by_slug.pop(slug, None)
+            self.likes_by_slug.pop(slug, None)
+            for uid in self.bookmarks_by_slug.pop(slug, set()):
+                self._drop_mark(self.bookmarks_by_user, self.bookmarks_index, uid, slug)
+            return True
+
+    def list_recent(self, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [project(self.articles_by_slug[slug], fields) for _, slug in _newest(self.articles_index, limit, after)]
+
+    def list_by_author(self, uid: str, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = _newest(self.articles_by_author.get(uid, []), limit, after)
+            return [project(self.articles_by_slug[slug], fields) for _, slug in keys]
+
+    def iter_articles(self, fields: Optional[List[str]] = None, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = [
+                project(a, fields) for a in self.articles_by_slug.values()
+                if since is None or max(a.get("created_at") or "", a.get("updated_at") or "") > since
+            ]
+        return iter(rows)
+
+    def add_views(self, deltas: Dict[str, int], shards: int = 0, hot_threshold: int = 0) -> Tuple[int, Dict[str, int]]:
+        written = 0
+        with self._lock:
+            for slug, delta in deltas.items():
+                a = self.articles_by_slug.get(slug)
+                if a is not None:
+                    a["views"] = int(a.get("views", 0) or 0) + delta
+                    written += delta
+        return written, {}
+
+    def increment_likes(self, slug: str) -> Optional[int]:
+        with self._lock:
+            a = self.articles_by_slug.get(slug)
+            if a is None:
+                return None
+            a["likes"] = int(a.get("likes", 0)) + 1
+            return a["likes"]
+
+    # --- comments ---
+
+    def list_comments(self, slug: str, limit: int, after: Optional[Cursor] = None) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if slug not in self.articles_by_slug:
+                return None
+            comments = self.comments_by_slug.get(slug, [])
+            # comments are kept newest-first; binary search for the first one past the cursor
+            lo, hi = 0, len(comments)
+            while after and lo < hi:
+                mid = (lo + hi) // 2
+                if _comment_key(comments[mid]) >= after:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return [dict(c) for c in comments[lo:lo + limit]]
+
+    def add_comment(self, slug: str, comment: Dict[str, Any]) -> bool:
+        with self._lock:
+            a = self.articles_by_slug.get(slug)
+            if a is None:
+                return False
+            comments = self.comments_by_slug.setdefault(slug, [])
+            comments.insert(0, dict(comment))
+            a["comments_count"] = len(comments)
+            return True
+
+    def count_comments(self, slug: str) -> int:
+        return len(self.comments_by_slug.get(slug, []))
+
+    def dump_social(self, slug: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                "comments": [dict(c) for c in self.comments_by_slug.get(slug, [])],
+                "likes": [{"uid": uid, "at": at} for uid, at in self.likes_by_slug.get(slug, {}).items()],
+                "bookmarks": [
+                    {"uid": uid, "at": self.bookmarks_by_user.get(uid, {}).get(slug, "")}
+                    for uid in sorted(self.bookmarks_by_slug.get(slug, set()))
+                ],
+            }
+
+    # --- likes, bookmarks, subscriptions ---
+
+    def like_state(self, slug: str, uid: Optional[str]) -> Optional[Tuple[int, bool]]:
+        with self._lock:
+            if slug not in self.articles_by_slug:
+                return None
+            likes = self.likes_by_slug.get(slug, {})
+            return len(likes), bool(uid and uid in likes)
+
+    def toggle_like(self, slug: str, uid: str, at: str) -> Optional[Tuple[int, bool]]:
+        with self._lock:
+            a = self.articles_by_slug.get(slug)
+            if a is None:
+                return None
+            likes = self.likes_by_slug.setdefault(slug, {})
+            liked = uid not in likes
+            if liked:
+                likes[uid] = at
+            else:
+                del likes[uid]
+            a["likes"] = len(likes)
+            return len(likes), liked
+
+    def bookmark_state(self, slug: str, uid: Optional[str]) -> Optional[bool]:
+        with self._lock:
+            if slug not in self.articles_by_slug:
+                return None
+            return bool(uid and uid in self.bookmarks_by_slug.get(slug, set()))
+
+    def toggle_bookmark(self, slug: str, uid: str, at: str) -> Optional[bool]:
+        with self._lock:
+            if slug not in self.articles_by_slug:
+                return None
+            s = self.bookmarks_by_slug.setdefault(slug, set())
+            if uid in s:
+                s.remove(uid)
+                self._drop_mark(self.bookmarks_by_user, self.bookmarks_index, uid, slug)
+                return False
+            s.add(uid)
+            self._set_mark(self.bookmarks_by_user, self.bookmarks_index, uid, slug, at)
+            return True
+
+    def list_bookmarks(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        with self._lock:
+            return _newest(self.bookmarks_index.get(uid, []), limit, after)
+
+    def subscription_state(self, author_id: str, uid: Optional[str]) -> Tuple[bool, int]:
+        with self._lock:
+            followers = self.subscriptions_by_author.get(author_id, set())
+            return bool(uid and uid in followers), len(followers)
+
+    def toggle_subscription(self, author_id: str, uid: str, at: str) -> Tuple[bool, int]:
+        with self._lock:
+            followers = self.subscriptions_by_author.setdefault(author_id, set())
+            subscribed = uid not in followers
+            if subscribed:
+                followers.add(uid)
+                self._set_mark(self.subscriptions_by_user, self.subscriptions_index, uid, author_id, at)
+            else:
+                followers.remove(uid)
+                self._drop_mark(self.subscriptions_by_user, self.subscriptions_index, uid, author_id)
+            return subscribed, len(followers)
+
+    def reconcile_subscriber_counts(self) -> int:
+        return 0  # the follower sets are the counters
+
+    def list_subscriptions(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        with self._lock:
+            return _newest(self.subscriptions_index.get(uid, []), limit, after)
@@ -0,0 +1,458 @@
+"""SQLite backend for single-node deployments.
+
+The database runs in WAL mode so readers never block the writer and several
+uvicorn workers can share one file. Each thread keeps its own connection,
+and the sqlite3 module caches prepared statements per connection. Articles
+are stored as a JSON document plus indexed columns for ordering and
+counters. Search uses an FTS5 table maintained in the same transaction as
+the article write.
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import re
+import sqlite3
+import threading
+
+from .base import Cursor, Store, numbered_slug, project
+
+# columns that live outside the JSON document
+COUNTERS = ("likes", "views", "comments_count")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    created_by TEXT NOT NULL DEFAULT '',
+    likes INTEGER NOT NULL DEFAULT 0,
+    views INTEGER NOT NULL DEFAULT 0,
+    comments_count INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_created ON articles (created_at, slug);
+CREATE INDEX IF NOT EXISTS articles_author ON articles (created_by, created_at, slug);
+CREATE INDEX IF NOT EXISTS articles_updated ON articles (updated_at);
+CREATE TABLE IF NOT EXISTS comments (
+    slug TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (slug, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS comments_page ON comments (slug, created_at, id);
+CREATE TABLE IF NOT EXISTS likes (
+    slug TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    at TEXT NOT NULL,
+    PRIMARY KEY (slug, uid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bookmarks (
+    slug TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    at TEXT NOT NULL,
+    PRIMARY KEY (slug, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookmarks_by_user ON bookmarks (uid, at, slug);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    author_id TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    at TEXT NOT NULL,
+    PRIMARY KEY (author_id, uid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS subscriptions_following ON subscriptions (uid, at, author_id);
+CREATE TABLE IF NOT EXISTS authors (
+    author_id TEXT PRIMARY KEY,
+    subscriber_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS slug_counters (
+    base TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, subtitle, content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def _fts_text(text: Any) -> str:
+    # same normalization as search_index.tokenize: drop HTML tags, fold 'ё' to 'е'
+    return _TAG_RE.sub(" ", str(text or "")).lower().replace("ё", "е")
+
+
+class SQLiteStore(Store):
+    name = "sqlite"
+    native_search = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM authors) AND EXISTS (SELECT 1 FROM subscriptions)").fetchone()[0]:
+            # database created before subscriber counters existed
+            self.reconcile_subscriber_counts()
+
+    # --- connections ---
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode; writes open explicit BEGIN IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction; takes the write lock up front so read-then-write toggles don't race."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections = []
+        self._local = threading.local()
+
+    # --- row mapping ---
+
+    @staticmethod
+    def _doc(row: sqlite3.Row) -> Dict[str, Any]:
+        data = json.loads(row["doc"])
+        for name in COUNTERS:
+            data[name] = row[name]
+        return data
+
+    def _article_id(self, conn: sqlite3.Connection, slug: str) -> Optional[int]:
+        row = conn.execute("SELECT id FROM articles WHERE slug = ?", (slug,)).fetchone()
+        return row["id"] if row else None
+
+    @staticmethod
+    def _index_fts(conn: sqlite3.Connection, article_id: int, data: Dict[str, Any]):
+        conn.execute("DELETE FROM articles_fts WHERE rowid = ?", (article_id,))
+        conn.execute(
+            "INSERT INTO articles_fts (rowid, title, subtitle, content) VALUES (?, ?, ?, ?)",
+            (article_id, _fts_text(data.get("title")), _fts_text(data.get("subtitle")), _fts_text(data.get("content"))),
+        )
+
+    # --- articles ---
+
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM articles LIMIT 1").fetchone() is None
+
+    def exists(self, slug: str) -> bool:
+        return self._article_id(self._conn(), slug) is not None
+
+    def get(self, slug: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM articles WHERE slug = ?", (slug,)).fetchone()
+        return self._doc(row) if row else None
+
+    def get_many(self, slugs: List[str], fields: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        if not slugs:
+            return {}
+        marks = ",".join("?" * len(slugs))
+        rows = self._conn().execute(f"SELECT * FROM articles WHERE slug IN ({marks})", list(slugs)).fetchall()
+        return {row["slug"]: project(self._doc(row), fields) for row in rows}
+
+    def create(self, article: Dict[str, Any]) -> None:
+        with self._tx() as conn:
+            old = self._article_id(conn, article["slug"])
+            if old is not None:
+                self._delete_locked(conn, old, article["slug"])
+            self._insert_locked(conn, article)
+
+    def create_unique(self, article: Dict[str, Any], base: str) -> str:
+        with self._tx() as conn:
+            row = conn.execute("SELECT n FROM slug_counters WHERE base = ?", (base,)).fetchone()
+            n = (row[0] if row else 0) + 1
+            while self._article_id(conn, numbered_slug(base, n)) is not None:
+                n += 1
+            conn.execute(
+                "INSERT INTO slug_counters (base, n) VALUES (?, ?) ON CONFLICT (base) DO UPDATE SET n = excluded.n",
+                (base, n),
+            )
+            slug = numbered_slug(base, n)
+            self._insert_locked(conn, {**article, "slug": slug})
+        return slug
+
+    def _insert_locked(self, conn: sqlite3.Connection, article: Dict[str, Any]):
+        doc = {k: v for k, v in article.items() if k not in COUNTERS}
+        cur = conn.execute(
+            "INSERT INTO articles (slug, created_at, updated_at, created_by, likes, views, comments_count, doc)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                article["slug"], article.get("created_at") or "", article.get("updated_at") or "",
+                article.get("created_by") or "", int(article.get("likes") or 0),
+                int(article.get("views") or 0), int(article.get("comments_count") or 0),
+                json.dumps(doc, ensure_ascii=False),
+            ),
+        )
+        self._index_fts(conn, cur.lastrowid, article)
+
+    def import_articles(self, bundles: List[Dict[str, Any]]) -> None:
+        # one transaction (one fsync) for the whole chunk
+        with self._tx() as conn:
+            for bundle in bundles:
+                slug = bundle["article"]["slug"]
+                self._insert_locked(conn, bundle["article"])
+                conn.executemany(
+                    "INSERT INTO comments (slug, id, created_at, doc) VALUES (?, ?, ?, ?)",
+                    [(slug, c["id"], c.get("created_at") or "", json.dumps(c, ensure_ascii=False)) for c in bundle.get("comments", [])],
+                )
+                for table in ("likes", "bookmarks"):
+                    conn.executemany(
+                        f"INSERT INTO {table} (slug, uid, at) VALUES (?, ?, ?)",
+                        [(slug, m["uid"], m.get("at") or "") for m in bundle.get(table, [])],
+                    )
+
+    def update(self, slug: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._tx() as conn:
+            row = conn.execute("SELECT * FROM articles WHERE slug = ?", (slug,)).fetchone()
+            if row is None:
+                return None
+            data = self._doc(row)
+            data.update(changes)
+            doc = {k: v for k, v in data.items() if k not in COUNTERS}
+            conn.execute(
+                "UPDATE articles SET updated_at = ?, created_by = ?, likes = ?, views = ?, comments_count = ?, doc = ? WHERE id = ?",
+                (
+                    data.get("updated_at") or "", data.get("created_by") or "", int(data.get("likes") or 0),
+                    int(data.get("views") or 0), int(data.get("comments_count") or 0),
+                    json.dumps(doc, ensure_ascii=False), row["id"],
+                ),
+            )
+            if {"title", "subtitle", "content"} & changes.keys():
+                self._index_fts(conn, row["id"], data)
+            return data
+
+    def _delete_locked(self, conn: sqlite3.Connection, article_id: int, slug: str):
+        conn.execute("DELETE FROM articles_fts WHERE rowid = ?", (article_id,))
+        conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+        for table in ("comments", "likes", "bookmarks"):
+            conn.execute(f"DELETE FROM {table} WHERE slug = ?", (slug,))
+
+    def delete(self, slug: str) -> bool:
+        with self._tx() as conn:
+            article_id = self._article_id(conn, slug)
+            if article_id is None:
+                return False
+            self._delete_locked(conn, article_id, slug)
+            return True
+
+    def _page(self, where: str, params: Tuple, limit: int, after: Optional[Cursor], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        clauses = [where] if where else []
+        args = list(params)
+        if after:
+            clauses.append("(created_at, slug) < (?, ?)")
+            args.extend(after)
+        sql = "SELECT * FROM articles"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC, slug DESC LIMIT ?"
+        args.append(limit)
+        return [project(self._doc(row), fields) for row in self._conn().execute(sql, args)]
+
+    def list_recent(self, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._page("", (), limit, after, fields)
+
+    def list_by_author(self, uid: str, limit: int, after: Optional[Cursor] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._page("created_by = ?", (uid,), limit, after, fields)
+
+    def iter_articles(self, fields: Optional[List[str]] = None, since: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        if since is None:
+            rows = self._conn().execute("SELECT * FROM articles ORDER BY id").fetchall()
+        else:
+            rows = self._conn().execute("SELECT * FROM articles WHERE created_at > ? OR updated_at > ? ORDER BY id", (since, since)).fetchall()
+        for row in rows:
+            yield project(self._doc(row), fields)
+
+    def add_views(self, deltas: Dict[str, int], shards: int = 0, hot_threshold: int = 0) -> Tuple[int, Dict[str, int]]:
+        written = 0
+        with self._tx() as conn:
+            for slug, delta in deltas.items():
+                cur = conn.execute("UPDATE articles SET views = views + ? WHERE slug = ?", (delta, slug))
+                if cur.rowcount:
+                    written += delta
+        return written, {}
+
+    def increment_likes(self, slug: str) -> Optional[int]:
+        with self._tx() as conn:
+            row = conn.execute("UPDATE articles SET likes = likes + 1 WHERE slug = ? RETURNING likes", (slug,)).fetchone()
+        return row["likes"] if row else None
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        tokens = _TOKEN_RE.findall(_fts_text(query))
+        if not tokens:
+            return []
+        # every token must match, as a prefix; title and subtitle outweigh the body
+        match = " AND ".join('"%s"*' % t for t in dict.fromkeys(tokens))
+        rows = self._conn().execute(
+            "SELECT a.slug, bm25(articles_fts, 3.0, 2.0, 1.0) AS rank FROM articles_fts"
+            " JOIN articles a ON a.id = articles_fts.rowid"
+            " WHERE articles_fts MATCH ? ORDER BY rank, a.created_at DESC LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [(row["slug"], -row["rank"]) for row in rows]
+
+    # --- comments ---
+
+    def list_comments(self, slug: str, limit: int, after: Optional[Cursor] = None) -> Optional[List[Dict[str, Any]]]:
+        conn = self._conn()
+        if self._article_id(conn, slug) is None:
+            return None
+        if after:
+            rows = conn.execute(
+                "SELECT doc FROM comments WHERE slug = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (slug, after[0], after[1], limit),
+            )
+        else:
+            rows = conn.execute("SELECT doc FROM comments WHERE slug = ? ORDER BY created_at DESC, id DESC LIMIT ?", (slug, limit))
+        return [json.loads(row["doc"]) for row in rows]
+
+    def add_comment(self, slug: str, comment: Dict[str, Any]) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute("UPDATE articles SET comments_count = comments_count + 1 WHERE slug = ?", (slug,))
+            if not cur.rowcount:
+                return False
+            conn.execute(
+                "INSERT INTO comments (slug, id, created_at, doc) VALUES (?, ?, ?, ?)",
+                (slug, comment["id"], comment.get("created_at") or "", json.dumps(comment, ensure_ascii=False)),
+            )
+            return True
+
+    def count_comments(self, slug: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM comments WHERE slug = ?", (slug,)).fetchone()[0]
+
+    def dump_social(self, slug: str) -> Dict[str, List[Dict[str, Any]]]:
+        conn = self._conn()
+        rows = conn.execute("SELECT doc FROM comments WHERE slug = ? ORDER BY created_at DESC, id DESC", (slug,))
+        out: Dict[str, List[Dict[str, Any]]] = {"comments": [json.loads(row["doc"]) for row in rows]}
+        for table in ("likes", "bookmarks"):
+            rows = conn.execute(f"SELECT uid, at FROM {table} WHERE slug = ? ORDER BY uid", (slug,))
+            out[table] = [{"uid": row["uid"], "at": row["at"]} for row in rows]
+        return out
+
+    # --- likes, bookmarks, subscriptions ---
+
+    def like_state(self, slug: str, uid: Optional[str]) -> Optional[Tuple[int, bool]]:
+        row = self._conn().execute(
+            "SELECT likes, EXISTS (SELECT 1 FROM likes WHERE slug = a.slug AND uid = ?) AS liked FROM articles a WHERE slug = ?",
+            (uid or "", slug),
+        ).fetchone()
+        if row is None:
+            return None
+        return row["likes"], bool(uid) and bool(row["liked"])
+
+    def toggle_like(self, slug: str, uid: str, at: str) -> Optional[Tuple[int, bool]]:
+        with self._tx() as conn:
+            if self._article_id(conn, slug) is None:
+                return None
+            liked = conn.execute("DELETE FROM likes WHERE slug = ? AND uid = ?", (slug, uid)).rowcount == 0
+            if liked:
+                conn.execute("INSERT INTO likes (slug, uid, at) VALUES (?, ?, ?)", (slug, uid, at))
+            row = conn.execute(
+                "UPDATE articles SET likes = MAX(0, likes + ?) WHERE slug = ? RETURNING likes", (1 if liked else -1, slug)
+            ).fetchone()
+            return row["likes"], liked
+
+    def bookmark_state(self, slug: str, uid: Optional[str]) -> Optional[bool]:
+        row = self._conn().execute(
+            "SELECT EXISTS (SELECT 1 FROM bookmarks WHERE slug = a.slug AND uid = ?) AS marked FROM articles a WHERE slug = ?",
+            (uid or "", slug),
+        ).fetchone()
+        if row is None:
+            return None
+        return bool(uid) and bool(row["marked"])
+
+    def toggle_bookmark(self, slug: str, uid: str, at: str) -> Optional[bool]:
+        with self._tx() as conn:
+            if self._article_id(conn, slug) is None:
+                return None
+            if conn.execute("DELETE FROM bookmarks WHERE slug = ? AND uid = ?", (slug, uid)).rowcount:
+                return False
+            conn.execute("INSERT INTO bookmarks (slug, uid, at) VALUES (?, ?, ?)", (slug, uid, at))
+            return True
+
+    def list_bookmarks(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        if after:
+            rows = self._conn().execute(
+                "SELECT at, slug FROM bookmarks WHERE uid = ? AND (at, slug) < (?, ?) ORDER BY at DESC, slug DESC LIMIT ?",
+                (uid, after[0], after[1], limit),
+            )
+        else:
+            rows = self._conn().execute("SELECT at, slug FROM bookmarks WHERE uid = ? ORDER BY at DESC, slug DESC LIMIT ?", (uid, limit))
+        return [(row["at"], row["slug"]) for row in rows]
+
+    def subscription_state(self, author_id: str, uid: Optional[str]) -> Tuple[bool, int]:
+        row = self._conn().execute(
+            "SELECT (SELECT subscriber_count FROM authors WHERE author_id = ?) AS n,"
+            " EXISTS (SELECT 1 FROM subscriptions WHERE author_id = ? AND uid = ?) AS mine",
+            (author_id, author_id, uid or ""),
+        ).fetchone()
+        return bool(uid) and bool(row["mine"]), row["n"] or 0
+
+    def toggle_subscription(self, author_id: str, uid: str, at: str) -> Tuple[bool, int]:
+        with self._tx() as conn:
+            subscribed = conn.execute("DELETE FROM subscriptions WHERE author_id = ? AND uid = ?", (author_id, uid)).rowcount == 0
+            if subscribed:
+                conn.execute("INSERT INTO subscriptions (author_id, uid, at) VALUES (?, ?, ?)", (author_id, uid, at))
+            count = conn.execute(
+                "INSERT INTO authors (author_id, subscriber_count) VALUES (?, MAX(0, ?))"
+                " ON CONFLICT (author_id) DO UPDATE SET subscriber_count = MAX(0, subscriber_count + ?)"
+                " RETURNING subscriber_count",
+                (author_id, 1 if subscribed else -1, 1 if subscribed else -1),
+            ).fetchone()[0]
+        return subscribed, count
+
+    def reconcile_subscriber_counts(self) -> int:
+        with self._tx() as conn:
+            # authors whose stored counter differs from the edges (including missing rows)
+            drifted = conn.execute(
+                "SELECT s.author_id, s.n FROM (SELECT author_id, COUNT(*) AS n FROM subscriptions GROUP BY author_id) s"
+                " LEFT JOIN authors a ON a.author_id = s.author_id WHERE a.subscriber_count IS NOT s.n"
+                " UNION ALL SELECT a.author_id, 0 FROM authors a"
+                " WHERE a.subscriber_count != 0 AND NOT EXISTS (SELECT 1 FROM subscriptions s WHERE s.author_id = a.author_id)"
+            ).fetchall()
+            conn.executemany(
+                "INSERT INTO authors (author_id, subscriber_count) VALUES (?, ?)"
+                " ON CONFLICT (author_id) DO UPDATE SET subscriber_count = excluded.subscriber_count",
+                [(row[0], row[1]) for row in drifted],
+            )
+        return len(drifted)
+
+    def list_subscriptions(self, uid: str, limit: int, after: Optional[Cursor] = None) -> List[Cursor]:
+        if after:
+            rows = self._conn().execute(
+                "SELECT at, author_id FROM subscriptions WHERE uid = ? AND (at, author_id) < (?, ?)"
+                " ORDER BY at DESC, author_id DESC LIMIT ?",
+                (uid, after[0], after[1], limit),
+            )
+        else:
+            rows = self._conn().execute(
+                "SELECT at, author_id FROM subscriptions WHERE uid = ? ORDER BY at DESC, author_id DESC LIMIT ?", (uid, limit)
+            )
+        return [(row["at"], row["author_id"]) for row in rows]
@@ -1,7 +1,17 @@
+import json
 import os
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
 import pytest
 from httpx import AsyncClient
 from main import app
+import main
+import fake_firestore
+from fake_auth import FakeTokenIssuer
+
+_real_verify_user = main._verify_user  # fake_fs replaces it
 
 
 @pytest.mark.asyncio
@@ -26,3 +36,745 @@ async def test_comment_unauth_blocked_by_default(monkeypatch):
         assert r.status_code == 401
 
 
+@pytest.fixture
+def fake_fs(monkeypatch):
+    fs = fake_firestore.FakeFirestore()
+    monkeypatch.setattr(main, "_fs_client", fs)
+    monkeypatch.setattr(main, "firestore", fake_firestore)
+    monkeypatch.setattr(main, "_verify_user", lambda authorization: {"uid": "u1", "name": "U1"})
+    monkeypatch.setattr(main, "search_index", main.SearchIndex())
+    monkeypatch.setattr(main, "_search_index_loaded", False)
+    monkeypatch.setattr(main, "article_cache", main.TTLCache(100, 30, name="articles"))
+    monkeypatch.setattr(main, "feed_cache", main.TTLCache(100, 30, name="feed"))
+    monkeypatch.setattr(main, "following_feed_cache", main.TTLCache(100, 30, name="following_feed"))
+    return fs
+
+
+def _seed_fs_articles(fs, n: int, comments_per_article: int = 3):
+    for i in range(n):
+        slug = f"a{i}"
+        ref = fs.collection("articles").document(slug)
+        ref.set({"slug": slug, "title": f"Article {i}", "content": "text", "created_at": f"2025-01-01T00:00:{i:02d}Z", "created_by": "u1"})
+        for j in range(comments_per_article):
+            ref.collection("comments").document(f"c{j}").set({"id": f"c{j}", "text": "x", "created_at": f"2025-01-02T00:00:{j:02d}Z"})
+        fs.collection("users").document("u1").collection("bookmarks").document(slug).set({"slug": slug, "at": f"2025-02-01T00:00:{i:02d}Z"})
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_do_not_stream_comments(fake_fs):
+    _seed_fs_articles(fake_fs, 20)
+    assert main.reconcile_comments_count() == 20
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for path in ("/api/v1/articles", "/api/v1/search?q=article", "/api/v1/users/me/articles", "/api/v1/users/me/bookmarks"):
+            fake_fs.stats.reset()
+            r = await ac.get(path, headers=headers)
+            assert r.status_code == 200
+            items = r.json()
+            assert len(items) == 20
+            assert all(a["comments_count"] == 3 for a in items)
+            # one read per article (+ the bookmark index read)
+            assert fake_fs.stats.reads <= 2 * 20 + 1
+
+
+@pytest.mark.asyncio
+async def test_add_comment_increments_counter(fake_fs):
+    _seed_fs_articles(fake_fs, 1, comments_per_article=0)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/articles/a0/comments", json={"text": "hello"}, headers={"Authorization": "Bearer t"})
+        assert r.status_code == 201
+        r = await ac.get("/api/v1/articles")
+        assert r.json()[0]["comments_count"] == 1
+    assert main.reconcile_comments_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_create_article_transliterates_and_numbers_slugs(fake_fs):
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        slugs = []
+        for _ in range(3):
+            fake_fs.stats.reset()
+            r = await ac.post("/api/v1/articles", json={"title": "Добро пожаловать", "content": "текст"}, headers=headers)
+            assert r.status_code == 201
+            slugs.append(r.json()["slug"])
+            # the slug costs a counter read and one candidate read, however many collisions came before
+            assert fake_fs.stats.reads == 2
+        assert slugs == ["dobro-pozhalovat", "dobro-pozhalovat-2", "dobro-pozhalovat-3"]
+        r = await ac.get("/api/v1/articles/dobro-pozhalovat-2")
+        assert r.status_code == 200 and r.json()["title"] == "Добро пожаловать"
+        r = await ac.post("/api/v1/articles", json={"title": "!!!"}, headers=headers)
+        assert r.json()["slug"] == "untitled"
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_all_pages(fake_fs):
+    _seed_fs_articles(fake_fs, 7, comments_per_article=2)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for path in ("/api/v1/articles", "/api/v1/users/me/articles", "/api/v1/users/me/bookmarks", "/api/v1/search?q=article"):
+            seen, cursor = [], None
+            while True:
+                params = {"limit": 3}
+                if cursor:
+                    params["cursor"] = cursor
+                r = await ac.get(path, params=params, headers=headers)
+                assert r.status_code == 200
+                assert len(r.json()) <= 3
+                seen.extend(a["slug"] for a in r.json())
+                cursor = r.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            assert seen == [f"a{i}" for i in range(6, -1, -1)]
+        r = await ac.get("/api/v1/articles/a0/comments", params={"limit": 1})
+        assert len(r.json()) == 1 and r.headers.get("X-Next-Cursor")
+        r = await ac.get("/api/v1/articles", params={"cursor": "not-a-cursor"})
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_in_memory(monkeypatch):
+    monkeypatch.setattr(main, "_verify_user", lambda authorization: {"uid": "pager"})
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for i in range(5):
+            r = await ac.post("/api/v1/articles", json={"title": f"Page test {i}"}, headers={"Authorization": "Bearer t"})
+            assert r.status_code == 201
+            r = await ac.post(f"/api/v1/articles/{r.json()['slug']}/comments", json={"text": f"c{i}"}, headers={"Authorization": "Bearer t"})
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            r = await ac.get("/api/v1/users/me/articles", params=params, headers={"Authorization": "Bearer t"})
+            seen.extend(a["title"] for a in r.json())
+            cursor = r.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == [f"Page test {i}" for i in range(4, -1, -1)]
+        r = await ac.get("/api/v1/articles", params={"limit": 100})
+        assert len(r.json()) >= 5
+
+
+@pytest.mark.asyncio
+async def test_list_returns_card_projection(fake_fs):
+    _seed_fs_articles(fake_fs, 2, comments_per_article=0)
+    fake_fs.collection("articles").document("a1").update({"content": "<p>" + "слово " * 500 + "</p>"})
+    assert main.backfill_excerpts() == 2
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for path in ("/api/v1/articles", "/api/v1/users/me/articles", "/api/v1/users/me/bookmarks"):
+            r = await ac.get(path, headers=headers)
+            card = r.json()[0]
+            assert "content" not in card
+            assert card["excerpt"].startswith("слово") and len(card["excerpt"]) <= main.EXCERPT_MAX_CHARS + 1
+            r = await ac.get(path, params={"fields": "full"}, headers=headers)
+            assert "content" in r.json()[0]
+        r = await ac.get("/api/v1/articles", params={"fields": "title"})
+        assert set(r.json()[0]) == {"slug", "created_at", "comments_count", "title"}
+        # unknown names (invalid Firestore field paths among them) are a 400, not a 500
+        for bad in ("a..b", "`x", "title,created_by_email"):
+            r = await ac.get("/api/v1/articles", params={"fields": bad})
+            assert r.status_code == 400 and r.json()["detail"]["error"] == "unknown fields"
+        # the same set in another order is the same feed cache entry
+        await ac.get("/api/v1/articles", params={"fields": "likes,title"})
+        before = len(main.feed_cache)
+        await ac.get("/api/v1/articles", params={"fields": "title,likes, title"})
+        assert len(main.feed_cache) == before
+
+
+@pytest.mark.asyncio
+async def test_search_uses_index_and_snapshot(fake_fs, monkeypatch, tmp_path):
+    _seed_fs_articles(fake_fs, 30, comments_per_article=0)
+    fake_fs.collection("articles").document("a3").update({"title": "Дизайн интерфейсов"})
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/v1/search", params={"q": "дизайн"})
+        assert [a["slug"] for a in r.json()] == ["a3"]
+        # once the index is built a query only reads the matching page
+        fake_fs.stats.reset()
+        r = await ac.get("/api/v1/search", params={"q": "интерф"})
+        assert [a["slug"] for a in r.json()] == ["a3"]
+        assert fake_fs.stats.reads <= 2
+    path = str(tmp_path / "search.gz")
+    main.search_index.snapshot(path)
+    fake_fs.collection("articles").document("late").set({"slug": "late", "title": "Поздняя статья", "created_at": "2999-01-01T00:00:00Z"})
+    monkeypatch.setattr(main, "SEARCH_INDEX_PATH", path)
+    monkeypatch.setattr(main, "search_index", main.SearchIndex())
+    monkeypatch.setattr(main, "_search_index_loaded", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        fake_fs.stats.reset()
+        r = await ac.get("/api/v1/search", params={"q": "поздняя"})
+        assert [a["slug"] for a in r.json()] == ["late"]
+        # restored from disk: no full collection scan
+        assert fake_fs.stats.reads < 30
+
+
+@pytest.mark.asyncio
+async def test_search_syncs_with_other_processes_writes(fake_fs, monkeypatch):
+    _seed_fs_articles(fake_fs, 3, comments_per_article=0)
+    monkeypatch.setattr(main, "SEARCH_INDEX_SYNC_SECONDS", 3600)
+    articles = fake_fs.collection("articles")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert len((await ac.get("/api/v1/search", params={"q": "article"})).json()) == 3
+        # written by another worker: a fresh article, and an import that keeps its old timestamps
+        articles.document("fresh").set({"slug": "fresh", "title": "Свежая статья", "created_at": main.now_iso()})
+        articles.document("old").set({"slug": "old", "title": "Архивная статья", "created_at": "2020-01-01T00:00:00Z"})
+        articles.document("a1").delete()
+        r = await ac.get("/api/v1/search", params={"q": "статья"})
+        assert r.json() == []  # not synced yet
+        # a deleted article is dropped from results (and from the index) straight away
+        assert [a["slug"] for a in (await ac.get("/api/v1/search", params={"q": "article"})).json()] == ["a2", "a0"]
+        assert "a1" not in main.search_index
+
+        monkeypatch.setattr(main, "SEARCH_INDEX_SYNC_SECONDS", 0)
+        r = await ac.get("/api/v1/search", params={"q": "статья"})
+        assert [a["slug"] for a in r.json()] == ["fresh"]
+        # the periodic full read picks up what timestamps cannot show
+        monkeypatch.setattr(main, "SEARCH_INDEX_REBUILD_SECONDS", 0.001)
+        r = await ac.get("/api/v1/search", params={"q": "статья"})
+        assert sorted(a["slug"] for a in r.json()) == ["fresh", "old"]
+
+
+def _local_firebase_keys():
+    import rsa
+    from google.auth import crypt
+    pub, priv = rsa.newkeys(1024)
+    signer = crypt.RSASigner.from_string(priv.save_pkcs1().decode(), key_id="local-key")
+    return signer, {"local-key": pub.save_pkcs1().decode()}
+
+
+@pytest.mark.asyncio
+async def test_verify_user_caches_certs_and_claims(monkeypatch):
+    from google.auth import jwt
+    from google.oauth2 import id_token as google_id_token
+    signer, certs = _local_firebase_keys()
+    fetches = []
+
+    def cert_server(url, method="GET", body=None, headers=None, **kwargs):
+        fetches.append(url)
+        return SimpleNamespace(status=200, headers={"cache-control": "public, max-age=3600"}, data=json.dumps(certs).encode())
+
+    verifications = []
+    original = google_id_token.verify_firebase_token
+
+    def counting_verify(token, request, **kwargs):
+        verifications.append(token)
+        return original(token, request, **kwargs)
+
+    monkeypatch.setattr(main, "_auth_request", main._CachingAuthRequest(cert_server))
+    monkeypatch.setattr(main, "_claims_cache", OrderedDict())
+    monkeypatch.setattr(main, "AUTH_CACHE_SIZE", 2)
+    monkeypatch.setattr(google_id_token, "verify_firebase_token", counting_verify)
+
+    now = int(time.time())
+    tokens = [jwt.encode(signer, {"uid": f"user{i}", "iat": now, "exp": now + 600}).decode() for i in range(3)]
+    for _ in range(3):
+        assert main._verify_user(f"Bearer {tokens[0]}")["uid"] == "user0"
+    assert len(verifications) == 1
+    main._verify_user(f"Bearer {tokens[1]}")
+    main._verify_user(f"Bearer {tokens[2]}")
+    # certs fetched once for all tokens; LRU keeps only the two most recent claims
+    assert len(fetches) == 1
+    assert len(main._claims_cache) == 2
+    main._verify_user(f"Bearer {tokens[0]}")
+    assert len(verifications) == 4
+
+    expired = jwt.encode(signer, {"uid": "old", "iat": now - 7200, "exp": now - 3600}).decode()
+    with pytest.raises(main.HTTPException) as err:
+        main._verify_user(f"Bearer {expired}")
+    assert err.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_views_are_batched_and_not_lost(fake_fs, monkeypatch):
+    counter = main.ViewCounter(interval=3600)
+    monkeypatch.setattr(main, "view_counter", counter)
+    _seed_fs_articles(fake_fs, 3, comments_per_article=0)
+    fake_fs.stats.reset()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for i in range(60):
+            r = await ac.get(f"/api/v1/articles/a{i % 3}")
+            assert r.json()["views"] == i // 3 + 1
+    # no write on the request path
+    assert fake_fs.stats.writes == 0
+    # a failing commit re-queues the deltas instead of dropping them
+    real_batch = fake_fs.batch
+    monkeypatch.setattr(fake_fs, "batch", lambda: (_ for _ in ()).throw(RuntimeError("unavailable")))
+    assert counter.flush() == 0
+    monkeypatch.setattr(fake_fs, "batch", real_batch)
+    fake_fs.collection("articles").document("a2").delete()
+    counter.stop()
+    assert [fake_fs.collection("articles").document(f"a{i}").get().to_dict().get("views") for i in range(2)] == [20, 20]
+    assert counter.pending("a0") == 0 and counter.pending("a2") == 0
+
+
+def test_hot_article_views_use_shards(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "VIEWS_SHARDS", 4)
+    monkeypatch.setattr(main, "VIEWS_HOT_THRESHOLD", 10)
+    counter = main.ViewCounter(interval=3600)
+    _seed_fs_articles(fake_fs, 1, comments_per_article=0)
+    for _ in range(25):
+        counter.record("a0")
+    assert counter.flush() == 25
+    ref = fake_fs.collection("articles").document("a0")
+    data = ref.get().to_dict()
+    assert data["views_sharded"] and not data.get("views")
+    assert main.get_store().get("a0")["views"] == 25
+
+
+@pytest.mark.asyncio
+async def test_update_of_sharded_article_reports_all_views(fake_fs, monkeypatch):
+    _seed_fs_articles(fake_fs, 1, comments_per_article=0)
+    store = main.get_store()
+    store.add_views({"a0": 5})
+    store.add_views({"a0": 40}, shards=4, hot_threshold=10)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.put("/api/v1/articles/a0", json={"title": "Renamed"}, headers=headers)
+        assert r.status_code == 200
+        updated = r.json()
+        assert updated["title"] == "Renamed" and updated["views"] == 45
+        assert "views_sharded" not in updated and "views_in_shards" not in updated
+        r = await ac.get("/api/v1/articles/a0")
+        assert r.json()["views"] >= 45 and "views_sharded" not in r.json()
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_and_invalidation(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "view_counter", main.ViewCounter(interval=3600))
+    _seed_fs_articles(fake_fs, 3, comments_per_article=0)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.get("/api/v1/articles")
+        await ac.get("/api/v1/articles/a1")
+        fake_fs.stats.reset()
+        for _ in range(5):
+            assert len((await ac.get("/api/v1/articles")).json()) == 3
+            r = await ac.get("/api/v1/articles/a1")
+            assert r.json()["title"] == "Article 1"
+        # served from cache: Firestore is not touched at all
+        assert fake_fs.stats.reads == 0
+        assert r.json()["views"] == 6
+        await ac.put("/api/v1/articles/a1", json={"title": "Renamed"}, headers=headers)
+        assert (await ac.get("/api/v1/articles/a1")).json()["title"] == "Renamed"
+        await ac.post("/api/v1/articles/a1/comments", json={"text": "hi"}, headers=headers)
+        feed = (await ac.get("/api/v1/articles")).json()
+        assert [a["comments_count"] for a in feed if a["slug"] == "a1"] == [1]
+        stats = (await ac.get("/api/v1/cache/stats")).json()
+        assert stats["feed"]["hits"] >= 5 and stats["articles"]["invalidations"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_with_etags(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "view_counter", main.ViewCounter(interval=3600))
+    _seed_fs_articles(fake_fs, 2, comments_per_article=1)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for path in ("/api/v1/articles", "/api/v1/articles/a1", "/api/v1/search?q=article", "/api/v1/articles/a1/comments"):
+            r = await ac.get(path)
+            etag = r.headers["ETag"]
+            r = await ac.get(path, headers={"If-None-Match": etag})
+            assert r.status_code == 304 and r.content == b""
+            assert r.headers["ETag"] == etag
+        r = await ac.get("/api/v1/articles", params={"limit": 1})
+        assert r.headers.get("X-Next-Cursor")
+        r304 = await ac.get("/api/v1/articles", params={"limit": 1}, headers={"If-None-Match": r.headers["ETag"]})
+        assert r304.status_code == 304 and r304.headers.get("X-Next-Cursor") == r.headers["X-Next-Cursor"]
+        old = (await ac.get("/api/v1/articles/a1")).headers["ETag"]
+        await ac.put("/api/v1/articles/a1", json={"subtitle": "changed"}, headers=headers)
+        r = await ac.get("/api/v1/articles/a1", headers={"If-None-Match": old})
+        assert r.status_code == 200 and r.headers["ETag"] != old
+        assert r.json()["subtitle"] == "changed"
+
+
+@pytest.mark.asyncio
+async def test_like_and_bookmark_use_single_round_trips(fake_fs):
+    _seed_fs_articles(fake_fs, 1, comments_per_article=0)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        fake_fs.stats.reset()
+        r = await ac.post("/api/v1/articles/a0/likes", headers=headers)
+        assert r.json() == {"likes": 1, "liked": True}
+        # one get_all for article + marker, one batched write
+        assert fake_fs.stats.rpcs == 2
+
+        fake_fs.stats.reset()
+        r = await ac.get("/api/v1/articles/a0/likes", headers=headers)
+        assert r.json() == {"likes": 1, "liked": True}
+        assert fake_fs.stats.rpcs == 1
+
+        r = await ac.post("/api/v1/articles/a0/likes", headers=headers)
+        assert r.json() == {"likes": 0, "liked": False}
+
+        fake_fs.stats.reset()
+        r = await ac.post("/api/v1/articles/a0/bookmark", headers=headers)
+        assert r.json() == {"bookmarked": True}
+        assert fake_fs.stats.rpcs == 2
+        r = await ac.get("/api/v1/articles/a0/bookmark", headers=headers)
+        assert r.json() == {"bookmarked": True}
+        assert fake_fs.collection("users").document("u1").collection("bookmarks").document("a0").get().exists
+
+        r = await ac.get("/api/v1/articles/missing/likes", headers=headers)
+        assert r.status_code == 404
+
+
+@pytest.fixture
+def sqlite_db(monkeypatch, tmp_path):
+    path = str(tmp_path / "blog.db")
+    monkeypatch.setattr(main, "STORE_BACKEND", "sqlite")
+    monkeypatch.setattr(main, "rate_limiter", main.RateLimiter(main.MemoryBackend(), main.Limit(0, 0)))
+    monkeypatch.setattr(main, "_sqlite_store", main.SQLiteStore(path))
+    monkeypatch.setattr(main, "_verify_user", lambda authorization: {"uid": "u1", "name": "U1"})
+    monkeypatch.setattr(main, "view_counter", main.ViewCounter(interval=3600))
+    monkeypatch.setattr(main, "article_cache", main.TTLCache(100, 30, name="articles"))
+    monkeypatch.setattr(main, "feed_cache", main.TTLCache(100, 30, name="feed"))
+    yield path
+    main._sqlite_store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_survives_restart(sqlite_db, monkeypatch):
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/articles", json={"title": "Design systems", "content": "<p>Про дизайн интерфейсов</p>"}, headers=headers)
+        slug = r.json()["slug"]
+        await ac.post(f"/api/v1/articles/{slug}/comments", json={"text": "hi"}, headers=headers)
+        await ac.post(f"/api/v1/articles/{slug}/likes", headers=headers)
+        await ac.post(f"/api/v1/articles/{slug}/bookmark", headers=headers)
+        await ac.get(f"/api/v1/articles/{slug}")
+        main.view_counter.flush()
+
+    # a fresh process opening the same file sees everything
+    main._sqlite_store.close()
+    monkeypatch.setattr(main, "_sqlite_store", main.SQLiteStore(sqlite_db))
+    monkeypatch.setattr(main, "article_cache", main.TTLCache(100, 30, name="articles"))
+    monkeypatch.setattr(main, "feed_cache", main.TTLCache(100, 30, name="feed"))
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        a = (await ac.get(f"/api/v1/articles/{slug}")).json()
+        assert (a["comments_count"], a["likes"], a["views"]) == (1, 1, 2)
+        assert [x["slug"] for x in (await ac.get("/api/v1/search?q=интерф")).json()] == [slug]
+        assert [x["slug"] for x in (await ac.get("/api/v1/users/me/bookmarks", headers=headers)).json()] == [slug]
+        assert (await ac.get(f"/api/v1/articles/{slug}/likes", headers=headers)).json() == {"likes": 1, "liked": True}
+        assert (await ac.delete(f"/api/v1/articles/{slug}", headers=headers)).status_code == 204
+        assert (await ac.get("/api/v1/search?q=дизайн")).json() == []
+
+
+def test_sqlite_concurrent_toggles(sqlite_db):
+    from concurrent.futures import ThreadPoolExecutor
+    store = main._sqlite_store
+    store.create({"slug": "a", "title": "A", "created_at": "2025-01-01T00:00:00Z"})
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: store.toggle_like("a", f"u{i}", "2025"), range(200)))
+        list(pool.map(lambda i: store.add_comment("a", {"id": f"c{i}", "text": "x", "created_at": "2025"}), range(200)))
+    a = store.get("a")
+    assert a["likes"] == 200 and a["comments_count"] == 200 == store.count_comments("a")
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers_and_retry_after(fake_fs, monkeypatch):
+    limiter = main.RateLimiter(main.MemoryBackend(), main.Limit(100, 100), {"likes": main.Limit(0.5, 2)})
+    monkeypatch.setattr(main, "rate_limiter", limiter)
+    _seed_fs_articles(fake_fs, 1)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.post("/api/v1/articles/a0/likes", headers=headers)
+        assert r.status_code == 200
+        assert r.headers["RateLimit-Limit"] == "2" and r.headers["RateLimit-Remaining"] == "1"
+        assert "Retry-After" not in r.headers
+        assert (await ac.post("/api/v1/articles/a0/likes", headers=headers)).status_code == 200
+        r = await ac.post("/api/v1/articles/a0/likes", headers=headers)
+        assert r.status_code == 429
+        assert r.json() == {"detail": {"error": "rate limit"}}
+        assert r.headers["RateLimit-Remaining"] == "0" and r.headers["Retry-After"] == "2"
+        # other routes draw from their own bucket
+        r = await ac.post("/api/v1/articles/a0/bookmark", headers=headers)
+        assert r.status_code == 200 and r.headers["RateLimit-Limit"] == "100"
+
+
+@pytest.mark.asyncio
+async def test_upload_cover_writes_variants_to_local_storage(fake_fs, monkeypatch, tmp_path):
+    from io import BytesIO
+    from PIL import Image
+
+    monkeypatch.setattr(main, "MEDIA_STORAGE", "local")
+    monkeypatch.setattr(main, "MEDIA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "COVER_WIDTHS", [320, 640, 5000])
+    monkeypatch.setattr(main, "COVER_FORMATS", ["webp"])
+    monkeypatch.setattr(main, "IMAGE_WORKERS", 1)
+    monkeypatch.setattr(main, "_media_index", main.MediaIndex(str(tmp_path / "index.db")))
+    buf = BytesIO()
+    Image.new("RGB", (1600, 1200), (10, 20, 30)).save(buf, "JPEG")
+    files = {"file": ("My Photo.jpg", buf.getvalue(), "image/jpeg")}
+    form = {"alt": "A dark blue test cover", "focal_x": "0.2", "focal_y": "0.8"}
+    headers = {"Authorization": "Bearer t"}
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            r = await ac.post("/api/v1/upload/cover", files=files, data=form, headers=headers)
+            assert r.status_code == 200, r.text
+            body = r.json()
+            assert [(v["width"], v["height"], v["type"]) for v in body["variants"]] == [
+                (320, 180, "image/webp"), (640, 360, "image/webp"), (1600, 900, "image/webp"),
+            ]
+            assert body["url"] == body["variants"][-1]["url"] and body["alt"] == form["alt"]
+            assert body["srcset"]["image/webp"].endswith(" 1600w") and body["srcset"]["image/webp"].count("w,") == 2
+            for v in body["variants"]:
+                assert v["url"].startswith("/media/covers/") and v["url"].endswith(f"/{v['width']}.webp")
+                with Image.open(tmp_path / v["url"][len("/media/"):]) as img:
+                    assert img.format == "WEBP" and img.size == (v["width"], v["height"])
+
+            garbage = {"file": ("x.jpg", b"\xff\xd8\xff" + b"\0" * 64, "image/jpeg")}
+            r = await ac.post("/api/v1/upload/cover", files=garbage, data=form, headers=headers)
+            assert r.status_code == 400 and r.json() == {"detail": {"error": "invalid image"}}
+    finally:
+        main._stop_image_pool()
+
+
+@pytest.mark.asyncio
+async def test_upload_cover_enforces_limit_while_streaming(fake_fs, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "MEDIA_STORAGE", "local")
+    monkeypatch.setattr(main, "MEDIA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 100_000)
+    monkeypatch.setattr(main, "_media_index", main.MediaIndex(str(tmp_path / "index.db")))
+    headers = {"Authorization": "Bearer t"}
+    form = {"alt": "A cover that is too big"}
+    jpeg_head = b"\xff\xd8\xff\xe0"
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        # over the limit by less than the form overhead: the handler's per-chunk count catches it
+        files = {"file": ("a.jpg", jpeg_head + b"\0" * 120_000, "image/jpeg")}
+        r = await ac.post("/api/v1/upload/cover", files=files, data=form, headers=headers)
+        assert r.status_code == 413 and r.json() == {"detail": {"error": "file too large"}}
+
+        # declared Content-Length far over the limit: refused by the middleware
+        files = {"file": ("a.jpg", jpeg_head + b"\0" * 1_000_000, "image/jpeg")}
+        r = await ac.post("/api/v1/upload/cover", files=files, data=form, headers=headers)
+        assert r.status_code == 413
+
+        # chunked body without Content-Length: counted as it streams
+        async def body():
+            yield b"--x\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\nContent-Type: image/jpeg\r\n\r\n"
+            for _ in range(100):
+                yield b"\0" * 65536
+
+        r = await ac.post(
+            "/api/v1/upload/cover", content=body(),
+            headers={**headers, "Content-Type": "multipart/form-data; boundary=x"},
+        )
+        assert r.status_code == 413
+
+        files = {"file": ("a.jpg", b"GIF89a" + b"\0" * 100, "image/jpeg")}
+        r = await ac.post("/api/v1/upload/cover", files=files, data=form, headers=headers)
+        assert r.status_code == 400 and r.json() == {"detail": {"error": "invalid image signature"}}
+    assert [p.name for p in tmp_path.iterdir() if p.suffix not in (".db", ".db-wal", ".db-shm")] == []
+
+
+@pytest.mark.asyncio
+async def test_upload_cover_dedups_by_content(fake_fs, monkeypatch, tmp_path):
+    from io import BytesIO
+    from PIL import Image
+
+    media_dir = tmp_path / "media"
+    index = main.MediaIndex(str(tmp_path / "index.db"))
+    monkeypatch.setattr(main, "MEDIA_STORAGE", "local")
+    monkeypatch.setattr(main, "MEDIA_DIR", str(media_dir))
+    monkeypatch.setattr(main, "COVER_WIDTHS", [320])
+    monkeypatch.setattr(main, "COVER_FORMATS", ["webp"])
+    monkeypatch.setattr(main, "IMAGE_WORKERS", 0)
+    monkeypatch.setattr(main, "_media_index", index)
+    processed = []
+    real_process = main.images.process_cover
+    monkeypatch.setattr(main.images, "process_cover", lambda *a: processed.append(a) or real_process(*a))
+    users = iter(["u1", "u2", "u1"])
+    monkeypatch.setattr(main, "_verify_user", lambda authorization: {"uid": next(users)})
+    buf = BytesIO()
+    Image.new("RGB", (800, 450), (1, 2, 3)).save(buf, "PNG")
+    files = {"file": ("cover.png", buf.getvalue(), "image/png")}
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = (await ac.post("/api/v1/upload/cover", files=files, data={"alt": "First upload alt"}, headers=headers)).json()
+        again = (await ac.post("/api/v1/upload/cover", files=files, data={"alt": "Second upload alt"}, headers=headers)).json()
+        moved = (await ac.post("/api/v1/upload/cover", files=files, data={"alt": "Other focal point", "focal_x": "0.1"}, headers=headers)).json()
+    assert again["url"] == first["url"] and again["alt"] == "Second upload alt"
+    assert moved["url"] != first["url"]
+    assert len(processed) == 2
+    assert len(list(media_dir.rglob("*.webp"))) == 2
+    key = first["url"].split("/")[-2]
+    assert index.keys_for("u2") == [key]
+    assert sorted(index.keys_for("u1")) == sorted([key, moved["url"].split("/")[-2]])
+    index.release(key, "u1")
+    index.release(key, "u2")
+    assert index.unreferenced() == [key]
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_admin_export_and_import_ndjson(fake_fs, monkeypatch):
+    _seed_fs_articles(fake_fs, 3, comments_per_article=2)
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/v1/admin/export", headers=headers)
+        assert r.status_code == 403
+        monkeypatch.setattr(main, "ADMIN_UIDS", {"u1"})
+
+        r = await ac.get("/api/v1/admin/export", headers=headers)
+        assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in r.text.splitlines()]
+        assert sorted(rec["article"]["slug"] for rec in records) == ["a0", "a1", "a2"]
+        assert all(len(rec["comments"]) == 2 for rec in records)
+
+        # re-import the same dump next to the originals, plus one new article
+        fresh = {"article": {"slug": "imported", "title": "Imported zebra", "content": "", "created_at": "2030-01-01T00:00:00Z"}}
+        body = "".join(json.dumps(rec) + "\n" for rec in records) + json.dumps(fresh)
+        r = await ac.post("/api/v1/admin/import", content=body.encode(), headers=headers)
+        assert r.status_code == 200
+        report = r.json()
+        assert (report["created"], report["renamed"], report["failed"]) == (4, 3, 0)
+        assert fake_fs.collection("articles").document("a0-2").get().exists
+        r = await ac.get("/api/v1/articles/a0-2/comments")
+        assert len(r.json()) == 2
+
+        r = await ac.get("/api/v1/search", params={"q": "zebra"})
+        assert [a["slug"] for a in r.json()] == ["imported"]
+        r = await ac.post("/api/v1/admin/import", params={"on_conflict": "skip"}, content=json.dumps(fresh).encode(), headers=headers)
+        assert r.json()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_my_subscriptions_paginate_from_user_index(fake_fs):
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for author in ("alice", "bob", "carol"):
+            r = await ac.post(f"/api/v1/authors/{author}/subscription", headers=headers)
+            assert r.json()["subscribed"] is True
+        r = await ac.get("/api/v1/users/me/subscriptions", params={"limit": 2}, headers=headers)
+        first = r.json()["authors"]
+        assert len(first) == 2 and "X-Next-Cursor" in r.headers
+        r = await ac.get("/api/v1/users/me/subscriptions", params={"limit": 2, "cursor": r.headers["X-Next-Cursor"]}, headers=headers)
+        assert sorted(first + r.json()["authors"]) == ["alice", "bob", "carol"]
+        assert "X-Next-Cursor" not in r.headers
+        r = await ac.get("/api/v1/authors/bob/subscription", headers=headers)
+        assert r.json() == {"subscribed": True, "count": 1}
+
+
+@pytest.mark.asyncio
+async def test_my_feed_merges_followed_authors(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "rate_limiter", main.RateLimiter(main.MemoryBackend(), main.Limit(0, 0)))
+    monkeypatch.setattr(main, "FOLLOWING_FEED_DEPTH", 4)  # later pages merge live past the cached keys
+    articles = fake_fs.collection("articles")
+    for i in range(12):
+        author = ("alice", "bob", "carol")[i % 3]
+        articles.document(f"p{i}").set({"slug": f"p{i}", "title": f"Post {i}", "created_at": f"2025-03-01T00:00:{i:02d}Z", "created_by": author})
+    headers = {"Authorization": "Bearer t"}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/v1/users/me/feed", headers=headers)
+        assert r.status_code == 200 and r.json() == []
+        for author in ("alice", "carol"):
+            await ac.post(f"/api/v1/authors/{author}/subscription", headers=headers)
+        seen, cursor = [], None
+        while True:
+            r = await ac.get("/api/v1/users/me/feed", params={"limit": 3, **({"cursor": cursor} if cursor else {})}, headers=headers)
+            assert r.status_code == 200
+            seen += [a["slug"] for a in r.json()]
+            cursor = r.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == [f"p{i}" for i in range(11, -1, -1) if i % 3 != 1]
+        # the first page is served from the per-user cache; documents are still read fresh
+        articles.document("p11").delete()
+        r = await ac.get("/api/v1/users/me/feed", params={"limit": 3}, headers=headers)
+        assert [a["slug"] for a in r.json()] == ["p9", "p8"]
+        # following someone new drops the cached merge
+        await ac.post("/api/v1/authors/bob/subscription", headers=headers)
+        r = await ac.get("/api/v1/users/me/feed", params={"limit": 3}, headers=headers)
+        assert [a["slug"] for a in r.json()] == ["p10", "p9", "p8"]
+
+
+def _sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_and_backend_calls(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "_instrumented_store", None)
+    _seed_fs_articles(fake_fs, 3)
+    route = 'method="GET",route="/api/v1/articles/{slug}"'
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        before = (await ac.get("/api/v1/metrics")).text
+        assert (await ac.get("/api/v1/articles/a1")).status_code == 200
+        assert (await ac.get("/api/v1/articles/missing")).status_code == 404
+        r = await ac.get("/api/v1/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+
+    def delta(name: str) -> float:
+        return _sample(r.text, name) - _sample(before, name)
+
+    assert delta(f'blog_http_requests_total{{{route},status="200"}}') == 1
+    assert delta(f'blog_http_requests_total{{{route},status="404"}}') == 1
+    assert delta(f"blog_http_request_duration_seconds_count{{{route}}}") == 2
+    assert delta('blog_backend_operations_total{backend="firestore",op="get",kind="read"}') == 2
+    assert delta('blog_backend_operations_total{backend="firestore",op="is_empty",kind="read"}') == 0
+    assert delta(f"blog_backend_operations_per_request_sum{{{route}}}") == 2
+    assert 'blog_cache_misses_total{cache="articles"}' in r.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_token(monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/api/v1/metrics")).status_code == 401
+        assert (await ac.get("/api/v1/metrics", headers={"Authorization": "Bearer s3cret"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_locally_signed_tokens_go_through_real_verification(fake_fs, monkeypatch):
+    issuer = FakeTokenIssuer()
+    monkeypatch.setattr(main, "_verify_user", _real_verify_user)
+    monkeypatch.setattr(main, "_auth_request", main._CachingAuthRequest(issuer.transport))
+    monkeypatch.setattr(main, "_claims_cache", OrderedDict())
+    monkeypatch.setattr(main, "rate_limiter", main.RateLimiter(main.MemoryBackend(), main.Limit(0, 0)))
+    _seed_fs_articles(fake_fs, 1)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for uid in ("alice", "bob"):
+            r = await ac.post("/api/v1/articles/a0/likes", headers={"Authorization": f"Bearer {issuer.token(uid)}"})
+            assert r.status_code == 200
+        assert r.json()["likes"] == 2
+        token = issuer.token("alice")
+        forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+        r = await ac.post("/api/v1/articles/a0/likes", headers={"Authorization": f"Bearer {forged}"})
+        assert r.status_code == 401
+        r = await ac.post("/api/v1/articles/a0/likes", headers={"Authorization": f"Bearer {issuer.token('carol', ttl=-600)}"})
+        assert r.status_code == 401
+    assert issuer.cert_fetches == 1  # public keys are cached for their max-age
+
+
+@pytest.mark.asyncio
+async def test_startup_seeds_once_and_readiness(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "_readiness", {"ready": False, "error": None, "store": None})
+    broken = fake_firestore.FakeFirestore()
+    broken._rpc = lambda: (_ for _ in ()).throw(RuntimeError("firestore down"))
+    monkeypatch.setattr(main, "_fs_client", broken)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        r = await ac.get("/api/v1/ready")
+        assert r.status_code == 503 and "firestore down" in r.json()["error"]
+        assert (await ac.get("/api/v1/health")).status_code == 200
+        # the backend recovers: the next probe retries the warm-up and seeds
+        monkeypatch.setattr(main, "_fs_client", fake_fs)
+        r = await ac.get("/api/v1/ready")
+        assert r.json() == {"status": "ready", "store": "firestore"}
+        assert fake_fs.collection("articles").document("welcome").get().exists
+        fake_fs.stats.reset()
+        assert (await ac.get("/api/v1/ready")).status_code == 200
+        assert (await ac.get("/api/v1/articles/welcome")).status_code == 200
+        assert fake_fs.stats.rpcs == 1  # the article read; no seed probe per request
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_and_flushes_on_shutdown(fake_fs, monkeypatch):
+    monkeypatch.setattr(main, "_readiness", {"ready": False, "error": None, "store": None})
+    monkeypatch.setattr(main, "view_counter", main.ViewCounter(interval=3600))
+    async with main.lifespan(app):
+        assert main._readiness["ready"] is True
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            assert (await ac.get("/api/v1/articles/welcome")).json()["views"] == 1
+    assert fake_fs.collection("articles").document("welcome").get().to_dict()["views"] == 1
@@ -0,0 +1,74 @@
+import io
+import json
+
+import bulk
+import fake_firestore
+from stores import FirestoreStore, MemoryStore, SQLiteStore
+
+
+def _line(slug, **extra):
+    article = {"slug": slug, "title": slug.title(), "content": "x", "created_at": f"2025-01-01T00:00:00Z-{slug}", "created_by": "u1"}
+    return json.dumps({"article": article, **extra})
+
+
+def test_import_renames_collisions_in_one_pass():
+    store = MemoryStore()
+    for slug in ("a", "a-2", "b"):
+        store.create({"slug": slug, "created_at": "2024"})
+    lookups = []
+    real_get_many = store.get_many
+    store.get_many = lambda slugs, fields=None: lookups.append(list(slugs)) or real_get_many(slugs, fields)
+    importer = bulk.Importer(store)
+    importer.feed([_line("a"), _line("a"), _line("b"), _line("c"), _line("c"), "", "{bad", json.dumps({"article": {}})])
+    report = importer.report()
+    assert (report["created"], report["renamed"], report["skipped"], report["failed"]) == (5, 4, 0, 2)
+    assert [e["line"] for e in report["errors"]] == [7, 8]
+    assert sorted(store.articles_by_slug) == ["a", "a-2", "a-3", "a-4", "b", "b-2", "c", "c-2"]
+    # one lookup for the wanted slugs, one for a window of candidates
+    assert len(lookups) == 2
+
+
+def test_import_skip_mode_and_counters_follow_data():
+    store = MemoryStore()
+    store.create({"slug": "a", "created_at": "2024", "title": "Original"})
+    importer = bulk.Importer(store, on_conflict="skip")
+    importer.feed([
+        _line("a"),
+        _line("b", likes=[{"uid": "u1", "at": "t"}, {"uid": "u1", "at": "t2"}], comments=[{"id": "c1", "created_at": "t"}, {"text": "no id"}]),
+    ])
+    assert importer.report()["skipped"] == 1
+    assert store.get("a")["title"] == "Original"
+    b = store.get("b")
+    assert (b["likes"], b["comments_count"]) == (1, 1)
+
+
+def test_export_import_round_trip_between_backends(tmp_path):
+    src = FirestoreStore(fake_firestore.FakeFirestore(), fake_firestore)
+    for i in range(30):
+        src.create({"slug": f"s{i}", "title": f"T{i}", "content": "body", "created_at": f"2025-01-01T00:00:{i:02d}Z", "created_by": "u1", "likes": 0, "views": i, "comments_count": 0})
+        src.add_comment(f"s{i}", {"id": f"c{i}", "text": "hi", "created_at": "2025-01-02T00:00:00Z"})
+        src.toggle_like(f"s{i}", "u2", "2025-01-03T00:00:00Z")
+        src.toggle_bookmark(f"s{i}", "u3", f"2025-01-04T00:00:{i:02d}Z")
+    dump = io.StringIO("".join(bulk.export_ndjson(src)))
+
+    dst = SQLiteStore(str(tmp_path / "blog.db"))
+    seen = []
+    report = bulk.import_ndjson(bulk.Importer(dst), dump, chunk_size=7, progress=lambda imp: seen.append(imp.created))
+    assert report["created"] == 30 and report["failed"] == 0
+    assert seen == [7, 14, 21, 28, 30]
+    assert dst.get("s5")["views"] == 5 and dst.get("s5")["comments_count"] == 1
+    assert dst.like_state("s5", "u2") == (1, True)
+    assert len(dst.list_bookmarks("u3", 100)) == 30
+    assert len(dst.search("body", 3)) == 3
+    dst.close()
+
+
+def test_firestore_import_packs_batches():
+    client = fake_firestore.FakeFirestore()
+    store = FirestoreStore(client, fake_firestore)
+    lines = [_line(f"s{i}", comments=[{"id": f"c{j}", "created_at": "t"} for j in range(9)]) for i in range(100)]
+    before = client.stats.rpcs
+    bulk.import_ndjson(bulk.Importer(store), lines, chunk_size=100)
+    # 100 articles x 10 writes = 1000 writes -> 2 batch commits, plus 1 get_all for slug lookup
+    assert client.stats.rpcs - before == 3
+    assert len(list(client.collection("articles").stream())) == 100
@@ -0,0 +1,25 @@
+import time
+
+from cache import TTLCache
+
+
+def test_lru_eviction_and_stats():
+    c = TTLCache(max_entries=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)  # evicts b, the least recently used
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 1, 1)
+
+
+def test_ttl_expiry_and_invalidation():
+    c = TTLCache(max_entries=10, ttl=0.01)
+    c.set("a", 1)
+    c.set("b", 2, ttl=60)
+    time.sleep(0.02)
+    assert c.get("a") is None
+    c.delete("b")
+    assert c.get("b") is None and len(c) == 0
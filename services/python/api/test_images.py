@@ -0,0 +1,64 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import images
+
+
+def _jpeg(size=(2000, 1000), exif=None) -> bytes:
+    img = Image.new("RGB", size, (200, 30, 30))
+    # a green marker in the right third to check which side the crop keeps
+    img.paste((0, 200, 0), (size[0] * 2 // 3, 0, size[0], size[1]))
+    out = BytesIO()
+    img.save(out, "JPEG", exif=exif) if exif is not None else img.save(out, "JPEG")
+    return out.getvalue()
+
+
+def test_focal_crop_box_clamps_to_edges():
+    assert images.focal_crop_box((2000, 1000), (1, 1), 0.5, 0.5) == (500, 0, 1500, 1000)
+    assert images.focal_crop_box((2000, 1000), (1, 1), 0.95, 0.5) == (1000, 0, 2000, 1000)
+    assert images.focal_crop_box((2000, 1000), (1, 1), -3, 0.5) == (0, 0, 1000, 1000)
+    # taller target than the source: full width, vertical window around the focal point
+    assert images.focal_crop_box((1600, 1600), (16, 9), 0.5, 0.0) == (0, 0, 1600, 900)
+
+
+def test_parse_aspect():
+    assert images.parse_aspect("16:9") == (16, 9)
+    assert images.parse_aspect("original") is None
+    assert images.parse_aspect("0:1") is None
+
+
+def test_process_cover_builds_srcset_without_upscaling():
+    variants = images.process_cover(_jpeg(), [480, 1200, 4000], formats=["webp"], aspect=(16, 9))
+    assert [(v.width, v.height, v.content_type) for v in variants] == [
+        (480, 270, "image/webp"), (1200, 675, "image/webp"), (1778, 1000, "image/webp"),
+    ]
+    small = images.process_cover(_jpeg((300, 200)), [480, 768], formats=["webp"], aspect=None)
+    assert [(v.width, v.height) for v in small] == [(300, 200)]
+
+
+def test_process_cover_honors_focal_point():
+    right = images.process_cover(_jpeg(), [100], formats=["webp"], aspect=(1, 1), focal=(0.9, 0.5))[0]
+    left = images.process_cover(_jpeg(), [100], formats=["webp"], aspect=(1, 1), focal=(0.1, 0.5))[0]
+    r, g, _ = Image.open(BytesIO(right.data)).convert("RGB").getpixel((90, 50))
+    assert g > r
+    r, g, _ = Image.open(BytesIO(left.data)).convert("RGB").getpixel((90, 50))
+    assert r > g
+
+
+def test_process_cover_strips_exif_and_applies_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90° clockwise on display
+    exif[0x010F] = "PhoneCam"  # Make
+    variant = images.process_cover(_jpeg((400, 200), exif=exif.tobytes()), [480], formats=["webp"], aspect=None)[0]
+    out = Image.open(BytesIO(variant.data))
+    assert out.size == (200, 400)
+    assert not out.getexif() and "exif" not in out.info
+
+
+def test_process_cover_rejects_garbage_and_bombs():
+    with pytest.raises(images.ImageError):
+        images.process_cover(b"\xff\xd8\xff" + b"\0" * 100, [480])
+    with pytest.raises(images.ImageError):
+        images.process_cover(_jpeg(), [480], max_pixels=1000)
@@ -0,0 +1,61 @@
+import pytest
+
+from metrics import BackendMetrics, Instrumented, Registry
+
+
+def test_render_counter_and_histogram():
+    registry = Registry()
+    requests = registry.counter("reqs_total", "Requests", ("route",))
+    latency = registry.histogram("lat_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(5, route="/a")
+    text = registry.render()
+    assert "# TYPE reqs_total counter" in text
+    assert 'reqs_total{route="/a\\"b"} 3' in text
+    assert 'lat_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'lat_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'lat_seconds_count{route="/a"} 3' in text
+    assert 'lat_seconds_sum{route="/a"} 5.55' in text
+
+
+class _Backend:
+    flag = True
+
+    def read(self):
+        return [{"a": 1}, {"a": 2}]
+
+    def get_one(self):
+        return {"a": 1, "b": 2}
+
+    def stream(self):
+        yield from range(3)
+
+    def write(self):
+        return None
+
+    def fail(self):
+        raise RuntimeError("down")
+
+
+def test_instrumented_counts_calls_documents_and_errors():
+    registry = Registry()
+    backend = BackendMetrics(registry)
+    proxy = Instrumented(_Backend(), "fake", backend, {"write"})
+    assert proxy.flag is True
+    assert len(proxy.read()) == 2
+    assert proxy.get_one() == {"a": 1, "b": 2}
+    assert list(proxy.stream()) == [0, 1, 2]
+    proxy.write()
+    with pytest.raises(RuntimeError):
+        proxy.fail()
+    assert backend.operations.value(backend="fake", op="read", kind="read") == 1
+    assert backend.operations.value(backend="fake", op="write", kind="write") == 1
+    assert backend.documents.value(backend="fake", op="read") == 2
+    assert backend.documents.value(backend="fake", op="get_one") == 1
+    assert backend.documents.value(backend="fake", op="stream") == 3
+    assert backend.errors.value(backend="fake", op="fail") == 1
+    assert backend.latency.count(backend="fake", op="fail") == 1
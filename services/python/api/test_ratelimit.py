@@ -0,0 +1,80 @@
+import multiprocessing
+
+import pytest
+
+from ratelimit import Limit, MemoryBackend, RateLimiter, SQLiteBackend, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits("uploads=0.2:3, comments=1:5,bad,x=1") == {
+        "uploads": Limit(0.2, 3),
+        "comments": Limit(1.0, 5),
+    }
+    assert parse_limits("") == {}
+    assert parse_limits("uploads=0.2:3", ["uploads", "comments"]) == {"uploads": Limit(0.2, 3)}
+    with pytest.raises(ValueError, match="upload"):
+        parse_limits("upload=0.2:3", ["uploads", "comments"])
+
+
+def test_token_bucket_refills():
+    backend = MemoryBackend()
+    limit = Limit(1, 2)
+    assert backend.take("k", limit, 100.0) == (True, 1.0)
+    assert backend.take("k", limit, 100.0) == (True, 0.0)
+    assert backend.take("k", limit, 100.5)[0] is False
+    assert backend.take("k", limit, 101.5)[0] is True
+    # refill never exceeds the burst
+    assert backend.take("k", limit, 1000.0) == (True, 1.0)
+
+
+def test_memory_backend_is_bounded():
+    backend = MemoryBackend(max_keys=3)
+    limit = Limit(1, 1)
+    for key in ("a", "b", "c"):
+        backend.take(key, limit, 0.0)
+    backend.take("a", limit, 0.0)  # touch: "b" is now least recently used
+    backend.take("d", limit, 0.0)
+    assert len(backend) == 3
+    # "b" was evicted and starts over with a full bucket; "a" is still empty
+    assert backend.take("b", limit, 0.0)[0] is True
+    assert backend.take("a", limit, 0.0)[0] is False
+
+
+def test_limiter_routes_and_decisions():
+    limiter = RateLimiter(MemoryBackend(), Limit(10, 10), {"uploads": Limit(0.5, 1), "off": Limit(0, 0)})
+    assert limiter.check("off", "u1") is None
+    first = limiter.check("uploads", "u1")
+    assert first.allowed and first.limit == 1 and first.remaining == 0 and first.reset == 2
+    assert "Retry-After" not in first.headers()
+    denied = limiter.check("uploads", "u1")
+    assert not denied.allowed and denied.headers()["Retry-After"] == "2"
+    # buckets are per route and per key
+    assert limiter.check("comments", "u1").allowed
+    assert limiter.check("uploads", "u2").allowed
+
+
+def _drain(path, n, out):
+    backend = SQLiteBackend(path)
+    out.put(sum(backend.take("shared", Limit(0.001, 50), 0.0)[0] for _ in range(n)))
+
+
+def test_sqlite_backend_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    SQLiteBackend(path)
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_drain, args=(path, 40, out)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    allowed = sum(out.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join()
+    # 120 attempts against one bucket of 50: exactly the burst gets through
+    assert allowed == 50
+
+
+def test_sqlite_backend_prunes_idle_buckets(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "ratelimit.db"), idle_seconds=10)
+    backend.PRUNE_EVERY = 2
+    backend.take("old", Limit(1, 1), 0.0)
+    backend.take("new", Limit(1, 1), 100.0)
+    assert len(backend) == 1
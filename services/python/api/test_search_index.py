@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from search_index import SearchIndex, tokenize
+
+
+def test_tokenize_cyrillic_and_latin():
+    assert tokenize("<p>Ёжик в тумане</p> & FastAPI-2") == ["ежик", "в", "тумане", "fastapi", "2"]
+
+
+def test_ranking_prefix_and_updates():
+    idx = SearchIndex()
+    idx.add("a", title="Добро пожаловать", content="первая статья", created_at="2025-01-01")
+    idx.add("b", title="Дизайн", content="добро и дизайн интерфейсов", created_at="2025-01-02")
+    idx.add("c", title="Бизнес", content="ничего общего", created_at="2025-01-03")
+    # title hits outrank body hits
+    assert [d for d, _ in idx.search("добро")] == ["a", "b"]
+    # prefix match on partially typed words, AND across tokens
+    assert [d for d, _ in idx.search("диз интер")] == ["b"]
+    idx.add("a", title="Другое", content="", created_at="2025-01-01")
+    assert [d for d, _ in idx.search("добро")] == ["b"]
+    idx.remove("b")
+    assert idx.search("добро") == []
+    assert "b" not in idx and len(idx) == 2
+
+
+def test_snapshot_roundtrip(tmp_path):
+    idx = SearchIndex()
+    idx.rebuild([{"slug": "a", "title": "Hello world", "created_at": "2025-01-01"}])
+    synced = idx.built_at
+    idx.add("b", title="Привет мир", created_at="2025-01-02")
+    path = str(tmp_path / "index.json.gz")
+    time.sleep(0.01)
+    idx.snapshot(path)
+    restored = SearchIndex()
+    assert restored.restore(path)
+    assert restored.search("при") == idx.search("при")
+    # stamped with the last sync, not the snapshot time: other processes' later writes still get caught up
+    assert restored.built_at == synced
+    assert not SearchIndex().restore(str(tmp_path / "missing.gz"))
+
+
+def test_catch_up_reads_since_last_sync_with_overlap():
+    idx = SearchIndex()
+    idx.rebuild([])
+    first = idx.built_at
+    asked = []
+
+    def read_since(since):
+        asked.append(since)
+        return [{"slug": "x", "title": "Новая", "created_at": first}]
+
+    assert idx.catch_up(read_since, overlap=60) == 1
+    assert asked[0] < first and [d for d, _ in idx.search("новая")] == ["x"]
+    assert idx.built_at >= first
+
+    def failing(since):
+        raise RuntimeError("store down")
+
+    synced = idx.built_at
+    with pytest.raises(RuntimeError):
+        idx.catch_up(failing)
+    assert idx.built_at == synced
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import rsa
+
+import credentials
+import main
+from benchmarks.bench_startup import LAZY_MODULES, measure
+
+
+@pytest.fixture
+def service_account_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("FIREBASE_SERVICE_ACCOUNT_JSON", raising=False)
+    monkeypatch.delenv("FIREBASE_SERVICE_ACCOUNT_FILE", raising=False)
+    credentials.reset()
+    yield tmp_path
+    credentials.reset()
+
+
+def _key(project_id: str = "blog-test") -> dict:
+    _, private_key = rsa.newkeys(1024)
+    return {
+        "type": "service_account",
+        "project_id": project_id,
+        "private_key_id": "k1",
+        "private_key": private_key.save_pkcs1().decode("ascii"),
+        "client_email": f"api@{project_id}.iam.gserviceaccount.com",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+def test_service_account_lookup_order(service_account_env, monkeypatch):
+    secrets = service_account_env / "secrets"
+    secrets.mkdir()
+    (secrets / "a-config.json").write_text(json.dumps({"not": "a key"}))
+    (secrets / "b-key.json").write_text(json.dumps(_key("from-secrets")))
+    assert credentials.load_service_account(str(secrets)).project_id == "from-secrets"
+
+    key_file = service_account_env / "key.json"
+    key_file.write_text(json.dumps(_key("from-file")))
+    monkeypatch.setenv("FIREBASE_SERVICE_ACCOUNT_FILE", str(key_file))
+    credentials.reset()
+    assert credentials.load_service_account(str(secrets)).source == str(key_file)
+
+    monkeypatch.setenv("FIREBASE_SERVICE_ACCOUNT_JSON", json.dumps(_key("from-env")))
+    credentials.reset()
+    account = credentials.load_service_account(str(secrets))
+    assert (account.project_id, account.source) == ("from-env", "FIREBASE_SERVICE_ACCOUNT_JSON")
+    assert account.credentials.service_account_email == "api@from-env.iam.gserviceaccount.com"
+
+    monkeypatch.setenv("FIREBASE_SERVICE_ACCOUNT_JSON", "{broken")
+    monkeypatch.delenv("FIREBASE_SERVICE_ACCOUNT_FILE")
+    credentials.reset()
+    assert credentials.load_service_account(str(service_account_env / "missing")) is None
+
+
+def test_firestore_and_gcs_share_one_parse(service_account_env, monkeypatch):
+    from google.oauth2 import service_account
+
+    parses = []
+    original = service_account.Credentials.from_service_account_info
+
+    def counting(info, **kwargs):
+        parses.append(info["project_id"])
+        return original(info, **kwargs)
+
+    clients = []
+
+    def client(project=None, credentials=None):
+        clients.append((project, credentials))
+        return SimpleNamespace(project=project)
+
+    monkeypatch.setattr(service_account.Credentials, "from_service_account_info", counting)
+    monkeypatch.setenv("FIREBASE_SERVICE_ACCOUNT_JSON", json.dumps(_key()))
+    monkeypatch.setattr(main, "firestore", SimpleNamespace(Client=client))
+    monkeypatch.setattr(main, "storage", SimpleNamespace(Client=client))
+    monkeypatch.setattr(main, "_fs_client", None)
+    monkeypatch.setattr(main, "_gcs_client", None)
+
+    assert main.fs_client().project == "blog-test"
+    assert main.gcs_client().project == "blog-test"
+    assert parses == ["blog-test"]
+    assert clients[0][1] is clients[1][1]
+
+
+def test_no_service_account_builds_no_clients(service_account_env, monkeypatch):
+    monkeypatch.setattr(main, "load_service_account", lambda: credentials.load_service_account(str(service_account_env)))
+    monkeypatch.setattr(main, "_fs_client", None)
+    monkeypatch.setattr(main, "_gcs_client", None)
+    assert main.fs_client() is None
+    assert main.gcs_client() is None
+
+
+def test_import_main_leaves_cloud_sdks_unloaded():
+    # the startup benchmark's measurement (python -X importtime -c "import main") in a fresh interpreter
+    times = measure()
+    assert "main" in times.cumulative_us
+    assert [m for m in LAZY_MODULES if m in times.cumulative_us] == []
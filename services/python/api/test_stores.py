@@ -0,0 +1,381 @@
+"""Conformance suite: every storage backend must behave the same."""
+import pytest
+
+import fake_firestore
+from stores import FirestoreStore, MemoryStore, SQLiteStore
+
+
+def _memory():
+    return MemoryStore()
+
+
+def _firestore():
+    return FirestoreStore(fake_firestore.FakeFirestore(), fake_firestore)
+
+
+def _sqlite(tmp_path):
+    return SQLiteStore(str(tmp_path / "blog.db"))
+
+
+BACKENDS = {"memory": _memory, "firestore": _firestore, "sqlite": _sqlite}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def store(request, tmp_path):
+    factory = BACKENDS[request.param]
+    s = factory(tmp_path) if factory is _sqlite else factory()
+    yield s
+    if hasattr(s, "close"):
+        s.close()
+
+
+def _article(i: int, author: str = "u1", **extra):
+    a = {
+        "slug": f"a{i}", "title": f"Article {i}", "content": f"body {i}",
+        "created_at": f"2025-01-01T00:00:{i:02d}Z", "created_by": author,
+        "likes": 0, "views": 0, "comments_count": 0,
+    }
+    a.update(extra)
+    return a
+
+
+def test_article_crud(store):
+    assert store.is_empty()
+    store.create(_article(1))
+    assert not store.is_empty() and store.exists("a1") and not store.exists("a2")
+    assert store.get("a1")["title"] == "Article 1"
+    assert store.get("missing") is None
+    updated = store.update("a1", {"title": "Renamed", "updated_at": "2025-02-01T00:00:00Z"})
+    assert updated["title"] == "Renamed" and updated["content"] == "body 1"
+    assert store.update("missing", {"title": "x"}) is None
+    # returned documents are copies, not views into the store
+    updated["title"] = "mutated"
+    assert store.get("a1")["title"] == "Renamed"
+    assert store.delete("a1") and not store.exists("a1")
+    assert not store.delete("a1")
+
+
+def test_create_unique_numbers_slugs(store):
+    store.create(_article(1, slug="post-3"))  # an older article, or another title's slug
+    slugs = [store.create_unique(_article(i), "post") for i in range(4)]
+    assert slugs == ["post", "post-2", "post-4", "post-5"]
+    assert store.get("post-4")["slug"] == "post-4" and store.get("post-3")["title"] == "Article 1"
+    # numbers are not reused after a delete
+    store.delete("post-5")
+    assert store.create_unique(_article(9), "post") == "post-6"
+    assert store.create_unique(_article(9), "other") == "other"
+
+
+def test_list_recent_and_by_author_paginate(store):
+    for i in range(7):
+        store.create(_article(i, author="u1" if i % 2 else "u2"))
+    first = store.list_recent(3)
+    assert [a["slug"] for a in first] == ["a6", "a5", "a4"]
+    after = (first[-1]["created_at"], first[-1]["slug"])
+    assert [a["slug"] for a in store.list_recent(10, after)] == ["a3", "a2", "a1", "a0"]
+    assert [a["slug"] for a in store.list_by_author("u1", 10)] == ["a5", "a3", "a1"]
+    assert [a["slug"] for a in store.list_by_author("u1", 10, ("2025-01-01T00:00:05Z", "a5"))] == ["a3", "a1"]
+    card = store.list_recent(1, fields=["slug", "title"])[0]
+    assert card == {"slug": "a6", "title": "Article 6"}
+
+
+def _walk(page, size: int) -> list:
+    """Every row of a paginated list, following (sort key, id) cursors page by page."""
+    seen, after = [], None
+    while True:
+        rows = page(size, after)
+        seen.extend(rows)
+        if len(rows) < size:
+            return seen
+        after = rows[-1]
+
+
+def test_pages_keep_items_that_share_a_timestamp(store):
+    at = "2025-01-01T00:00:00Z"
+    for i in range(5):
+        store.create(_article(i, created_at=at))
+        store.toggle_bookmark(f"a{i}", "u9", at)
+        store.toggle_subscription(f"author{i}", "u9", at)
+        store.add_comment("a0", {"id": f"c{i}", "text": "x", "created_at": at})
+    newest = [f"a{i}" for i in range(4, -1, -1)]
+
+    def article_page(list_fn):
+        return lambda size, after: [(a["created_at"], a["slug"]) for a in list_fn(size, after, ["slug", "created_at"])]
+
+    assert [s for _, s in _walk(article_page(store.list_recent), 2)] == newest
+    assert [s for _, s in _walk(article_page(lambda n, after, f: store.list_by_author("u1", n, after, f)), 2)] == newest
+    assert [s for _, s in _walk(lambda n, after: store.list_bookmarks("u9", n, after), 2)] == newest
+    assert [a for _, a in _walk(lambda n, after: store.list_subscriptions("u9", n, after), 2)] == [f"author{i}" for i in range(4, -1, -1)]
+    comments = _walk(lambda n, after: [(c["created_at"], c["id"]) for c in store.list_comments("a0", n, after)], 2)
+    assert [c for _, c in comments] == [f"c{i}" for i in range(4, -1, -1)]
+
+
+def test_get_many_and_iter_articles(store):
+    for i in range(3):
+        store.create(_article(i))
+    store.update("a0", {"updated_at": "2025-03-01T00:00:00Z"})
+    docs = store.get_many(["a2", "missing", "a0"], ["slug", "title"])
+    assert docs == {"a2": {"slug": "a2", "title": "Article 2"}, "a0": {"slug": "a0", "title": "Article 0"}}
+    assert store.get_many([]) == {}
+    assert sorted(a["slug"] for a in store.iter_articles(["slug"])) == ["a0", "a1", "a2"]
+    assert {a["slug"] for a in store.iter_articles(["slug"], since="2025-01-01T00:00:01Z")} == {"a0", "a2"}
+
+
+def test_comments_paginate_and_count(store):
+    store.create(_article(1))
+    for j in range(5):
+        assert store.add_comment("a1", {"id": f"c{j}", "text": "x", "created_at": f"2025-01-02T00:00:{j:02d}Z"})
+    assert not store.add_comment("missing", {"id": "c", "text": "x", "created_at": "2025"})
+    assert store.get("a1")["comments_count"] == 5 and store.count_comments("a1") == 5
+    page = store.list_comments("a1", 2)
+    assert [c["id"] for c in page] == ["c4", "c3"]
+    rest = store.list_comments("a1", 10, (page[-1]["created_at"], page[-1]["id"]))
+    assert [c["id"] for c in rest] == ["c2", "c1", "c0"]
+    assert store.list_comments("missing", 10) is None
+
+
+def test_likes(store):
+    store.create(_article(1))
+    assert store.like_state("a1", "u1") == (0, False)
+    assert store.toggle_like("a1", "u1", "2025") == (1, True)
+    assert store.like_state("a1", "u1") == (1, True)
+    assert store.like_state("a1", None) == (1, False)
+    assert store.toggle_like("a1", "u1", "2025") == (0, False)
+    assert store.toggle_like("missing", "u1", "2025") is None
+    assert store.like_state("missing", "u1") is None
+    assert store.increment_likes("a1") == 1
+    assert store.increment_likes("missing") is None
+
+
+def test_bookmarks(store):
+    for i in range(3):
+        store.create(_article(i))
+    for i, at in ((0, "2025-02-01T00:00:03Z"), (1, "2025-02-01T00:00:01Z"), (2, "2025-02-01T00:00:02Z")):
+        assert store.toggle_bookmark(f"a{i}", "u1", at) is True
+    assert store.bookmark_state("a0", "u1") is True and store.bookmark_state("a0", "u2") is False
+    assert store.bookmark_state("a0", None) is False
+    assert [slug for _, slug in store.list_bookmarks("u1", 10)] == ["a0", "a2", "a1"]
+    first = store.list_bookmarks("u1", 1)
+    assert [slug for _, slug in store.list_bookmarks("u1", 10, first[-1])] == ["a2", "a1"]
+    assert store.toggle_bookmark("a2", "u1", "2025") is False
+    assert [slug for _, slug in store.list_bookmarks("u1", 10)] == ["a0", "a1"]
+    assert store.toggle_bookmark("missing", "u1", "2025") is None
+
+
+def test_delete_cascades(store):
+    store.create(_article(1))
+    store.add_comment("a1", {"id": "c0", "text": "x", "created_at": "2025-01-02T00:00:00Z"})
+    store.toggle_like("a1", "u1", "2025")
+    store.toggle_bookmark("a1", "u1", "2025-02-01T00:00:00Z")
+    assert store.delete("a1")
+    assert store.list_bookmarks("u1", 10) == []
+    # a new article under the same slug starts clean
+    store.create(_article(1))
+    assert store.list_comments("a1", 10) == []
+    assert store.like_state("a1", "u1") == (0, False)
+    assert store.bookmark_state("a1", "u1") is False
+
+
+def test_subscriptions(store):
+    assert store.subscription_state("author", "u1") == (False, 0)
+    assert store.toggle_subscription("author", "u1", "2025") == (True, 1)
+    assert store.toggle_subscription("author", "u2", "2025") == (True, 2)
+    assert store.subscription_state("author", "u1") == (True, 2)
+    assert store.list_subscriptions("u1", 10) == [("2025", "author")]
+    assert store.toggle_subscription("author", "u1", "2025") == (False, 1)
+    assert store.list_subscriptions("u1", 10) == []
+
+
+def test_memory_secondary_indexes_follow_writes():
+    store = MemoryStore()
+    for i in range(4):
+        store.create(_article(i, author="u1" if i % 2 else "u2"))
+    store.update("a3", {"created_by": "u2"})
+    store.delete("a0")
+    store.create(_article(2, author="u1"))  # overwriting a slug re-indexes it
+    assert store.articles_by_author == {"u1": [("2025-01-01T00:00:01Z", "a1"), ("2025-01-01T00:00:02Z", "a2")], "u2": [("2025-01-01T00:00:03Z", "a3")]}
+    assert store.articles_index == sorted(store.articles_index) and len(store.articles_index) == 3
+    store.toggle_bookmark("a1", "u9", "2025-02-01T00:00:00Z")
+    store.toggle_bookmark("a2", "u9", "2025-02-02T00:00:00Z")
+    store.delete("a1")
+    assert store.bookmarks_index == {"u9": [("2025-02-02T00:00:00Z", "a2")]}
+    store.toggle_bookmark("a2", "u9", "2025")
+    assert store.bookmarks_index == {} and store.bookmarks_by_user == {}
+
+
+def test_list_subscriptions_paginates(store):
+    for i in range(5):
+        store.toggle_subscription(f"author{i}", "u1", f"2025-01-01T00:00:0{i}Z")
+    store.toggle_subscription("author9", "u2", "2025-01-01T00:00:09Z")
+    first = store.list_subscriptions("u1", 2)
+    assert [a for _, a in first] == ["author4", "author3"]
+    assert [a for _, a in store.list_subscriptions("u1", 10, first[-1])] == ["author2", "author1", "author0"]
+    store.toggle_subscription("author3", "u1", "2025")
+    assert [a for _, a in store.list_subscriptions("u1", 10)] == ["author4", "author2", "author1", "author0"]
+
+
+def test_add_views(store):
+    store.create(_article(1))
+    written, retry = store.add_views({"a1": 5, "missing": 3})
+    assert written == 5 and retry == {}
+    assert store.get("a1")["views"] == 5
+
+
+def test_native_search(store):
+    if not store.native_search:
+        pytest.skip("backend uses the in-process search index")
+    store.create(_article(1, title="Дизайн интерфейсов", content="<p>Ёлка и сервер</p>"))
+    store.create(_article(2, title="Сервер", content="про дизайн немного"))
+    store.create(_article(3, title="Другое", content="ничего"))
+    assert [slug for slug, _ in store.search("дизайн", 10)] == ["a1", "a2"]
+    assert [slug for slug, _ in store.search("интерф", 10)] == ["a1"]
+    assert [slug for slug, _ in store.search("елка сервер", 10)] == ["a1"]
+    assert store.search("p", 10) == []
+    store.update("a1", {"title": "Без темы"})
+    assert [slug for slug, _ in store.search("дизайн", 10)] == ["a2"]
+    store.delete("a2")
+    assert store.search("дизайн", 10) == []
+
+
+def test_import_and_dump_social(store):
+    store.create(_article(9))
+    store.import_articles([
+        {
+            "article": _article(1, likes=1, comments_count=2),
+            "comments": [
+                {"id": "c0", "text": "first", "created_at": "2025-01-02T00:00:00Z"},
+                {"id": "c1", "text": "second", "created_at": "2025-01-02T00:00:01Z"},
+            ],
+            "likes": [{"uid": "u2", "at": "2025-01-03T00:00:00Z"}],
+            "bookmarks": [{"uid": "u3", "at": "2025-01-04T00:00:00Z"}],
+        },
+        {"article": _article(2), "comments": [], "likes": [], "bookmarks": []},
+    ])
+    assert [a["slug"] for a in store.list_recent(10)] == ["a9", "a2", "a1"]
+    assert store.like_state("a1", "u2") == (1, True)
+    assert [c["id"] for c in store.list_comments("a1", 10)] == ["c1", "c0"]
+    assert store.list_bookmarks("u3", 10) == [("2025-01-04T00:00:00Z", "a1")]
+    social = store.dump_social("a1")
+    assert [c["id"] for c in social["comments"]] == ["c1", "c0"]
+    assert social["likes"] == [{"uid": "u2", "at": "2025-01-03T00:00:00Z"}]
+    assert social["bookmarks"] == [{"uid": "u3", "at": "2025-01-04T00:00:00Z"}]
+    assert store.dump_social("a2") == {"comments": [], "likes": [], "bookmarks": []}
+
+
+def test_subscriber_count_is_maintained_and_reconciled(store):
+    for uid in ("u1", "u2", "u3"):
+        store.toggle_subscription("author", uid, "2025")
+    store.toggle_subscription("author", "u2", "2025")
+    assert store.subscription_state("author", "u1") == (True, 2)
+    assert store.reconcile_subscriber_counts() == 0
+    assert store.subscription_state("nobody", "u1") == (False, 0)
+
+
+def test_firestore_subscriptions_read_the_counter():
+    client = fake_firestore.FakeFirestore()
+    store = FirestoreStore(client, fake_firestore)
+    for i in range(50):
+        store.toggle_subscription("author", f"u{i}", "2025")
+    client.stats.reset()
+    assert store.subscription_state("author", "u1") == (True, 50)
+    # author doc + follower marker in one get_all, no scan of the 50 followers
+    assert (client.stats.rpcs, client.stats.reads) == (1, 2)
+    assert client.collection("users").document("u1").collection("subscriptions").document("author").get().exists
+
+    # drifted or missing counters are repaired by the reconcile job
+    client.collection("authors").document("author").set({"subscriber_count": 7})
+    client.collection("authors").document("legacy").collection("subscriptions").document("u1").set({"uid": "u1"})
+    assert store.reconcile_subscriber_counts() == 2
+    assert store.subscription_state("author", None) == (False, 50)
+    assert client.collection("authors").document("legacy").get().to_dict() == {"subscriber_count": 1}
+
+
+def test_firestore_first_toggle_counts_followers_in_the_transaction(monkeypatch):
+    client = fake_firestore.FakeFirestore()
+    store = FirestoreStore(client, fake_firestore)
+    for i in range(3):
+        client.collection("authors").document("legacy").collection("subscriptions").document(f"u{i}").set({"uid": f"u{i}"})
+    streams = []
+    stream = fake_firestore.BaseQuery.stream
+
+    def recording(self, transaction=None):
+        streams.append(transaction)
+        return stream(self, transaction=transaction)
+
+    monkeypatch.setattr(fake_firestore.BaseQuery, "stream", recording)
+    assert store.toggle_subscription("legacy", "u9", "2025") == (True, 4)
+    assert [type(t) for t in streams] == [fake_firestore.Transaction]
+    assert client.collection("authors").document("legacy").get().to_dict() == {"subscriber_count": 4}
+
+
+def test_firestore_sharded_views_reach_card_reads():
+    client = fake_firestore.FakeFirestore()
+    store = FirestoreStore(client, fake_firestore)
+    store.create(_article(1))
+    assert store.add_views({"a1": 30}) == (30, {})
+    assert store.add_views({"a1": 100}, shards=4, hot_threshold=50) == (100, {})
+    assert store.get("a1")["views"] == 130
+    assert store.list_recent(1)[0]["views"] == 130
+    assert store.list_recent(1, fields=["slug", "views"]) == [{"slug": "a1", "views": 130}]
+    assert store.get_many(["a1"], ["slug", "views"]) == {"a1": {"slug": "a1", "views": 130}}
+    assert [a["views"] for a in store.iter_articles()] == [130]
+    # later small deltas keep going to the shards and are folded again
+    store.add_views({"a1": 5}, shards=4, hot_threshold=50)
+    assert store.get_many(["a1"])["a1"]["views"] == store.get("a1")["views"] == 135
+    for doc in (store.get("a1"), store.list_recent(1)[0], store.update("a1", {"title": "Renamed"})):
+        assert "views_in_shards" not in doc and "views_sharded" not in doc
+    assert store.update("a1", {"title": "Again"})["views"] == 135
+
+
+def test_firestore_create_unique_is_constant_cost():
+    client = fake_firestore.FakeFirestore()
+    store = FirestoreStore(client, fake_firestore)
+    for i in range(1, 21):  # slugs from before counters existed
+        client.collection("articles").document("untitled" if i == 1 else f"untitled-{i}").set({"slug": "x"})
+    assert store.create_unique(_article(0), "untitled") == "untitled-21"
+    for i in range(50):
+        client.stats.reset()
+        store.create_unique(_article(i), "untitled")
+        # begin, counter read, candidate read, commit
+        assert (client.stats.rpcs, client.stats.reads, client.stats.writes) == (4, 2, 2)
+    assert client.collection("slug_counters").document("untitled").get().to_dict() == {"n": 71}
+
+
+def test_sqlite_subscriber_counter_backfill_and_reconcile(tmp_path):
+    path = str(tmp_path / "blog.db")
+    store = SQLiteStore(path)
+    store.toggle_subscription("a1", "u1", "2025")
+    store.toggle_subscription("a1", "u2", "2025")
+    conn = store._conn()
+    conn.execute("UPDATE authors SET subscriber_count = 9 WHERE author_id = 'a1'")
+    conn.execute("INSERT INTO authors (author_id, subscriber_count) VALUES ('gone', 3)")
+    assert store.reconcile_subscriber_counts() == 2
+    assert store.subscription_state("a1", "u1") == (True, 2)
+    assert store.subscription_state("gone", None) == (False, 0)
+    # a database from before the counter table is backfilled on open
+    conn.execute("DELETE FROM authors")
+    store.close()
+    reopened = SQLiteStore(path)
+    assert reopened.subscription_state("a1", None) == (False, 2)
+    reopened.close()
+
+
+def test_fake_firestore_query_semantics():
+    fs = fake_firestore.FakeFirestore()
+    col = fs.collection("articles")
+    for doc_id, at, author in (("b", "2", "x"), ("a", "2", "y"), ("c", "1", "x"), ("d", "3", "x")):
+        col.document(doc_id).set({"created_at": at, "created_by": author})
+    col.document("e").set({"created_by": "x"})  # no created_at: dropped by order_by
+    col.document("f").collection("comments").document("c0").set({"text": "x"})
+    Q = fake_firestore.Query
+    ids = lambda q: [d.id for d in q.stream()]
+    assert ids(col.limit(2)) == ["a", "b"]
+    # the document-id tie-breaker follows the order's direction
+    assert ids(col.order_by("created_at", direction=Q.DESCENDING)) == ["d", "b", "a", "c"]
+    assert ids(col.order_by("created_at").limit(3)) == ["c", "a", "b"]
+    assert ids(col.where("created_by", "==", "x").order_by("created_at", direction=Q.DESCENDING).limit(2)) == ["d", "b"]
+    assert ids(col.order_by("created_at", direction=Q.DESCENDING).start_after({"created_at": "2"})) == ["c"]
+    assert [r.id for r in col.list_documents()] == ["a", "b", "c", "d", "e", "f"]
+    fs.stats.reset()
+    list(col.where("created_by", "==", "nobody").stream())
+    assert fs.stats.as_dict() == {"reads": 1, "writes": 0, "deletes": 0, "rpcs": 1}